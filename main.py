@@ -1,8 +1,18 @@
+import logging
+import time
+
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from api.api import api_router
+from api.endpoints import metrics
+from domain.quiz_metrics import http_request_seconds, errors_total
+from domain.quiz_transition_scheduler import quiz_transition_scheduler
+from settings import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(settings.log_level)
 
 app = FastAPI(
     title="Quizless",
@@ -16,17 +26,40 @@ app = FastAPI(
 )
 
 app.include_router(api_router, prefix="/api")
+app.include_router(metrics.router)
+
+
+@app.on_event("startup")
+async def start_transition_scheduler():
+    if settings.transition_scheduler:
+        quiz_transition_scheduler.start()
+
+
+@app.on_event("shutdown")
+async def stop_transition_scheduler():
+    await quiz_transition_scheduler.stop()
+
+
+def _endpoint(request: Request) -> str:
+    # the route template keeps the path parameters out of the labels
+    route = request.scope.get("route")
+    return route.path if route else "unmatched"
 
 
 async def catch_exceptions_middleware(request: Request, call_next):
+    started = time.perf_counter()
     try:
-        return await call_next(request)
+        response = await call_next(request)
     except Exception as e:
-        # you probably want some kind of logging here
-        return JSONResponse(
+        logger.exception("%s %s failed", request.method, request.url.path)
+        errors_total.inc("http", type(e).__name__)
+        response = JSONResponse(
             status_code=500,
             content={"detail": str(e)}
         )
+    http_request_seconds.observe(
+        time.perf_counter() - started, request.method, _endpoint(request), str(response.status_code))
+    return response
 
 
 # it's important to add the catch_exceptions_middleware before(!)
@@ -1,7 +1,8 @@
 from fastapi import APIRouter
 
-from api.endpoints import quiz
+from api.endpoints import quiz, quiz_events
 
 
 api_router = APIRouter()
 api_router.include_router(quiz.router, tags=["quiz"])
+api_router.include_router(quiz_events.router, tags=["quiz"])
@@ -0,0 +1,13 @@
+from fastapi import APIRouter, Response
+
+from domain.quiz_metrics import registry
+
+router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+# a plain def, so the Redis scan behind the activity gauges runs in the thread pool
+@router.get("/metrics", include_in_schema=False)
+def get_metrics() -> Response:
+    return Response(content=registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
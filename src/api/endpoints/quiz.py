@@ -1,50 +1,90 @@
-from typing import List, Dict, Any
+from typing import Any, Optional
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
+from pydantic import conint
 
+from domain.quiz_batch import quiz_batch_processor
+from domain.quiz_codec import codec
 from domain.quiz_manager import quiz_manager
 from domain.quiz_requests import QuizStartRequest, QuizJoinRequest, QuizStatusRequest, ScheduleQuizRequest, \
-    StoreAnswerRequest
+    StoreAnswerRequest, QuizLeaderboardRequest, QuizBatchRequest
+from domain.quiz_response_cache import quiz_response_cache, CachedResponse
+from settings import settings
 
 router = APIRouter()
 
 
+def _json_response(obj: Any) -> Response:
+    return Response(content=codec.encode_response(obj), media_type="application/json")
+
+
+def _cached_response(request: Request, cached: CachedResponse, max_age: int) -> Response:
+    headers = {"ETag": cached.etag, "Cache-Control": f"public, max-age={max_age}"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and _etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    # If-None-Match uses the weak comparison, so the W/ prefix is ignored
+    tags = [t.strip() for t in if_none_match.split(",")]
+    return "*" in tags or etag in [t[2:] if t.startswith("W/") else t for t in tags]
+
+
 @router.get("/quiz-topics")
-async def get_topics() -> List[Dict[str, Any]]:
-    return [q.to_dict() for q in quiz_manager.get_quiz_topics()]
+async def get_topics(request: Request) -> Response:
+    return _cached_response(request, quiz_response_cache.get_topics(), settings.topics_max_age_seconds)
 
 
 @router.post("/quiz-start")
-async def start_quiz(request_data: QuizStartRequest) -> Dict[str, Any]:
-    return quiz_manager.start_quiz(request_data).to_dict()
+async def start_quiz(request_data: QuizStartRequest) -> Response:
+    return _json_response(await quiz_manager.start_quiz_async(request_data))
 
 
 @router.post("/quiz-join")
-async def join_quiz(request_data: QuizJoinRequest) -> Dict[str, Any]:
-    return quiz_manager.join_quiz(request_data).to_dict()
+async def join_quiz(request_data: QuizJoinRequest) -> Response:
+    return _json_response(await quiz_manager.join_quiz_async(request_data))
 
 
 @router.post("/quiz-check-status")
-async def check_status(request_data: QuizStatusRequest) -> Dict[str, Any]:
-    try:
-        return quiz_manager.get_quiz_status(request_data).to_dict()
-    except Exception as e:
-        print(e)
+async def check_status(request_data: QuizStatusRequest) -> Response:
+    return _json_response(await quiz_manager.get_quiz_status_async(request_data))
 
 
 @router.post("/quiz-schedule")
-async def schedule_quiz(request_data: ScheduleQuizRequest) -> Dict[str, Any]:
-    return quiz_manager.schedule_quiz(request_data).to_dict()
+async def schedule_quiz(request_data: ScheduleQuizRequest) -> Response:
+    return _json_response(await quiz_manager.schedule_quiz_async(request_data))
 
 
 @router.post("/quiz-answer")
-async def answer_quiz(request_data: StoreAnswerRequest) -> Dict[str, Any]:
-    return quiz_manager.store_answer(request_data).to_dict()
+async def answer_quiz(request_data: StoreAnswerRequest) -> Response:
+    return _json_response(await quiz_manager.store_answer_async(request_data))
 
 
 @router.get("/quiz-results/{quiz_code}")
-async def get_quiz_results(quiz_code: int) -> Dict[str, Any]:
-    results = quiz_manager.get_quiz_results(quiz_code)
-    if results:
-        results = {"quiz_results": results[0], "quiz_data": results[1]}
-    return results
+async def get_quiz_results(quiz_code: int, request: Request) -> Response:
+    cached = await quiz_response_cache.get_quiz_results_async(quiz_code)
+    if not cached:
+        # not finished yet, the client polls again
+        response = _json_response(None)
+        response.headers["Cache-Control"] = "no-store"
+        return response
+    # the results never change once stored
+    return _cached_response(request, cached, settings.results_cache_seconds)
+
+
+@router.get("/quiz-leaderboard/{quiz_code}")
+async def get_quiz_leaderboard(quiz_code: int, user_token: Optional[str] = None,
+                               top: conint(ge=1) = 10) -> Response:
+    request_data = QuizLeaderboardRequest(quiz_code=quiz_code, user_token=user_token, top=top)
+    return _json_response(await quiz_manager.get_quiz_leaderboard_async(request_data))
+
+
+@router.post("/quiz-batch")
+async def run_batch(request_data: QuizBatchRequest) -> Response:
+    # e.g. an answer followed by the status check, both served by a single read of the quiz
+    return Response(
+        content=await quiz_batch_processor.run_async(request_data, codec.encode_response),
+        media_type="application/json"
+    )
@@ -0,0 +1,53 @@
+import asyncio
+from typing import AsyncIterator
+
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+
+from domain.quiz_codec import codec
+from domain.quiz_event_broker import quiz_event_broker
+from domain.quiz_manager import quiz_manager
+from domain.quiz_requests import QuizStatusRequest
+from domain.quiz_state import UserQuizState, QuizStatusCode
+
+KEEP_ALIVE_SECONDS = 15
+FINAL_STATUSES = {QuizStatusCode.FINISHED, QuizStatusCode.EXPIRED}
+
+router = APIRouter()
+
+
+@router.get("/quiz-events/{quiz_code}")
+async def quiz_events(quiz_code: int, user_token: str) -> StreamingResponse:
+    # validate the user before the stream is opened, so errors are returned as usual
+    request_data = QuizStatusRequest(quiz_code=quiz_code, user_token=user_token)
+    await quiz_manager.get_quiz_status_async(request_data)
+    return StreamingResponse(
+        _stream_quiz_state(request_data),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def _stream_quiz_state(request_data: QuizStatusRequest) -> AsyncIterator[str]:
+    async with quiz_event_broker.subscribe(request_data.quiz_code, request_data.user_token) as changes:
+        # read the state once more after subscribing, so no change is missed in between
+        user_quiz_state = await quiz_manager.get_quiz_status_async(request_data)
+        yield _format_event(user_quiz_state)
+        while user_quiz_state.state.status not in FINAL_STATUSES:
+            try:
+                change = await asyncio.wait_for(changes.get(), KEEP_ALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if change is None:
+                return
+            user_quiz_state = UserQuizState(
+                state=change.state,
+                user=change.user or user_quiz_state.user,
+                all_user_names=change.all_user_names
+            )
+            yield _format_event(user_quiz_state)
+
+
+def _format_event(user_quiz_state: UserQuizState) -> str:
+    return f"event: quiz-state\ndata: {codec.encode_response(user_quiz_state).decode()}\n\n"
@@ -0,0 +1,83 @@
+import argparse
+import datetime
+import timeit
+import uuid
+from typing import Any, List, Tuple
+
+from domain.quiz_codec import QuizCodec, DataclassesJsonCodec, FastJsonCodec
+from domain.quiz_data import QuizQuestion, QuizQuestionType
+from domain.quiz_state import QuizState, QuizStatusCode, QuizPlayers, QuizPlayer, QuizUserRole, QuizPlayerAnswer, \
+    QuizResults, QuizResultsPlayer, UserQuizState
+
+# compares the dataclasses_json codec with the generated one on a room of the given size:
+#   cd src && python -m benchmarks.codec_benchmark --players 200 --questions 10
+
+
+def build_room(players: int, questions: int) -> List[Tuple[str, Any]]:
+    starts_at = datetime.datetime.now(datetime.timezone.utc)
+    q_state = QuizState(
+        id=str(uuid.uuid4()), name="The Magic of Numbers", quiz_code=68571, status=QuizStatusCode.STARTED,
+        expires=starts_at + datetime.timedelta(minutes=10), starts_at=starts_at,
+        cur_question=QuizQuestion(
+            image="qz_num_01.jpg", text="How much would the fortune weigh?",
+            answers=["1900 kg", "7150 tons", "62.5 tons", "1700 tons"], correct_answers=[],
+            question_type=QuizQuestionType.SINGLE_CHOICE
+        ),
+        cur_question_index=(3, questions), updates_in_seconds=4
+    )
+    quiz_players = QuizPlayers(players=[
+        QuizPlayer(
+            user_token=str(uuid.uuid4()), name=f"Player {i}", user_role=QuizUserRole.PLAYER,
+            answers=[QuizPlayerAnswer(answer=[i % 4], answer_given_seconds=i % 10) for i in range(questions)]
+        ) for i in range(players)
+    ])
+    results = QuizResults(
+        quiz_id=q_state.id, quiz_name=q_state.name, started_at=starts_at,
+        players=[
+            QuizResultsPlayer(name=p.name, correct_answers=3, total_answering_time=42, answers=p.answers)
+            for p in quiz_players.players
+        ]
+    )
+    user_quiz_state = UserQuizState(
+        state=q_state, user=quiz_players.players[0], all_user_names=[p.name for p in quiz_players.players]
+    )
+    return [
+        ("QuizState", q_state),
+        ("QuizPlayer", quiz_players.players[0]),
+        ("QuizPlayers", quiz_players),
+        ("QuizResults", results),
+        ("UserQuizState", user_quiz_state),
+    ]
+
+
+def measure(codec: QuizCodec, model: Any, number: int) -> Tuple[float, float, float]:
+    # warm up the lazily built encoders/decoders
+    encoded = codec.encode(model)
+    codec.encode_response(model)
+    cls = type(model)
+    encode = timeit.timeit(lambda: codec.encode(model), number=number) / number
+    decode = timeit.timeit(lambda: codec.decode(cls, encoded), number=number) / number
+    response = timeit.timeit(lambda: codec.encode_response(model), number=number) / number
+    return encode, decode, response
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Quiz codec micro-benchmark")
+    parser.add_argument("--players", type=int, default=200)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--number", type=int, default=100, help="iterations per measurement")
+    args = parser.parse_args()
+
+    reference, fast = DataclassesJsonCodec(), FastJsonCodec()
+    print(f"{'model':<14} {'operation':<16} {'dataclasses_json, us':>21} {'fast, us':>10} {'speedup':>8}")
+    for name, model in build_room(args.players, args.questions):
+        reference_times = measure(reference, model, args.number)
+        fast_times = measure(fast, model, args.number)
+        for operation, reference_time, fast_time in zip(
+                ("encode", "decode", "encode_response"), reference_times, fast_times):
+            print(f"{name:<14} {operation:<16} {reference_time * 1e6:>21.1f} {fast_time * 1e6:>10.1f} "
+                  f"{reference_time / fast_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
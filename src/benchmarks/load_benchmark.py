@@ -0,0 +1,201 @@
+import argparse
+import asyncio
+import datetime
+import json
+import subprocess
+import time
+from typing import Any, Dict, List, Optional
+
+from httpx import AsyncClient
+
+from main import app
+from settings import settings
+
+# drives the whole quiz lifecycle through the app against the configured Redis (`make start` runs a local one),
+# STATE_BACKEND=memory runs it without Redis:
+#   cd src && PYTHONPATH=.. python -m benchmarks.load_benchmark --rooms 20 --players 25 --output bench.json
+# and compares the run with a previous one:
+#   cd src && PYTHONPATH=.. python -m benchmarks.load_benchmark --compare bench.json
+# the network cost is told from the app cost by comparing with a run on the in-memory state backend:
+#   cd src && STATE_BACKEND=memory PYTHONPATH=.. python -m benchmarks.load_benchmark --compare bench.json
+
+BASE_URL = "http://bench"
+# the shortest quiz, so a run takes a few seconds
+DEFAULT_TOPIC_ID = "b729af45-5ed3-42d0-ac57-d4485b64b067"
+FINAL_STATUSES = {"FINISHED", "EXPIRED"}
+
+
+def percentile(sorted_values: List[float], share: float) -> float:
+    # nearest-rank percentile
+    if not sorted_values:
+        return 0.0
+    index = max(int(round(share * len(sorted_values) + 0.5)) - 1, 0)
+    return sorted_values[min(index, len(sorted_values) - 1)]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.first_started: Optional[float] = None
+        self.last_finished: Optional[float] = None
+
+    def record(self, started: float, finished: float, ok: bool) -> None:
+        self.latencies.append(finished - started)
+        if not ok:
+            self.errors += 1
+        if self.first_started is None or started < self.first_started:
+            self.first_started = started
+        if self.last_finished is None or finished > self.last_finished:
+            self.last_finished = finished
+
+    def summary(self) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        window = (self.last_finished - self.first_started) if latencies else 0
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "p50_ms": round(percentile(latencies, 0.5) * 1000, 3),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+            "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+            # requests per second while the endpoint was in use
+            "rps": round(len(latencies) / window, 1) if window > 0 else 0.0
+        }
+
+
+class LoadBenchmark:
+    def __init__(self, client: AsyncClient, args: argparse.Namespace):
+        self._client = client
+        self._args = args
+        self.stats: Dict[str, EndpointStats] = {}
+
+    async def call(self, endpoint: str, method: str, url: str, **kwargs) -> Any:
+        started = time.perf_counter()
+        res = await self._client.request(method, f"{BASE_URL}/api/{url}", **kwargs)
+        ok = res.status_code == 200
+        self.stats.setdefault(endpoint, EndpointStats()).record(started, time.perf_counter(), ok)
+        if not ok:
+            raise Exception(f"{endpoint} failed with {res.status_code}: {res.text}")
+        return res.json()
+
+    async def run_room(self, room: int) -> None:
+        args = self._args
+        started = await self.call("quiz-start", "POST", "quiz-start", json={
+            "topic_id": args.topic, "user_name": "Commander", "question_seconds": args.question_seconds})
+        quiz_code = started["state"]["quiz_code"]
+        tokens = [started["user"]["user_token"]]
+        joined = await asyncio.gather(*[
+            self.call("quiz-join", "POST", "quiz-join", json={"quiz_code": quiz_code, "user_name": f"Player {i}"})
+            for i in range(1, args.players)
+        ])
+        tokens.extend(j["user"]["user_token"] for j in joined)
+        await self.call("quiz-schedule", "POST", "quiz-schedule", json={
+            "quiz_code": quiz_code, "user_token": tokens[0], "delay_seconds": args.delay_seconds})
+        await asyncio.gather(*[self.play(quiz_code, token, room + i) for i, token in enumerate(tokens)])
+        while not await self.call("quiz-results", "GET", f"quiz-results/{quiz_code}"):
+            await asyncio.sleep(args.poll_seconds)
+        await self.call("quiz-leaderboard", "GET", f"quiz-leaderboard/{quiz_code}",
+                        params={"user_token": tokens[0]})
+
+    async def play(self, quiz_code: int, user_token: str, seed: int) -> None:
+        # polls the status like the web client does and answers every question once
+        answered = set()
+        while True:
+            user_state = await self.call("quiz-check-status", "POST", "quiz-check-status", json={
+                "quiz_code": quiz_code, "user_token": user_token})
+            state = user_state["state"]
+            question_index = state["cur_question_index"][0]
+            if state["status"] == "STARTED" and question_index not in answered:
+                answered.add(question_index)
+                await self.call("quiz-answer", "POST", "quiz-answer", json={
+                    "quiz_code": quiz_code, "user_token": user_token,
+                    "question_index": question_index, "answer": [(seed + question_index) % 4]})
+            if state["status"] in FINAL_STATUSES:
+                return
+            await asyncio.sleep(self._args.poll_seconds)
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    async with AsyncClient(app=app, base_url=BASE_URL, timeout=60) as client:
+        benchmark = LoadBenchmark(client, args)
+        started = time.perf_counter()
+        rooms = await asyncio.gather(*[benchmark.run_room(room) for room in range(args.rooms)],
+                                     return_exceptions=True)
+        duration = time.perf_counter() - started
+    total = EndpointStats()
+    for stats in benchmark.stats.values():
+        total.latencies.extend(stats.latencies)
+        total.errors += stats.errors
+    total.first_started, total.last_finished = started, started + duration
+    return {
+        "commit": git_commit(),
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("output", "compare")},
+        "state_backend": settings.state_backend,
+        "duration_seconds": round(duration, 3),
+        "failed_rooms": [str(r) for r in rooms if isinstance(r, Exception)],
+        "endpoints": {name: stats.summary() for name, stats in sorted(benchmark.stats.items())},
+        "total": total.summary()
+    }
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]]) -> None:
+    def row(name: str, summary: Dict[str, Any], base: Optional[Dict[str, Any]]) -> str:
+        line = (f"{name:<18} {summary['requests']:>9} {summary['errors']:>7} {summary['p50_ms']:>9.2f} "
+                f"{summary['p99_ms']:>9.2f} {summary['rps']:>9.1f}")
+        if base:
+            line += f" {_change(base['p50_ms'], summary['p50_ms']):>9} {_change(base['p99_ms'], summary['p99_ms']):>9}" \
+                    f" {_change(base['rps'], summary['rps']):>9}"
+        return line
+
+    header = f"{'endpoint':<18} {'requests':>9} {'errors':>7} {'p50, ms':>9} {'p99, ms':>9} {'rps':>9}"
+    if baseline:
+        header += f" {'p50':>9} {'p99':>9} {'rps':>9}"
+        print(f"compared with {baseline.get('commit')} on '{baseline.get('state_backend', 'redis')}' "
+              f"from {baseline.get('created_at')}")
+    print(header)
+    base_endpoints = baseline["endpoints"] if baseline else {}
+    for name, summary in report["endpoints"].items():
+        print(row(name, summary, base_endpoints.get(name)))
+    print(row("total", report["total"], baseline["total"] if baseline else None))
+    for error in report["failed_rooms"]:
+        print(f"failed room: {error}")
+
+
+def _change(before: float, after: float) -> str:
+    return f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Quiz lifecycle load benchmark")
+    parser.add_argument("--rooms", type=int, default=10, help="concurrent quizes")
+    parser.add_argument("--players", type=int, default=10, help="players per quiz, the commander included")
+    parser.add_argument("--topic", default=DEFAULT_TOPIC_ID)
+    parser.add_argument("--question-seconds", type=int, default=1)
+    parser.add_argument("--delay-seconds", type=int, default=0, help="delay between scheduling and starting")
+    parser.add_argument("--poll-seconds", type=float, default=0.2, help="status polling interval of a player")
+    parser.add_argument("--output", help="JSON file the report is saved to")
+    parser.add_argument("--compare", help="JSON report of a previous run to compare with")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    report = asyncio.run(run(args))
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
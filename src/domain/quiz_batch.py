@@ -0,0 +1,140 @@
+import json
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from domain.quiz_constants import QuizConstants
+from domain.quiz_data import QuizData
+from domain.quiz_manager import QuizManager, quiz_manager
+from domain.quiz_requests import QuizBatchRequest, QuizBatchOperation, QuizStartRequest, QuizJoinRequest, \
+    QuizStatusRequest, ScheduleQuizRequest, StoreAnswerRequest, QuizLeaderboardRequest
+from domain.quiz_state import QuizResultsAndData, QuizResults
+from domain.repository.quiz_state_context import QuizStateContext
+from settings import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(settings.log_level)
+
+# the operations that read the quiz state, their quizes are prefetched in one round trip
+STATE_OPERATIONS = {"quiz-join", "quiz-check-status", "quiz-schedule", "quiz-answer"}
+
+
+class QuizBatchProcessor:
+    # runs the operations in order sharing one state context, so a quiz is read from Redis once per batch
+    # and every operation sees the changes made by the previous ones; a failed operation doesn't stop the batch
+    def __init__(self, manager: QuizManager):
+        self._manager = manager
+
+    def run(self, request: QuizBatchRequest, encode: Callable[[Any], bytes]) -> bytes:
+        self._check_size(request)
+        context = QuizStateContext()
+        self._manager.prefetch_quiz_states(self._state_user_tokens(request), context)
+        results = []
+        for operation in request.operations:
+            try:
+                result = self._run(operation, context)
+                results.append(self._encode_result(operation, 200, encode(result) if result is not None else b"null"))
+            except Exception as e:
+                results.append(self._encode_error(operation, e, context))
+        return b"[" + b",".join(results) + b"]"
+
+    async def run_async(self, request: QuizBatchRequest, encode: Callable[[Any], bytes]) -> bytes:
+        self._check_size(request)
+        context = QuizStateContext()
+        await self._manager.prefetch_quiz_states_async(self._state_user_tokens(request), context)
+        results = []
+        for operation in request.operations:
+            try:
+                result = await self._run_async(operation, context)
+                results.append(self._encode_result(operation, 200, encode(result) if result is not None else b"null"))
+            except Exception as e:
+                results.append(self._encode_error(operation, e, context))
+        return b"[" + b",".join(results) + b"]"
+
+    def _run(self, operation: QuizBatchOperation, context: QuizStateContext) -> Any:
+        name, payload = operation.requested_operation, operation.payload or {}
+        if name == "quiz-topics":
+            return self._manager.get_quiz_topics()
+        if name == "quiz-start":
+            return self._manager.start_quiz(QuizStartRequest.from_dict(payload))
+        if name == "quiz-join":
+            return self._manager.join_quiz(QuizJoinRequest.from_dict(payload), context)
+        if name == "quiz-check-status":
+            return self._manager.get_quiz_status(QuizStatusRequest.from_dict(payload), context)
+        if name == "quiz-schedule":
+            return self._manager.schedule_quiz(ScheduleQuizRequest.from_dict(payload), context)
+        if name == "quiz-answer":
+            return self._manager.store_answer(StoreAnswerRequest.from_dict(payload), context)
+        if name == "quiz-results":
+            return self._build_results(self._manager.get_quiz_results(payload["quiz_code"]))
+        if name == "quiz-leaderboard":
+            return self._manager.get_quiz_leaderboard(QuizLeaderboardRequest.from_dict(payload))
+        raise Exception(self._unknown_operation(name))
+
+    async def _run_async(self, operation: QuizBatchOperation, context: QuizStateContext) -> Any:
+        name, payload = operation.requested_operation, operation.payload or {}
+        if name == "quiz-topics":
+            return self._manager.get_quiz_topics()
+        if name == "quiz-start":
+            return await self._manager.start_quiz_async(QuizStartRequest.from_dict(payload))
+        if name == "quiz-join":
+            return await self._manager.join_quiz_async(QuizJoinRequest.from_dict(payload), context)
+        if name == "quiz-check-status":
+            return await self._manager.get_quiz_status_async(QuizStatusRequest.from_dict(payload), context)
+        if name == "quiz-schedule":
+            return await self._manager.schedule_quiz_async(ScheduleQuizRequest.from_dict(payload), context)
+        if name == "quiz-answer":
+            return await self._manager.store_answer_async(StoreAnswerRequest.from_dict(payload), context)
+        if name == "quiz-results":
+            return self._build_results(await self._manager.get_quiz_results_async(payload["quiz_code"]))
+        if name == "quiz-leaderboard":
+            return await self._manager.get_quiz_leaderboard_async(QuizLeaderboardRequest.from_dict(payload))
+        raise Exception(self._unknown_operation(name))
+
+    @staticmethod
+    def _check_size(request: QuizBatchRequest) -> None:
+        if len(request.operations) > QuizConstants.BATCH_MAX_OPERATIONS:
+            raise Exception(f"A batch can contain at most {QuizConstants.BATCH_MAX_OPERATIONS} operations, "
+                            f"got {len(request.operations)}")
+
+    def _state_user_tokens(self, request: QuizBatchRequest) -> Dict[int, List[str]]:
+        # the quizes to prefetch with the players requesting them
+        user_tokens: Dict[int, List[str]] = {}
+        for operation in request.operations:
+            quiz_code = self._quiz_code(operation)
+            if operation.requested_operation not in STATE_OPERATIONS or quiz_code is None:
+                continue
+            tokens = user_tokens.setdefault(quiz_code, [])
+            user_token = operation.payload.get("user_token")
+            if isinstance(user_token, str) and user_token not in tokens:
+                tokens.append(user_token)
+        return user_tokens
+
+    @staticmethod
+    def _quiz_code(operation: QuizBatchOperation) -> Optional[int]:
+        quiz_code = operation.payload.get("quiz_code") if isinstance(operation.payload, dict) else None
+        return quiz_code if isinstance(quiz_code, int) else None
+
+    @staticmethod
+    def _build_results(results: Optional[Tuple[QuizResults, QuizData]]) -> Optional[QuizResultsAndData]:
+        return QuizResultsAndData(quiz_results=results[0], quiz_data=results[1]) if results else None
+
+    @staticmethod
+    def _unknown_operation(name: str) -> str:
+        return (f"The 'requested_operation' field value ({name}) is incorrect, expected one of the following "
+                "values: quiz-topics, quiz-start, quiz-join, quiz-check-status, quiz-schedule, quiz-answer, "
+                "quiz-results, quiz-leaderboard")
+
+    @staticmethod
+    def _encode_result(operation: QuizBatchOperation, status_code: int, body: bytes) -> bytes:
+        return (b'{"requested_operation":' + json.dumps(operation.requested_operation).encode() +
+                b',"status_code":' + str(status_code).encode() + b',"body":' + body + b"}")
+
+    def _encode_error(self, operation: QuizBatchOperation, error: Exception, context: QuizStateContext) -> bytes:
+        logger.warning("Batch operation %s failed: %s", operation.requested_operation, error)
+        quiz_code = self._quiz_code(operation)
+        if quiz_code is not None:
+            context.discard(quiz_code)
+        return self._encode_result(operation, 500, json.dumps({"detail": str(error)}).encode())
+
+
+quiz_batch_processor = QuizBatchProcessor(quiz_manager)
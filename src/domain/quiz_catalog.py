@@ -0,0 +1,202 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from domain.quiz_constants import QuizConstants
+from domain.quiz_data import QuizData, QuizQuestion
+from domain.quiz_topic import QuizTopic
+from domain.repository.quiz_metadata_repository import QuizMetadataRepository
+
+# a quiz can be started until the pending quiz expires and then runs until the started quiz expires,
+# the replaced versions of the quizes are kept that long
+RETIRED_ENTRY_SECONDS = QuizConstants.PENDING_QUIZ_EXPIRATION_SECONDS + QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS
+
+
+@dataclass(frozen=True)
+class QuizCatalogEntry:
+    quiz: QuizData
+    topic: QuizTopic
+    question_count: int
+    # correct answers of every question as the bitmasks the answers are stored as
+    correct_answer_masks: Tuple[int, ...]
+    # questions without the correct answers, shared by all the responses so they must not be changed
+    public_questions: Tuple[QuizQuestion, ...]
+    version: str = ""
+
+    @staticmethod
+    def from_quiz(quiz: QuizData, version: str = "") -> "QuizCatalogEntry":
+        return QuizCatalogEntry(
+            quiz=quiz,
+            topic=QuizTopic(id=quiz.id, name=quiz.name),
+            question_count=len(quiz.questions),
+            correct_answer_masks=tuple(sum(1 << a for a in set(q.correct_answers)) for q in quiz.questions),
+            public_questions=tuple(
+                QuizQuestion(image=q.image, text=q.text, answers=q.answers, correct_answers=[],
+                             question_type=q.question_type)
+                for q in quiz.questions
+            ),
+            version=version
+        )
+
+
+class QuizCatalog:
+    def __init__(self, quizes: List[QuizData], quiz_versions: Optional[Dict[str, str]] = None):
+        quiz_versions = quiz_versions or {}
+        self._entries: Dict[str, QuizCatalogEntry] = {
+            q.id: QuizCatalogEntry.from_quiz(q, quiz_versions.get(q.id, "")) for q in quizes
+        }
+        self._topics: List[QuizTopic] = [e.topic for e in self._entries.values()]
+        # (quiz id, version) -> entry replaced by a refresh, time it was replaced
+        self._retired: Dict[Tuple[str, str], Tuple[QuizCatalogEntry, float]] = {}
+        self._refresh_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, quiz_id: str) -> bool:
+        return quiz_id in self._entries
+
+    def get_topics(self) -> List[QuizTopic]:
+        return self._topics
+
+    # the version pins the quiz started before the catalog was refreshed, if that version
+    # is no longer known (e.g. the process started after the change) the current one is returned
+    def get_entry(self, quiz_id: str, version: Optional[str] = None) -> QuizCatalogEntry:
+        entry = self._entries.get(quiz_id)
+        if version is not None and (entry is None or entry.version != version):
+            retired = self._retired.get((quiz_id, version))
+            if retired is not None:
+                return retired[0]
+        if entry is None:
+            raise Exception(f"Quiz #{quiz_id} wasn't found among {len(self)} quizes")
+        return entry
+
+    def get_quiz(self, quiz_id: str, version: Optional[str] = None) -> QuizData:
+        return self.get_entry(quiz_id, version).quiz
+
+    def refresh(self, quiz_meta_repo: QuizMetadataRepository) -> List[str]:
+        # re-reads the changed quizes and swaps them in, returns the ids of the changed and removed quizes
+        with self._refresh_lock:
+            quiz_versions = quiz_meta_repo.read_quiz_versions()
+            entries = self._entries
+            changed = [quiz_id for quiz_id, version in quiz_versions.items()
+                       if quiz_id not in entries or entries[quiz_id].version != version]
+            removed = [quiz_id for quiz_id in entries if quiz_id not in quiz_versions]
+            retired = self._prune_retired()
+            if not changed and not removed:
+                self._retired = retired
+                return []
+            new_entries = {quiz_id: e for quiz_id, e in entries.items() if quiz_id in quiz_versions}
+            for quiz_id in changed:
+                new_entries[quiz_id] = QuizCatalogEntry.from_quiz(*quiz_meta_repo.read_quiz_and_version(quiz_id))
+            for quiz_id in changed + removed:
+                if quiz_id in entries:
+                    retired[(quiz_id, entries[quiz_id].version)] = entries[quiz_id], time.monotonic()
+            # every attribute is swapped by a single assignment, the retired entries go first
+            # so the readers holding an old version always find it
+            self._retired = retired
+            self._entries = new_entries
+            self._topics = [e.topic for e in new_entries.values()]
+            return changed + removed
+
+    def _prune_retired(self) -> Dict[Tuple[str, str], Tuple[QuizCatalogEntry, float]]:
+        now = time.monotonic()
+        return {k: v for k, v in self._retired.items() if now - v[1] < RETIRED_ENTRY_SECONDS}
+
+
+class LazyQuizCatalog(QuizCatalog):
+    # only the topics are read at start-up, the quizes are read when they are first needed
+    # and kept in a bounded LRU cache
+    def __init__(self, quiz_meta_repo: QuizMetadataRepository, max_size: int):
+        self._quiz_meta_repo = quiz_meta_repo
+        self._max_size = max(max_size, 1)
+        self._versions: Dict[str, str] = quiz_meta_repo.read_quiz_versions()
+        self._topics = quiz_meta_repo.read_topics(self._versions)
+        self._topic_ids: Set[str] = {t.id for t in self._topics}
+        self._entries: "OrderedDict[str, QuizCatalogEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._retired = {}
+        # (quiz id, version) -> time it was replaced, for the versions replaced while they weren't cached
+        self._lost: Dict[Tuple[str, str], float] = {}
+        self._refresh_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._topic_ids)
+
+    def __contains__(self, quiz_id: str) -> bool:
+        return quiz_id in self._topic_ids
+
+    # unlike the eager catalog, a version replaced within this process after it was evicted can't be served,
+    # so the quizes started with it fail instead of getting different questions
+    def get_entry(self, quiz_id: str, version: Optional[str] = None) -> QuizCatalogEntry:
+        if version is not None and version != self._versions.get(quiz_id):
+            retired = self._retired.get((quiz_id, version))
+            if retired is not None:
+                return retired[0]
+            if (quiz_id, version) in self._lost:
+                raise Exception(f"Quiz #{quiz_id} version {version} was replaced and is no longer available")
+        with self._lock:
+            entry = self._entries.get(quiz_id)
+            if entry is not None:
+                self._entries.move_to_end(quiz_id)
+                self.hits += 1
+                return entry
+        if quiz_id not in self._topic_ids:
+            raise Exception(f"Quiz #{quiz_id} wasn't found among {len(self)} quizes")
+        # read outside the lock, a concurrent miss on the same quiz just reads it twice
+        entry = QuizCatalogEntry.from_quiz(*self._quiz_meta_repo.read_quiz_and_version(quiz_id))
+        if version is not None and entry.version != version and version == self._versions.get(quiz_id):
+            # the quiz was changed before the refresh noticed it, the pinned version is gone from the storage
+            raise Exception(f"Quiz #{quiz_id} version {version} was replaced and is no longer available")
+        with self._lock:
+            self.misses += 1
+            # a refresh that happened meanwhile has already cached the new version
+            if entry.version == self._versions.get(quiz_id):
+                self._cache_entry(entry)
+        return entry
+
+    def refresh(self, quiz_meta_repo: QuizMetadataRepository) -> List[str]:
+        with self._refresh_lock:
+            quiz_versions = quiz_meta_repo.read_quiz_versions()
+            changed = [quiz_id for quiz_id, version in quiz_versions.items()
+                       if self._versions.get(quiz_id) != version]
+            removed = [quiz_id for quiz_id in self._versions if quiz_id not in quiz_versions]
+            retired = self._prune_retired()
+            if not changed and not removed:
+                self._retired = retired
+                return []
+            # the changed quizes are read right away, they are likely to be started soon
+            changed_entries = [
+                QuizCatalogEntry.from_quiz(*quiz_meta_repo.read_quiz_and_version(quiz_id)) for quiz_id in changed
+            ]
+            topics = {t.id: t for t in self._topics if t.id not in removed}
+            for entry in changed_entries:
+                topics[entry.topic.id] = entry.topic
+            now = time.monotonic()
+            lost = {k: t for k, t in self._lost.items() if now - t < RETIRED_ENTRY_SECONDS}
+            with self._lock:
+                for quiz_id in changed + removed:
+                    entry = self._entries.pop(quiz_id, None)
+                    if entry is not None:
+                        retired[(quiz_id, entry.version)] = entry, now
+                    elif quiz_id in self._versions:
+                        lost[(quiz_id, self._versions[quiz_id])] = now
+                self._retired = retired
+                self._lost = lost
+                # the quiz may have changed again between the listing and the read
+                self._versions = {**quiz_versions, **{e.quiz.id: e.version for e in changed_entries}}
+                for entry in changed_entries:
+                    self._cache_entry(entry)
+            self._topic_ids = set(topics)
+            self._topics = list(topics.values())
+            return changed + removed
+
+    def _cache_entry(self, entry: QuizCatalogEntry) -> None:
+        self._entries[entry.quiz.id] = entry
+        self._entries.move_to_end(entry.quiz.id)
+        while len(self._entries) > self._max_size:
+            self._entries.popitem(last=False)
@@ -0,0 +1,59 @@
+import hashlib
+import logging
+import os
+import pickle
+from typing import Dict, List, Optional
+
+from domain.quiz_data import QuizData
+from domain.repository.quiz_metadata_repository import QuizMetadataRepository
+from settings import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(settings.log_level)
+
+# bumped whenever the pickled models change in an incompatible way
+SNAPSHOT_FORMAT = 1
+
+
+def fingerprint(quiz_versions: Dict[str, str]) -> str:
+    digest = hashlib.sha256(f"{SNAPSHOT_FORMAT}".encode())
+    for quiz_id in sorted(quiz_versions):
+        digest.update(f"\n{quiz_id}:{quiz_versions[quiz_id]}".encode())
+    return digest.hexdigest()
+
+
+def build_snapshot(quiz_meta_repo: QuizMetadataRepository, snapshot_path: str) -> int:
+    # the versions are read first, a quiz changing while the snapshot is built makes it stale
+    quiz_versions = quiz_meta_repo.read_quiz_versions()
+    key = fingerprint(quiz_versions)
+    quizes = quiz_meta_repo.read_quizes(quiz_versions)
+    tmp_path = f"{snapshot_path}.tmp"
+    with open(tmp_path, "wb") as file:
+        pickle.dump({"fingerprint": key, "quizes": quizes}, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, snapshot_path)
+    return len(quizes)
+
+
+def load_snapshot(snapshot_path: str, quiz_versions: Dict[str, str]) -> Optional[List[QuizData]]:
+    # returns None if the snapshot is missing, unreadable or doesn't match the stored quizes
+    if not snapshot_path or not os.path.isfile(snapshot_path):
+        return None
+    try:
+        with open(snapshot_path, "rb") as file:
+            snapshot = pickle.loads(file.read())
+    except Exception as e:
+        logger.warning("Quiz catalog snapshot '%s' can't be read: %s", snapshot_path, e)
+        return None
+    if snapshot.get("fingerprint") != fingerprint(quiz_versions):
+        logger.info("Quiz catalog snapshot '%s' is stale", snapshot_path)
+        return None
+    return snapshot["quizes"]
+
+
+if __name__ == "__main__":
+    from domain.repository.quiz_metadata_fs_repository import QuizMetadataFsRepository
+    from domain.repository.quiz_metadata_s3_repository import QuizMetadataS3Repository
+
+    repo = QuizMetadataS3Repository() if settings.storage_type == "S3" else QuizMetadataFsRepository()
+    count = build_snapshot(repo, settings.quiz_snapshot_path)
+    print(f"Stored {count} quizes in {settings.quiz_snapshot_path}")
@@ -0,0 +1,85 @@
+import logging
+import random
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque
+
+from dataclasses_json import dataclass_json
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(settings.log_level)
+
+# the share of the taken codes among the recently drawn ones estimates how full the code space is
+FILL_ESTIMATE_WINDOW = 1000
+FILL_WARNING_THRESHOLD = 0.5
+
+
+@dataclass_json
+@dataclass
+class QuizCodeStats:
+    code_space: int
+    allocations: int
+    collisions: int
+    failures: int
+    collision_rate: float
+    fill_estimate: float
+
+
+class QuizCodeAllocator:
+    # the codes are drawn at random and claimed by the store callback with SET NX,
+    # so a live quiz is never overwritten by a new one with the same code
+    def __init__(self, code_space: int, max_attempts: int):
+        self._code_space = max(code_space, 1)
+        self._max_attempts = max(max_attempts, 1)
+        self._recent: Deque[bool] = deque(maxlen=FILL_ESTIMATE_WINDOW)
+        self._lock = threading.Lock()
+        self.allocations = 0
+        self.collisions = 0
+        self.failures = 0
+
+    def allocate(self, try_store: Callable[[int], bool]) -> int:
+        for _ in range(self._max_attempts):
+            code = random.randrange(self._code_space)
+            if self._record(try_store(code)):
+                return code
+        return self._fail()
+
+    async def allocate_async(self, try_store: Callable[[int], Awaitable[bool]]) -> int:
+        for _ in range(self._max_attempts):
+            code = random.randrange(self._code_space)
+            if self._record(await try_store(code)):
+                return code
+        return self._fail()
+
+    def stats(self) -> QuizCodeStats:
+        with self._lock:
+            attempts = self.allocations + self.collisions
+            return QuizCodeStats(
+                code_space=self._code_space,
+                allocations=self.allocations,
+                collisions=self.collisions,
+                failures=self.failures,
+                collision_rate=self.collisions / attempts if attempts else 0.0,
+                fill_estimate=self._recent.count(False) / len(self._recent) if self._recent else 0.0
+            )
+
+    def _record(self, stored: bool) -> bool:
+        with self._lock:
+            self._recent.append(stored)
+            if stored:
+                self.allocations += 1
+            else:
+                self.collisions += 1
+        return stored
+
+    def _fail(self) -> int:
+        with self._lock:
+            self.failures += 1
+        stats = self.stats()
+        if stats.fill_estimate >= FILL_WARNING_THRESHOLD:
+            logger.warning("Quiz code space is about %.0f%% full (%d codes)",
+                           stats.fill_estimate * 100, stats.code_space)
+        raise Exception(f"No free quiz code found in {self._max_attempts} attempts")
@@ -0,0 +1,222 @@
+import dataclasses
+import enum
+import json
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Type, TypeVar, Union, get_type_hints, get_origin, get_args
+
+from domain.quiz_metrics import codec_seconds
+from settings import settings
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional speed-up
+    orjson = None
+
+T = TypeVar("T")
+
+# dataclasses_json decodes the timestamps into the local timezone, so does the fast codec
+LOCAL_TZ = datetime.now(timezone.utc).astimezone().tzinfo
+
+
+class QuizCodec:
+    # encodes the domain models into the JSON stored in Redis (dataclasses_json's to_json format),
+    # the models that aren't dataclasses provide their own to_json_value() / from_json_value()
+    def encode(self, obj: Any) -> bytes:
+        raise NotImplementedError()
+
+    def decode(self, cls: Type[T], data: Union[bytes, str]) -> T:
+        raise NotImplementedError()
+
+    # encodes the domain models into the JSON returned by the API (FastAPI's to_dict() rendering)
+    def encode_response(self, obj: Any) -> bytes:
+        raise NotImplementedError()
+
+
+class DataclassesJsonCodec(QuizCodec):
+    def encode(self, obj: Any) -> bytes:
+        if hasattr(obj, "to_json_value"):
+            return json.dumps(obj.to_json_value()).encode()
+        if isinstance(obj, list):
+            return json.dumps([o.to_dict() for o in obj]).encode()
+        return obj.to_json().encode()
+
+    def decode(self, cls: Type[T], data: Union[bytes, str]) -> T:
+        if hasattr(cls, "from_json_value"):
+            return cls.from_json_value(json.loads(data))
+        return cls.from_json(data)
+
+    def encode_response(self, obj: Any) -> bytes:
+        from fastapi.encoders import jsonable_encoder
+        if isinstance(obj, list):
+            return json.dumps(jsonable_encoder([o.to_dict() for o in obj])).encode()
+        return json.dumps(jsonable_encoder(obj.to_dict() if obj is not None else None)).encode()
+
+
+class FastJsonCodec(QuizCodec):
+    # generates a plain function per dataclass that converts it from/to JSON-compatible values,
+    # the JSON itself is handled by orjson when it's installed
+    def __init__(self):
+        self._encoders: Dict[Any, Callable[[Any], Any]] = {}
+        self._decoders: Dict[Any, Callable[[Any], Any]] = {}
+
+    def encode(self, obj: Any) -> bytes:
+        return _dumps(self._encode_value(obj, iso_datetime=False))
+
+    def decode(self, cls: Type[T], data: Union[bytes, str]) -> T:
+        if hasattr(cls, "from_json_value"):
+            return cls.from_json_value(_loads(data))
+        return self.get_decoder(cls)(_loads(data))
+
+    def encode_response(self, obj: Any) -> bytes:
+        return _dumps(self._encode_value(obj, iso_datetime=True))
+
+    def get_encoder(self, cls: type, iso_datetime: bool = False) -> Callable[[Any], Dict[str, Any]]:
+        key = cls, iso_datetime
+        encoder = self._encoders.get(key)
+        if encoder is None:
+            encoder = self._encoders[key] = self._build_encoder(cls, iso_datetime)
+        return encoder
+
+    def get_decoder(self, cls: Type[T]) -> Callable[[Dict[str, Any]], T]:
+        decoder = self._decoders.get(cls)
+        if decoder is None:
+            decoder = self._decoders[cls] = self._build_decoder(cls)
+        return decoder
+
+    def _encode_value(self, obj: Any, iso_datetime: bool) -> Any:
+        if obj is None:
+            return None
+        if hasattr(obj, "to_json_value"):
+            return obj.to_json_value()
+        if isinstance(obj, list):
+            return [self.get_encoder(type(o), iso_datetime)(o) for o in obj]
+        return self.get_encoder(type(obj), iso_datetime)(obj)
+
+    def _build_encoder(self, cls: type, iso_datetime: bool) -> Callable[[Any], Dict[str, Any]]:
+        namespace: Dict[str, Any] = {}
+        hints = get_type_hints(cls)
+        items = []
+        for field in dataclasses.fields(cls):
+            expr = self._encode_expr(hints[field.name], f"obj.{field.name}", namespace, iso_datetime, 0)
+            items.append(f"        {field.name!r}: {expr},")
+        source = "def encode(obj):\n    return {\n" + "\n".join(items) + "\n    }\n"
+        exec(source, namespace)
+        return namespace["encode"]
+
+    def _encode_expr(self, tp: Any, value: str, namespace: Dict[str, Any], iso_datetime: bool, depth: int) -> str:
+        origin, args = get_origin(tp), get_args(tp)
+        if origin is Union:
+            inner = [a for a in args if a is not type(None)][0]
+            inner_expr = self._encode_expr(inner, value, namespace, iso_datetime, depth)
+            return value if inner_expr == value else f"(None if {value} is None else {inner_expr})"
+        if origin in (list, tuple):
+            item = f"x{depth}"
+            item_expr = self._encode_expr(args[0], item, namespace, iso_datetime, depth + 1)
+            return value if item_expr == item else f"[{item_expr} for {item} in {value}]"
+        if origin is dict:
+            item = f"x{depth}"
+            item_expr = self._encode_expr(args[1], item, namespace, iso_datetime, depth + 1)
+            return value if item_expr == item else f"{{k{depth}: {item_expr} for k{depth}, {item} in {value}.items()}}"
+        if isinstance(tp, type) and issubclass(tp, enum.Enum):
+            return f"{value}.value"
+        if isinstance(tp, type) and issubclass(tp, datetime):
+            return f"{value}.isoformat()" if iso_datetime else f"{value}.timestamp()"
+        if dataclasses.is_dataclass(tp):
+            name = f"encode_{tp.__name__}"
+            namespace[name] = self.get_encoder(tp, iso_datetime)
+            return f"{name}({value})"
+        return value
+
+    def _build_decoder(self, cls: Type[T]) -> Callable[[Dict[str, Any]], T]:
+        namespace: Dict[str, Any] = {"cls": cls}
+        hints = get_type_hints(cls)
+        args = []
+        for i, field in enumerate(dataclasses.fields(cls)):
+            if field.default is not dataclasses.MISSING:
+                namespace[f"default{i}"] = field.default
+                raw = f"data.get({field.name!r}, default{i})"
+            elif field.default_factory is not dataclasses.MISSING:
+                namespace[f"default_factory{i}"] = field.default_factory
+                raw = f"(data[{field.name!r}] if {field.name!r} in data else default_factory{i}())"
+            else:
+                raw = f"data[{field.name!r}]"
+            expr = self._decode_expr(hints[field.name], f"v{i}", namespace, 0)
+            if expr == f"v{i}":
+                args.append(f"        {field.name}={raw},")
+            else:
+                # like dataclasses_json, None is kept as is whatever the declared type is
+                args.append(f"        {field.name}=None if (v{i} := {raw}) is None else {expr},")
+        source = "def decode(data):\n    return cls(\n" + "\n".join(args) + "\n    )\n"
+        exec(source, namespace)
+        return namespace["decode"]
+
+    def _decode_expr(self, tp: Any, value: str, namespace: Dict[str, Any], depth: int) -> str:
+        origin, args = get_origin(tp), get_args(tp)
+        if origin is Union:
+            inner = [a for a in args if a is not type(None)][0]
+            return self._decode_expr(inner, value, namespace, depth)
+        if origin in (list, tuple):
+            item = f"x{depth}"
+            item_expr = self._decode_expr(args[0], item, namespace, depth + 1)
+            if item_expr == item:
+                return f"tuple({value})" if origin is tuple else value
+            items = f"{item_expr} for {item} in {value}"
+            return f"tuple({items})" if origin is tuple else f"[{items}]"
+        if origin is dict:
+            item = f"x{depth}"
+            item_expr = self._decode_expr(args[1], item, namespace, depth + 1)
+            return value if item_expr == item else f"{{k{depth}: {item_expr} for k{depth}, {item} in {value}.items()}}"
+        if isinstance(tp, type) and issubclass(tp, enum.Enum):
+            name = f"enum_{tp.__name__}"
+            namespace[name] = tp
+            return f"{name}({value})"
+        if isinstance(tp, type) and issubclass(tp, datetime):
+            namespace["fromtimestamp"] = datetime.fromtimestamp
+            namespace["LOCAL_TZ"] = LOCAL_TZ
+            return f"fromtimestamp({value}, LOCAL_TZ)"
+        if dataclasses.is_dataclass(tp):
+            name = f"decode_{tp.__name__}"
+            namespace[name] = self.get_decoder(tp)
+            return f"{name}({value})"
+        return value
+
+
+def _dumps(value: Any) -> bytes:
+    if orjson:
+        return orjson.dumps(value)
+    return json.dumps(value, separators=(",", ":")).encode()
+
+
+def _loads(data: Union[bytes, str]) -> Any:
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def create_codec(codec_type: str) -> QuizCodec:
+    if codec_type == "dataclasses_json":
+        return DataclassesJsonCodec()
+    if codec_type == "fast":
+        return FastJsonCodec()
+    raise Exception(f"Unknown codec '{codec_type}', expected one of: fast, dataclasses_json")
+
+
+class TimedCodec(QuizCodec):
+    # reports the time spent in the wrapped codec to the metrics
+    def __init__(self, wrapped: QuizCodec):
+        self._wrapped = wrapped
+
+    def encode(self, obj: Any) -> bytes:
+        with codec_seconds.time("encode"):
+            return self._wrapped.encode(obj)
+
+    def decode(self, cls: Type[T], data: Union[bytes, str]) -> T:
+        with codec_seconds.time("decode"):
+            return self._wrapped.decode(cls, data)
+
+    def encode_response(self, obj: Any) -> bytes:
+        with codec_seconds.time("encode_response"):
+            return self._wrapped.encode_response(obj)
+
+
+codec = TimedCodec(create_codec(settings.codec))
@@ -1,3 +1,8 @@
 class QuizConstants:
     PENDING_QUIZ_EXPIRATION_SECONDS = 10 * 60
     STARTED_QUIZ_EXPIRATION_SECONDS = 60 * 60
+    LEADERBOARD_MAX_SIZE = 100
+    TRANSITIONS_BATCH_SIZE = 100
+    # a claimed transition is retried after that long if the claimer fails to apply it
+    TRANSITION_LEASE_SECONDS = 10
+    BATCH_MAX_OPERATIONS = 20
@@ -0,0 +1,87 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, AsyncIterator, Optional
+
+from domain.quiz_codec import codec
+from domain.quiz_manager import QuizManager, quiz_manager
+from domain.quiz_state import QuizStateChange, QuizStateNotice
+from settings import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(settings.log_level)
+
+# the listener re-checks whether it is still needed at least this often
+LISTENER_CHECK_SECONDS = 1.0
+
+
+class QuizEventBroker:
+    # every process keeps a single Redis subscription per quiz, reads the state once per published
+    # notice and fans it out to its local subscribers, so the Redis load doesn't grow with the players
+    def __init__(self, manager: QuizManager):
+        self._manager = manager
+        # queue -> user token of the subscriber, a player's own changes are only sent to that player
+        self._subscribers: Dict[int, Dict[asyncio.Queue, Optional[str]]] = {}
+        self._listeners: Dict[int, asyncio.Task] = {}
+
+    @asynccontextmanager
+    async def subscribe(self, quiz_code: int, user_token: Optional[str] = None
+                        ) -> AsyncIterator["asyncio.Queue[Optional[QuizStateChange]]"]:
+        queue: asyncio.Queue = asyncio.Queue()
+        subscribers = self._subscribers.setdefault(quiz_code, {})
+        subscribers[queue] = user_token
+        if quiz_code not in self._listeners:
+            self._listeners[quiz_code] = asyncio.create_task(self._listen(quiz_code))
+        try:
+            yield queue
+        finally:
+            subscribers.pop(queue, None)
+            if not subscribers:
+                # the listener isn't cancelled - a pending pubsub read can't be interrupted
+                # cleanly, so it notices it was released and stops on its own
+                del self._subscribers[quiz_code]
+                listener = self._listeners.pop(quiz_code, None)
+                if listener:
+                    await asyncio.wait([listener])
+
+    async def _listen(self, quiz_code: int) -> None:
+        loop = asyncio.get_running_loop()
+        listener = asyncio.current_task()
+        pubsub = None
+        try:
+            pubsub = await self._manager.subscribe_state_changes_async(quiz_code)
+            # the transitions are applied lazily, so the listener refreshes the state once per process
+            # when the next transition is due instead of every subscriber polling it
+            q_state = await self._manager.refresh_quiz_state_async(quiz_code)
+            deadline = loop.time() + max(q_state.updates_in_seconds, 1)
+            while self._listeners.get(quiz_code) is listener:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=min(max(deadline - loop.time(), 0), LISTENER_CHECK_SECONDS))
+                if message:
+                    notice = codec.decode(QuizStateNotice, message["data"])
+                    queues = [queue for queue, user_token in self._subscribers.get(quiz_code, {}).items()
+                              if not notice.user_token or user_token == notice.user_token]
+                    if not queues:
+                        continue
+                    change = await self._manager.read_state_change_async(quiz_code, notice.user_token)
+                    deadline = loop.time() + max(change.state.updates_in_seconds, 1)
+                    for queue in queues:
+                        queue.put_nowait(change)
+                elif loop.time() >= deadline:
+                    q_state = await self._manager.refresh_quiz_state_async(quiz_code)
+                    deadline = loop.time() + max(q_state.updates_in_seconds, 1)
+        except Exception:
+            logger.exception("Quiz #%s listener failed", quiz_code)
+        finally:
+            if self._listeners.get(quiz_code) is listener:
+                # None tells the remaining subscribers there will be no more changes
+                del self._listeners[quiz_code]
+                for queue in self._subscribers.get(quiz_code, ()):
+                    queue.put_nowait(None)
+            if pubsub is not None:
+                await pubsub.unsubscribe()
+                await pubsub.close()
+
+
+quiz_event_broker = QuizEventBroker(quiz_manager)
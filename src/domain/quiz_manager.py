@@ -1,182 +1,442 @@
 import datetime
-import random
+import logging
+import threading
+import time
 import uuid
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional, Union
 
+from redis.asyncio.client import PubSub
+
+from domain.quiz_catalog import QuizCatalog, LazyQuizCatalog
+from domain.quiz_catalog_snapshot import load_snapshot
+from domain.quiz_code_allocator import QuizCodeAllocator, QuizCodeStats
 from domain.quiz_constants import QuizConstants
 from domain.quiz_data import QuizData
+from domain.quiz_metrics import registry, Gauge
+from domain.quiz_player_record import QuizPlayerRecord, QuizAnswerSheet
 from domain.quiz_requests import QuizStartRequest, QuizJoinRequest, QuizStatusRequest, ScheduleQuizRequest, \
-    StoreAnswerRequest
-from domain.quiz_state import QuizState, QuizStatusCode, QuizUserRole, QuizPlayers, QuizPlayer, UserQuizState, \
-    QuizPlayerAnswer, QuizResults
+    StoreAnswerRequest, QuizLeaderboardRequest
+from domain.quiz_scoring import QuizScoringEngine
+from domain.quiz_state import QuizState, QuizStatusCode, QuizUserRole, UserQuizState, UserQuizStateDelta, \
+    QuizResults, QuizPlayerScore, QuizLeaderboard, QuizLeaderboardPlayer, QuizStateChange, QuizStateNotice
 from domain.quiz_state_update_manager import QuizStateUpdateManager
 from domain.quiz_topic import QuizTopic
 from domain.repository.quiz_metadata_fs_repository import QuizMetadataFsRepository
 from domain.repository.quiz_metadata_s3_repository import QuizMetadataS3Repository
-from domain.repository.quiz_state_repository import QuizStateRepository
+from domain.repository.quiz_state_backends import create_state_repositories
+from domain.repository.quiz_state_context import QuizStateContext, QuizPlayerIndex, QuizStateSnapshot
 from domain.time_utils import get_utc_now_time
 from settings import settings
 
+logger = logging.getLogger(__name__)
+logger.setLevel(settings.log_level)
+
 
 class QuizManager:
     def __init__(self):
-        quiz_meta_repo = QuizMetadataS3Repository() if settings.storage_type == "S3" \
+        self._quiz_meta_repo = QuizMetadataS3Repository() if settings.storage_type == "S3" \
             else QuizMetadataFsRepository()
-        self._quizes: List[QuizData] = quiz_meta_repo.read_quizes()
-        self._state_repo = QuizStateRepository()
-        self._state_update_manager = QuizStateUpdateManager(self._state_repo, self._quizes)
+        load_started = time.perf_counter()
+        if settings.quiz_catalog_lazy:
+            self._catalog = LazyQuizCatalog(self._quiz_meta_repo, settings.quiz_cache_size)
+        else:
+            quiz_versions = self._quiz_meta_repo.read_quiz_versions()
+            quizes = load_snapshot(settings.quiz_snapshot_path, quiz_versions)
+            if quizes is None:
+                quizes = self._quiz_meta_repo.read_quizes(quiz_versions)
+            self._catalog = QuizCatalog(quizes, quiz_versions)
+        logger.info("Loaded %d quizes from '%s' storage in %.3f seconds",
+                    len(self._catalog), settings.storage_type, time.perf_counter() - load_started)
+        self._state_repo, self._async_state_repo = create_state_repositories()
+        self._scoring_engine = QuizScoringEngine(settings.scoring_batch_threshold)
+        self._code_allocator = QuizCodeAllocator(settings.quiz_code_space, settings.quiz_code_attempts)
+        self._state_update_manager = QuizStateUpdateManager(
+            self._state_repo, self._async_state_repo, self._catalog, self._scoring_engine)
+        if settings.quiz_catalog_refresh_seconds > 0:
+            threading.Thread(target=self._refresh_catalog_periodically, name="quiz-catalog-refresh",
+                             daemon=True).start()
+        self._activity: Tuple[int, int] = 0, 0
+        self._activity_read_at: Optional[float] = None
+        self._register_metrics()
+
+    def refresh_catalog(self) -> List[str]:
+        changed = self._catalog.refresh(self._quiz_meta_repo)
+        if changed:
+            logger.info("Refreshed %d quizes: %s", len(changed), ", ".join(changed))
+        return changed
+
+    def _refresh_catalog_periodically(self) -> None:
+        while True:
+            time.sleep(settings.quiz_catalog_refresh_seconds)
+            try:
+                self.refresh_catalog()
+            except Exception as e:
+                logger.warning("Quiz catalog refresh failed: %s", e)
+
+    def get_code_stats(self) -> QuizCodeStats:
+        return self._code_allocator.stats()
+
+    def get_activity(self) -> Tuple[int, int]:
+        # number of the stored quizes and their players, re-counted at most every metrics_scan_seconds
+        now = time.monotonic()
+        if self._activity_read_at is None or now - self._activity_read_at >= settings.metrics_scan_seconds:
+            self._activity = self._state_repo.count_quizes_and_players()
+            self._activity_read_at = now
+        return self._activity
+
+    def _register_metrics(self) -> None:
+        registry.register(Gauge(
+            "quiz_active_quizes", "Quizes stored in Redis", lambda: {(): self.get_activity()[0]}))
+        registry.register(Gauge(
+            "quiz_active_players", "Players of the quizes stored in Redis", lambda: {(): self.get_activity()[1]}))
+        registry.register(Gauge(
+            "quiz_catalog_size", "Quizes known to the catalog", lambda: {(): len(self._catalog)}))
+        if isinstance(self._catalog, LazyQuizCatalog):
+            registry.register(Gauge(
+                "quiz_catalog_cache_requests_total", "Lazy catalog lookups by result",
+                lambda: {("hit",): self._catalog.hits, ("miss",): self._catalog.misses},
+                ("result",), "counter"))
+        registry.register(Gauge(
+            "quiz_code_draws_total", "Quiz code draws by result",
+            self._read_code_draws, ("result",), "counter"))
+        registry.register(Gauge(
+            "quiz_code_space_fill_ratio", "Estimated share of the quiz codes in use",
+            lambda: {(): self._code_allocator.stats().fill_estimate}))
+
+    def _read_code_draws(self) -> Dict[Tuple[str, ...], int]:
+        stats = self._code_allocator.stats()
+        return {("allocated",): stats.allocations, ("collision",): stats.collisions, ("failed",): stats.failures}
 
     def get_quiz_topics(self) -> List[QuizTopic]:
-        return [
-            QuizTopic(id=q.id, name=q.name) for q in self._quizes
-        ]
+        return self._catalog.get_topics()
 
     def start_quiz(self, request_data: QuizStartRequest) -> UserQuizState:
+        q_state = self._create_quiz(request_data)
+
+        def try_store(quiz_code: int) -> bool:
+            q_state.quiz_code = quiz_code
+            return self._state_repo.create_state(q_state, QuizConstants.PENDING_QUIZ_EXPIRATION_SECONDS)
+        self._code_allocator.allocate(try_store)
+        snapshot = QuizStateSnapshot(q_state=q_state, quiz_players=QuizPlayerIndex(names=[], players={}))
+        player = self._add_player(
+            snapshot.quiz_players, request_data.user_name, QuizUserRole.COMMANDER,
+            self._state_repo.claim_player_name(
+                q_state.quiz_code, request_data.user_name, QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS))
+        self._state_repo.add_quiz_player(
+            q_state.quiz_code, player, self._leaderboard_score(QuizPlayerScore(), player.join_index),
+            QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS)
+        if settings.transition_scheduler:
+            self._state_update_manager.schedule_next_transition(q_state)
+        return self._build_user_quiz_state(snapshot, player)
+
+    async def start_quiz_async(self, request_data: QuizStartRequest) -> UserQuizState:
+        q_state = self._create_quiz(request_data)
+
+        async def try_store(quiz_code: int) -> bool:
+            q_state.quiz_code = quiz_code
+            return await self._async_state_repo.create_state(q_state, QuizConstants.PENDING_QUIZ_EXPIRATION_SECONDS)
+        await self._code_allocator.allocate_async(try_store)
+        snapshot = QuizStateSnapshot(q_state=q_state, quiz_players=QuizPlayerIndex(names=[], players={}))
+        player = self._add_player(
+            snapshot.quiz_players, request_data.user_name, QuizUserRole.COMMANDER,
+            await self._async_state_repo.claim_player_name(
+                q_state.quiz_code, request_data.user_name, QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS))
+        await self._async_state_repo.add_quiz_player(
+            q_state.quiz_code, player, self._leaderboard_score(QuizPlayerScore(), player.join_index),
+            QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS)
+        if settings.transition_scheduler:
+            await self._state_update_manager.schedule_next_transition_async(q_state)
+        return self._build_user_quiz_state(snapshot, player)
+
+    def join_quiz(self, request_data: QuizJoinRequest,
+                 context: Optional[QuizStateContext] = None) -> UserQuizState:
+        if not request_data.user_name:
+            raise Exception("User name cannot be empty")
+        snapshot = self._state_update_manager.read_and_update_quiz_state(request_data.quiz_code, context)
+        q_state, quiz_players = snapshot.q_state, snapshot.quiz_players
+        # the name is claimed atomically, so two players joining at once can't take the same one
+        player = self._add_player(
+            quiz_players, request_data.user_name, QuizUserRole.PLAYER,
+            self._state_repo.claim_player_name(
+                q_state.quiz_code, request_data.user_name, QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS))
+        snapshot.versions.mark_names_changed()
+        self._state_repo.add_quiz_player(
+            q_state.quiz_code, player, self._leaderboard_score(QuizPlayerScore(), player.join_index),
+            QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS)
+        self._state_repo.publish_state_change(q_state.quiz_code, QuizStateNotice(q_state.status))
+        return self._build_user_quiz_state(snapshot, player)
+
+    async def join_quiz_async(self, request_data: QuizJoinRequest,
+                             context: Optional[QuizStateContext] = None) -> UserQuizState:
+        if not request_data.user_name:
+            raise Exception("User name cannot be empty")
+        snapshot = await self._state_update_manager.read_and_update_quiz_state_async(request_data.quiz_code, context)
+        q_state, quiz_players = snapshot.q_state, snapshot.quiz_players
+        # the name is claimed atomically, so two players joining at once can't take the same one
+        player = self._add_player(
+            quiz_players, request_data.user_name, QuizUserRole.PLAYER,
+            await self._async_state_repo.claim_player_name(
+                q_state.quiz_code, request_data.user_name, QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS))
+        snapshot.versions.mark_names_changed()
+        await self._async_state_repo.add_quiz_player(
+            q_state.quiz_code, player, self._leaderboard_score(QuizPlayerScore(), player.join_index),
+            QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS)
+        await self._async_state_repo.publish_state_change(q_state.quiz_code, QuizStateNotice(q_state.status))
+        return self._build_user_quiz_state(snapshot, player)
+
+    def prefetch_quiz_states(self, user_tokens: Dict[int, List[str]], context: QuizStateContext) -> None:
+        self._state_repo.prefetch_quiz_snapshots(user_tokens, context)
+
+    async def prefetch_quiz_states_async(self, user_tokens: Dict[int, List[str]], context: QuizStateContext) -> None:
+        await self._async_state_repo.prefetch_quiz_snapshots(user_tokens, context)
+
+    def get_quiz_status(self, request_data: QuizStatusRequest, context: Optional[QuizStateContext] = None
+                        ) -> Union[UserQuizState, UserQuizStateDelta]:
+        snapshot = self._state_update_manager.read_and_update_quiz_state(
+            request_data.quiz_code, context, request_data.user_token)
+        return self._build_quiz_status(snapshot, request_data)
+
+    async def get_quiz_status_async(self, request_data: QuizStatusRequest, context: Optional[QuizStateContext] = None
+                                    ) -> Union[UserQuizState, UserQuizStateDelta]:
+        snapshot = await self._state_update_manager.read_and_update_quiz_state_async(
+            request_data.quiz_code, context, request_data.user_token)
+        return self._build_quiz_status(snapshot, request_data)
+
+    def store_answer(self, request_data: StoreAnswerRequest,
+                    context: Optional[QuizStateContext] = None) -> UserQuizState:
+        answer_time = get_utc_now_time()
+        snapshot = self._state_update_manager.read_and_update_quiz_state(
+            request_data.quiz_code, context, request_data.user_token)
+        q_state, quiz_players = snapshot.q_state, snapshot.quiz_players
+        user, score = self._apply_answer(q_state, quiz_players, request_data, answer_time)
+        # store the updated answers of the current user only
+        self._state_repo.set_quiz_player(
+            request_data.quiz_code, user, score, self._leaderboard_score(score, user.join_index),
+            QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS)
+        snapshot.versions.mark_player_changed(user.user_token)
+        self._state_repo.publish_state_change(request_data.quiz_code, QuizStateNotice(q_state.status, user.user_token))
+        # return the updated state
+        return self._build_user_quiz_state(snapshot, user)
+
+    async def store_answer_async(self, request_data: StoreAnswerRequest,
+                                context: Optional[QuizStateContext] = None) -> UserQuizState:
+        answer_time = get_utc_now_time()
+        snapshot = await self._state_update_manager.read_and_update_quiz_state_async(
+            request_data.quiz_code, context, request_data.user_token)
+        q_state, quiz_players = snapshot.q_state, snapshot.quiz_players
+        user, score = self._apply_answer(q_state, quiz_players, request_data, answer_time)
+        # store the updated answers of the current user only
+        await self._async_state_repo.set_quiz_player(
+            request_data.quiz_code, user, score, self._leaderboard_score(score, user.join_index),
+            QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS)
+        snapshot.versions.mark_player_changed(user.user_token)
+        await self._async_state_repo.publish_state_change(
+            request_data.quiz_code, QuizStateNotice(q_state.status, user.user_token))
+        # return the updated state
+        return self._build_user_quiz_state(snapshot, user)
+
+    def schedule_quiz(self, request_data: ScheduleQuizRequest,
+                     context: Optional[QuizStateContext] = None) -> UserQuizState:
+        snapshot = self._state_repo.read_quiz_snapshot(request_data.quiz_code, context, request_data.user_token)
+        q_state, quiz_players = snapshot.q_state, snapshot.quiz_players
+        user = self._apply_schedule(q_state, quiz_players, request_data)
+        state_json = self._state_repo.compare_and_set_state(
+            q_state, snapshot.state_json, QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS + request_data.delay_seconds)
+        self._mark_scheduled(snapshot, request_data, state_json)
+        if settings.transition_scheduler:
+            self._state_update_manager.schedule_next_transition(q_state)
+        self._state_repo.publish_state_change(q_state.quiz_code, QuizStateNotice(q_state.status))
+        return self._build_user_quiz_state(snapshot, user)
+
+    async def schedule_quiz_async(self, request_data: ScheduleQuizRequest,
+                                 context: Optional[QuizStateContext] = None) -> UserQuizState:
+        snapshot = await self._async_state_repo.read_quiz_snapshot(
+            request_data.quiz_code, context, request_data.user_token)
+        q_state, quiz_players = snapshot.q_state, snapshot.quiz_players
+        user = self._apply_schedule(q_state, quiz_players, request_data)
+        state_json = await self._async_state_repo.compare_and_set_state(
+            q_state, snapshot.state_json, QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS + request_data.delay_seconds)
+        self._mark_scheduled(snapshot, request_data, state_json)
+        if settings.transition_scheduler:
+            await self._state_update_manager.schedule_next_transition_async(q_state)
+        await self._async_state_repo.publish_state_change(q_state.quiz_code, QuizStateNotice(q_state.status))
+        return self._build_user_quiz_state(snapshot, user)
+
+    async def refresh_quiz_state_async(self, quiz_code: int) -> QuizState:
+        # applies the due transitions, the changed state is published to the subscribers
+        snapshot = await self._state_update_manager.read_and_update_quiz_state_async(quiz_code)
+        return snapshot.q_state
+
+    async def read_state_change_async(self, quiz_code: int, user_token: Optional[str] = None) -> QuizStateChange:
+        # read by the listeners once a change is published, the player's record only if it was changed
+        snapshot = await self._state_update_manager.read_and_update_quiz_state_async(quiz_code, user_token=user_token)
+        user = snapshot.quiz_players.players.get(user_token) if user_token else None
+        return self._state_update_manager.build_state_change(snapshot.q_state, snapshot.quiz_players, user)
+
+    def apply_due_transitions(self) -> List[int]:
+        return self._state_update_manager.apply_due_transitions(QuizConstants.TRANSITIONS_BATCH_SIZE)
+
+    async def apply_due_transitions_async(self) -> List[int]:
+        return await self._state_update_manager.apply_due_transitions_async(QuizConstants.TRANSITIONS_BATCH_SIZE)
+
+    async def subscribe_state_changes_async(self, quiz_code: int) -> PubSub:
+        return await self._async_state_repo.subscribe_state_changes(quiz_code)
+
+    def get_quiz_results(self, quiz_code: int) -> Optional[Tuple[QuizResults, QuizData]]:
+        results = self._state_repo.read_quiz_results(quiz_code)
+        if not results:
+            return None
+        return results, self._catalog.get_quiz(results.quiz_id, results.quiz_version)
+
+    async def get_quiz_results_async(self, quiz_code: int) -> Optional[Tuple[QuizResults, QuizData]]:
+        results = await self._async_state_repo.read_quiz_results(quiz_code)
+        if not results:
+            return None
+        return results, self._catalog.get_quiz(results.quiz_id, results.quiz_version)
+
+    def get_quiz_leaderboard(self, request_data: QuizLeaderboardRequest) -> QuizLeaderboard:
+        top_players, user = self._state_repo.read_leaderboard(
+            request_data.quiz_code, self._leaderboard_size(request_data), request_data.user_token)
+        return self._build_leaderboard(request_data.quiz_code, top_players, user)
+
+    async def get_quiz_leaderboard_async(self, request_data: QuizLeaderboardRequest) -> QuizLeaderboard:
+        top_players, user = await self._async_state_repo.read_leaderboard(
+            request_data.quiz_code, self._leaderboard_size(request_data), request_data.user_token)
+        return self._build_leaderboard(request_data.quiz_code, top_players, user)
+
+    def _create_quiz(self, request_data: QuizStartRequest) -> QuizState:
         expires = get_utc_now_time() + datetime.timedelta(
             seconds=QuizConstants.PENDING_QUIZ_EXPIRATION_SECONDS)
-        quizes = [q for q in self._quizes if q.id == request_data.topic_id]
-        if not quizes:
-            raise Exception(f"Quiz #{request_data.topic_id} wasn't found out of "
-                            f"{self._quizes} quizes")
-        quiz = quizes[0]
+        quiz_entry = self._catalog.get_entry(request_data.topic_id)
         q_state = QuizState(
-            id=quiz.id,
-            name=quiz.name,
-            quiz_code=random.randint(0, 100000),
+            id=quiz_entry.quiz.id,
+            name=quiz_entry.quiz.name,
+            # assigned by the code allocator when the quiz is stored
+            quiz_code=-1,
             status=QuizStatusCode.PENDING,
             expires=expires,
             question_seconds=request_data.question_seconds,
-            updates_in_seconds=QuizConstants.PENDING_QUIZ_EXPIRATION_SECONDS
-        )
-        self._state_repo.set_state(q_state, QuizConstants.PENDING_QUIZ_EXPIRATION_SECONDS)
-        quiz_players = QuizPlayers(
-            players=[
-                QuizPlayer(
-                    user_token=str(uuid.uuid4()),
-                    name=request_data.user_name,
-                    user_role=QuizUserRole.COMMANDER,
-                    answers=[]
-                )
-            ]
-        )
-        self._state_repo.set_quiz_players(
-            q_state.quiz_code, quiz_players, QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS)
-        user_quiz_state = UserQuizState(
-            state=q_state,
-            user=quiz_players.players[0],
-            all_user_names=[p.name for p in quiz_players.players]
+            updates_in_seconds=QuizConstants.PENDING_QUIZ_EXPIRATION_SECONDS,
+            quiz_version=quiz_entry.version
         )
-        return user_quiz_state
+        return q_state
 
-    def join_quiz(self, request_data: QuizJoinRequest) -> UserQuizState:
-        if not request_data.user_name:
-            raise Exception("User name cannot be empty")
-        q_state, quiz_players = self._state_update_manager.read_and_update_quiz_state(
-            request_data.quiz_code)
-        if request_data.user_name in {u.name for u in quiz_players.players}:
-            raise Exception(f"User name '{request_data.user_name}' is already occupied")
-        quiz_players.players.append(
-            QuizPlayer(
-                user_token=str(uuid.uuid4()),
-                name=request_data.user_name,
-                user_role=QuizUserRole.PLAYER,
-                answers=[]
-            )
-        )
-        self._state_repo.set_quiz_players(
-            q_state.quiz_code, quiz_players, QuizConstants.PENDING_QUIZ_EXPIRATION_SECONDS)
-        user_quiz_state = UserQuizState(
-            state=q_state,
-            user=quiz_players.players[-1],
-            all_user_names=[p.name for p in quiz_players.players]
+    @staticmethod
+    def _add_player(quiz_players: QuizPlayerIndex, user_name: str, user_role: QuizUserRole,
+                    join_index: Optional[int]) -> QuizPlayerRecord:
+        # the joining index is None when the name was claimed by another player
+        if join_index is None:
+            raise Exception(f"User name '{user_name}' is already occupied")
+        player = QuizPlayerRecord(
+            user_token=str(uuid.uuid4()),
+            name=user_name,
+            user_role=user_role,
+            join_index=join_index
         )
-        return user_quiz_state
+        quiz_players.names.append(user_name)
+        quiz_players.players[player.user_token] = player
+        return player
 
-    def get_quiz_status(self, request_data: QuizStatusRequest) -> UserQuizState:
-        q_state, quiz_players = self._state_update_manager.read_and_update_quiz_state(
-            request_data.quiz_code)
-        current_users = [u for u in quiz_players.players if u.user_token == request_data.user_token]
-        if not current_users:
+    @staticmethod
+    def _find_user(quiz_players: QuizPlayerIndex, user_token: str) -> QuizPlayerRecord:
+        user = quiz_players.players.get(user_token)
+        if not user:
             raise Exception("User token not found among the quiz users")
-        user_quiz_state = UserQuizState(
-            state=q_state,
-            user=current_users[0],
-            all_user_names=[p.name for p in quiz_players.players]
-        )
-
-        return user_quiz_state
+        return user
 
-    def store_answer(self, request_data: StoreAnswerRequest) -> UserQuizState:
-        answer_time = get_utc_now_time()
-        q_state, quiz_players = self._state_update_manager.read_and_update_quiz_state(
-            request_data.quiz_code)
+    def _apply_answer(self, q_state: QuizState, quiz_players: QuizPlayerIndex,
+                      request_data: StoreAnswerRequest, answer_time: datetime.datetime
+                      ) -> Tuple[QuizPlayerRecord, QuizPlayerScore]:
         if q_state.status != QuizStatusCode.STARTED:
             raise Exception(f"Quiz {request_data.quiz_code} is in {q_state.status} status")
 
-        current_users = [u for u in quiz_players.players if u.user_token == request_data.user_token]
-        if not current_users:
-            raise Exception("User token not found among the quiz users")
-
-        if q_state.status == QuizStatusCode.FINISHED:
-            raise Exception("Quiz is already finished, no more answers are allowed")
+        user = self._find_user(quiz_players, request_data.user_token)
 
         if request_data.question_index != q_state.cur_question_index[0]:
             raise Exception(f"Current question index is {q_state.cur_question_index}, "
                             f"but the answer was given on the question {request_data.question_index}")
 
         # initiate answers with empty values
-        quiz_data = [q for q in self._quizes if q.id == q_state.id][0]
-        if not current_users[0].answers:
-            current_users[0].answers = [QuizPlayerAnswer(
-                answer=[], answer_given_seconds=q_state.question_seconds)] * len(quiz_data.questions)
+        quiz_entry = self._catalog.get_entry(q_state.id, q_state.quiz_version)
+        if not user.answers:
+            user.answers = QuizAnswerSheet.unanswered(quiz_entry.question_count, q_state.question_seconds * 10)
 
-        # check how much time passed since question was revealed
+        # check how much time passed since question was revealed, in deciseconds
         seconds_since_started = (answer_time - q_state.starts_at).total_seconds()
-        time_passed = round(seconds_since_started % q_state.question_seconds)
-        current_users[0].answers[request_data.question_index] = QuizPlayerAnswer(
-            answer=request_data.answer, answer_given_seconds=time_passed)
+        time_passed = round(seconds_since_started % q_state.question_seconds * 10)
+        user.answers.set_answer(request_data.question_index, request_data.answer, time_passed)
+        return user, self._scoring_engine.score_answers(quiz_entry, user.answers)
 
-        # store the updated answers
-        self._state_repo.set_quiz_players(
-            request_data.quiz_code, quiz_players,
-            QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS)
-        # return the updated state
-        user_quiz_state = UserQuizState(
-            state=q_state,
-            user=current_users[0],
-            all_user_names=[p.name for p in quiz_players.players]
-        )
-        return user_quiz_state
-
-    def schedule_quiz(self, request_data: ScheduleQuizRequest) -> UserQuizState:
-        q_state, quiz_players = self._state_repo.read_quiz_state(
-            request_data.quiz_code)
-        current_users = [u for u in quiz_players.players if u.user_token == request_data.user_token]
-        if not current_users:
-            raise Exception(f"User token not found among the quiz users")
-        if current_users[0].user_role != QuizUserRole.COMMANDER:
+    def _apply_schedule(self, q_state: QuizState, quiz_players: QuizPlayerIndex,
+                        request_data: ScheduleQuizRequest) -> QuizPlayerRecord:
+        user = self._find_user(quiz_players, request_data.user_token)
+        if user.user_role != QuizUserRole.COMMANDER:
             raise Exception("Current user is not a quiz commander")
         # update the state
         q_state.status = QuizStatusCode.SCHEDULED
         q_state.starts_at = get_utc_now_time() + datetime.timedelta(
             seconds=request_data.delay_seconds)
         q_state.updates_in_seconds = request_data.delay_seconds
+        return user
+
+    @staticmethod
+    def _mark_scheduled(snapshot: QuizStateSnapshot, request_data: ScheduleQuizRequest,
+                        state_json: Optional[bytes]) -> None:
+        # the state_json of the compare-and-set, None if the state was changed since it was read
+        if not state_json:
+            raise Exception(f"Quiz #{request_data.quiz_code} was changed while scheduling it")
+        snapshot.mark_state_stored(state_json)
+
+    def _leaderboard_score(self, score: QuizPlayerScore, join_index: int) -> int:
+        return self._scoring_engine.to_leaderboard_score(score, join_index)
 
-        self._state_repo.set_state(
-            q_state, QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS + request_data.delay_seconds)
-        user_quiz_state = UserQuizState(
-            state=q_state,
-            user=current_users[0],
-            all_user_names=[p.name for p in quiz_players.players]
+    @staticmethod
+    def _leaderboard_size(request_data: QuizLeaderboardRequest) -> int:
+        return min(max(request_data.top, 1), QuizConstants.LEADERBOARD_MAX_SIZE)
+
+    def _build_leaderboard(self, quiz_code: int, top_players: List[Tuple[str, float]],
+                           user: Optional[Tuple[str, int, float]]) -> QuizLeaderboard:
+        def build_player(rank: int, name: str, leaderboard_score: float) -> QuizLeaderboardPlayer:
+            score, _ = self._scoring_engine.from_leaderboard_score(leaderboard_score)
+            return QuizLeaderboardPlayer(
+                rank=rank + 1,
+                name=name,
+                correct_answers=score.correct_answers,
+                total_answering_time=score.total_answering_time
+            )
+        return QuizLeaderboard(
+            quiz_code=quiz_code,
+            players=[build_player(rank, name, score) for rank, (name, score) in enumerate(top_players)],
+            user=build_player(user[1], user[0], user[2]) if user else None
         )
-        return user_quiz_state
 
-    def get_quiz_results(self, quiz_code: int) -> Optional[Tuple[QuizResults, QuizData]]:
-        results = self._state_repo.read_quiz_results(quiz_code)
-        if not results:
-            return None
-        quiz_data = [q for q in self._quizes if q.id == results.quiz_id][0]
-        return results, quiz_data
+    def _build_user_quiz_state(self, snapshot: QuizStateSnapshot, user: QuizPlayerRecord) -> UserQuizState:
+        return UserQuizState(
+            state=self._state_update_manager.public_state(snapshot.q_state),
+            user=user.to_player(),
+            all_user_names=snapshot.quiz_players.names,
+            version=snapshot.versions.version
+        )
+
+    def _build_quiz_status(self, snapshot: QuizStateSnapshot, request_data: QuizStatusRequest
+                           ) -> Union[UserQuizState, UserQuizStateDelta]:
+        user = self._find_user(snapshot.quiz_players, request_data.user_token)
+        versions = snapshot.versions
+        # a version from the future belongs to an expired quiz the code was taken from
+        if request_data.version is None or request_data.version > versions.version:
+            return self._build_user_quiz_state(snapshot, user)
+        # only the parts changed after the client's version are encoded
+        since = request_data.version
+        state_changed = versions.state > since
+        user_changed = versions.player(user.user_token) > since
+        names_changed = versions.names > since
+        return UserQuizStateDelta(
+            version=versions.version,
+            modified=state_changed or user_changed or names_changed,
+            state=self._state_update_manager.public_state(snapshot.q_state) if state_changed else None,
+            user=user.to_player() if user_changed else None,
+            all_user_names=snapshot.quiz_players.names if names_changed else None
+        )
 
 
 quiz_manager = QuizManager()
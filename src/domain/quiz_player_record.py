@@ -0,0 +1,120 @@
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+
+from domain.quiz_state import QuizPlayer, QuizPlayerAnswer, QuizUserRole
+
+# an answer option is a bit of the mask, so a question can have at most that many options
+MAX_ANSWER_OPTIONS = 32
+# the answering time is kept in deciseconds as an unsigned short
+MAX_ANSWER_DECISECONDS = 0xFFFF
+
+
+class QuizAnswerSheet:
+    # the answers of a player as two fixed-width arrays indexed by the question: the chosen options
+    # as a bitmask and the answering time in deciseconds, the JSON form is only built for the API
+    __slots__ = ("masks", "times")
+
+    def __init__(self, masks: Optional[array] = None, times: Optional[array] = None):
+        self.masks = masks if masks is not None else array("I")
+        self.times = times if times is not None else array("H")
+
+    def __len__(self) -> int:
+        return len(self.masks)
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, QuizAnswerSheet) and self.masks == other.masks and self.times == other.times
+
+    def __repr__(self) -> str:
+        return f"QuizAnswerSheet(masks={self.masks.tolist()}, times={self.times.tolist()})"
+
+    @staticmethod
+    def unanswered(question_count: int, deciseconds: int) -> "QuizAnswerSheet":
+        # no options chosen, an unanswered question counts as the whole question time
+        return QuizAnswerSheet(array("I", [0]) * question_count,
+                               array("H", [min(deciseconds, MAX_ANSWER_DECISECONDS)]) * question_count)
+
+    def set_answer(self, question_index: int, answer: Iterable[int], deciseconds: int) -> None:
+        self.masks[question_index] = self.to_mask(answer)
+        self.times[question_index] = min(max(deciseconds, 0), MAX_ANSWER_DECISECONDS)
+
+    @staticmethod
+    def to_mask(answer: Iterable[int]) -> int:
+        mask = 0
+        for option in answer:
+            if not 0 <= option < MAX_ANSWER_OPTIONS:
+                raise Exception(f"Answer option {option} is out of range")
+            mask |= 1 << option
+        return mask
+
+    @staticmethod
+    def from_mask(mask: int) -> List[int]:
+        return [option for option in range(mask.bit_length()) if mask >> option & 1]
+
+    def to_answers(self) -> List[QuizPlayerAnswer]:
+        return [
+            QuizPlayerAnswer(answer=self.from_mask(mask), answer_given_seconds=to_seconds(deciseconds))
+            for mask, deciseconds in zip(self.masks, self.times)
+        ]
+
+    @staticmethod
+    def from_answers(answers: List[QuizPlayerAnswer]) -> "QuizAnswerSheet":
+        return QuizAnswerSheet(
+            array("I", (QuizAnswerSheet.to_mask(a.answer) for a in answers)),
+            array("H", (min(max(round(a.answer_given_seconds * 10), 0), MAX_ANSWER_DECISECONDS) for a in answers))
+        )
+
+
+class QuizPlayerRecord:
+    # the player as it's kept in Redis and handled by the domain, QuizPlayer is its API form
+    __slots__ = ("user_token", "name", "user_role", "join_index", "answers")
+
+    def __init__(self, user_token: str, name: str, user_role: QuizUserRole, join_index: int = 0,
+                 answers: Optional[QuizAnswerSheet] = None):
+        self.user_token = user_token
+        self.name = name
+        self.user_role = user_role
+        # position in the joining order, it breaks the ties in the ranking
+        self.join_index = join_index
+        self.answers = answers if answers is not None else QuizAnswerSheet()
+
+    def __eq__(self, other: Any) -> bool:
+        return isinstance(other, QuizPlayerRecord) and self.to_json_value() == other.to_json_value()
+
+    def to_player(self) -> QuizPlayer:
+        return QuizPlayer(
+            user_token=self.user_token,
+            name=self.name,
+            user_role=self.user_role,
+            answers=self.answers.to_answers(),
+            join_index=self.join_index
+        )
+
+    def to_json_value(self) -> Dict[str, Any]:
+        return {
+            "user_token": self.user_token,
+            "name": self.name,
+            "user_role": self.user_role.value,
+            "join_index": self.join_index,
+            "answer_masks": self.answers.masks.tolist(),
+            "answer_times": self.answers.times.tolist()
+        }
+
+    @staticmethod
+    def from_json_value(data: Dict[str, Any]) -> "QuizPlayerRecord":
+        if "answers" in data:
+            # stored before the answers were packed
+            answers = QuizAnswerSheet.from_answers([QuizPlayerAnswer.from_dict(a) for a in data["answers"]])
+        else:
+            answers = QuizAnswerSheet(array("I", data["answer_masks"]), array("H", data["answer_times"]))
+        return QuizPlayerRecord(
+            user_token=data["user_token"],
+            name=data["name"],
+            user_role=QuizUserRole(data["user_role"]),
+            join_index=data.get("join_index", 0),
+            answers=answers
+        )
+
+
+def to_seconds(deciseconds: int) -> float:
+    # whole seconds stay integers in the JSON, as they were before the times were kept in deciseconds
+    return deciseconds // 10 if deciseconds % 10 == 0 else deciseconds / 10
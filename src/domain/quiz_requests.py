@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List
+from typing import Any, Dict, List, Optional
 
 from dataclasses_json import dataclass_json
 
@@ -24,6 +24,8 @@ class QuizJoinRequest:
 class QuizStatusRequest:
     quiz_code: int
     user_token: str
+    # the version of the last status received, only the changes are returned if it's set
+    version: Optional[int] = None
 
 
 @dataclass_json
@@ -41,3 +43,24 @@ class StoreAnswerRequest:
     user_token: str
     question_index: int
     answer: List[int]
+
+
+@dataclass_json
+@dataclass
+class QuizLeaderboardRequest:
+    quiz_code: int
+    user_token: Optional[str] = None
+    top: int = 10
+
+
+@dataclass_json
+@dataclass
+class QuizBatchOperation:
+    requested_operation: str
+    payload: Optional[Dict[str, Any]] = None
+
+
+@dataclass_json
+@dataclass
+class QuizBatchRequest:
+    operations: List[QuizBatchOperation]
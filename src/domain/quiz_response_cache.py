@@ -0,0 +1,87 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from domain.quiz_codec import codec
+from domain.quiz_data import QuizData
+from domain.quiz_manager import QuizManager, quiz_manager
+from domain.quiz_state import QuizResults, QuizResultsAndData
+from domain.quiz_topic import QuizTopic
+from settings import settings
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    body: bytes
+    etag: str
+
+    @staticmethod
+    def from_body(body: bytes) -> "CachedResponse":
+        # a strong ETag, the same bytes are produced by every worker
+        return CachedResponse(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+
+class QuizResponseCache:
+    # keeps the encoded responses that only change with the catalog (topics) or never change
+    # once stored (results), so they are neither re-read from Redis nor re-encoded
+    def __init__(self, manager: QuizManager, results_cache_size: int, results_cache_seconds: int):
+        self._manager = manager
+        self._topics: Tuple[Optional[List[QuizTopic]], Optional[CachedResponse]] = None, None
+        self._results_cache_size = max(results_cache_size, 1)
+        self._results_cache_seconds = results_cache_seconds
+        # quiz code -> response, time it was cached
+        self._results: "OrderedDict[int, Tuple[CachedResponse, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_topics(self) -> CachedResponse:
+        # a catalog refresh replaces the topics list, so the list itself identifies the catalog version
+        topics = self._manager.get_quiz_topics()
+        cached_topics, response = self._topics
+        if cached_topics is not topics:
+            response = CachedResponse.from_body(codec.encode_response(topics))
+            self._topics = topics, response
+        return response
+
+    def get_quiz_results(self, quiz_code: int) -> Optional[CachedResponse]:
+        response = self._get_cached_results(quiz_code)
+        if response is None:
+            response = self._cache_results(quiz_code, self._manager.get_quiz_results(quiz_code))
+        return response
+
+    async def get_quiz_results_async(self, quiz_code: int) -> Optional[CachedResponse]:
+        response = self._get_cached_results(quiz_code)
+        if response is None:
+            response = self._cache_results(quiz_code, await self._manager.get_quiz_results_async(quiz_code))
+        return response
+
+    def _get_cached_results(self, quiz_code: int) -> Optional[CachedResponse]:
+        with self._lock:
+            cached = self._results.get(quiz_code)
+            if cached is None:
+                return None
+            if time.monotonic() - cached[1] >= self._results_cache_seconds:
+                # the stored results expire as well, a new quiz may get the same code
+                del self._results[quiz_code]
+                return None
+            self._results.move_to_end(quiz_code)
+            return cached[0]
+
+    def _cache_results(self, quiz_code: int, results: Optional[Tuple[QuizResults, QuizData]]
+                       ) -> Optional[CachedResponse]:
+        # the quizes that aren't finished yet are not cached
+        if not results:
+            return None
+        response = CachedResponse.from_body(codec.encode_response(
+            QuizResultsAndData(quiz_results=results[0], quiz_data=results[1])))
+        with self._lock:
+            self._results[quiz_code] = response, time.monotonic()
+            self._results.move_to_end(quiz_code)
+            while len(self._results) > self._results_cache_size:
+                self._results.popitem(last=False)
+        return response
+
+
+quiz_response_cache = QuizResponseCache(quiz_manager, settings.results_cache_size, settings.results_cache_seconds)
@@ -0,0 +1,65 @@
+from typing import List, Sequence, Tuple
+
+from domain.quiz_catalog import QuizCatalogEntry
+from domain.quiz_player_record import QuizAnswerSheet, to_seconds
+from domain.quiz_state import QuizPlayerScore
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - numpy is only needed for the batch ranking
+    numpy = None
+
+# the leaderboard score packs the correct answers, the answering time in deciseconds and the joining order
+# into a single integer (exact as a Redis double up to 2^53) ordered the same way as the final ranking
+LEADERBOARD_TIME_BITS = 24
+LEADERBOARD_JOIN_BITS = 20
+
+
+class QuizScoringEngine:
+    # the players' totals are updated every time an answer is stored,
+    # so finishing a quiz only has to rank them
+    def __init__(self, batch_threshold: int):
+        self._batch_threshold = batch_threshold
+
+    @staticmethod
+    def score_answers(quiz_entry: QuizCatalogEntry, answers: QuizAnswerSheet) -> QuizPlayerScore:
+        # total number of correct answers / total time spent answering
+        return QuizPlayerScore(
+            correct_answers=sum(1 for correct, mask in zip(quiz_entry.correct_answer_masks, answers.masks)
+                                if correct == mask),
+            total_answering_time=to_seconds(sum(answers.times[:quiz_entry.question_count]))
+        )
+
+    def rank(self, scores: Sequence[QuizPlayerScore]) -> List[int]:
+        # indexes of the players from the best to the worst: more correct answers first,
+        # then less time spent, the players joined earlier win the ties
+        if numpy is not None and len(scores) >= self._batch_threshold:
+            return self._rank_batch(scores)
+        ranking = list(range(len(scores)))
+        ranking.sort(key=lambda i: (scores[i].correct_answers, -scores[i].total_answering_time), reverse=True)
+        return ranking
+
+    @staticmethod
+    def to_leaderboard_score(score: QuizPlayerScore, join_index: int) -> int:
+        # the lower the better, so the ranks are read in ascending order
+        value = (-score.correct_answers << LEADERBOARD_TIME_BITS) + round(score.total_answering_time * 10)
+        return (value << LEADERBOARD_JOIN_BITS) + join_index
+
+    @staticmethod
+    def from_leaderboard_score(value: float) -> Tuple[QuizPlayerScore, int]:
+        value = int(value)
+        join_index = value & ((1 << LEADERBOARD_JOIN_BITS) - 1)
+        value >>= LEADERBOARD_JOIN_BITS
+        answering_time = value & ((1 << LEADERBOARD_TIME_BITS) - 1)
+        return QuizPlayerScore(
+            correct_answers=-(value >> LEADERBOARD_TIME_BITS),
+            total_answering_time=to_seconds(answering_time)
+        ), join_index
+
+    @staticmethod
+    def _rank_batch(scores: Sequence[QuizPlayerScore]) -> List[int]:
+        correct_answers = numpy.fromiter((s.correct_answers for s in scores), dtype=numpy.int64, count=len(scores))
+        answering_time = numpy.fromiter(
+            (s.total_answering_time for s in scores), dtype=numpy.float64, count=len(scores))
+        # lexsort is stable and sorts by the last key first
+        return numpy.lexsort((answering_time, -correct_answers)).tolist()
@@ -33,22 +33,36 @@ class QuizState(QuizTopic):
     cur_question: Optional[QuizQuestion] = None
     cur_question_index: Tuple[int, int] = -1, 0
     updates_in_seconds: int = -1
+    # version of the quiz data the quiz was started with
+    quiz_version: Optional[str] = None
 
 
 @dataclass_json
 @dataclass
 class QuizPlayerAnswer:
     answer: List[int]
-    answer_given_seconds: int = -1
+    # tenths of a second are kept
+    answer_given_seconds: float = -1
 
 
 @dataclass_json
 @dataclass
 class QuizPlayer:
+    # the API form of QuizPlayerRecord
     user_token: str
     name: str
     user_role: QuizUserRole
     answers: List[QuizPlayerAnswer]
+    # position in the joining order, it breaks the ties in the ranking
+    join_index: int = 0
+
+
+@dataclass_json
+@dataclass
+class QuizPlayerScore:
+    # running totals of the player's answers, kept up to date as the answers are stored
+    correct_answers: int = 0
+    total_answering_time: float = 0
 
 
 @dataclass_json
@@ -57,6 +71,39 @@ class UserQuizState:
     state: QuizState
     user: QuizPlayer
     all_user_names: List[str]
+    # the quiz's change counter the response is built at, sent back to get the changes only
+    version: int = 0
+
+
+@dataclass_json
+@dataclass
+class UserQuizStateDelta:
+    version: int
+    # False if nothing changed since the version sent by the client
+    modified: bool
+    # only the parts changed since that version are set
+    state: Optional[QuizState] = None
+    user: Optional[QuizPlayer] = None
+    all_user_names: Optional[List[str]] = None
+
+
+@dataclass_json
+@dataclass
+class QuizStateChange:
+    state: QuizState
+    all_user_names: List[str]
+    # set when the change concerns only this player's record
+    user: Optional[QuizPlayer] = None
+
+
+@dataclass_json
+@dataclass
+class QuizStateNotice:
+    # published on every change instead of the changed state, so its size doesn't grow with the players,
+    # the listeners read the state themselves
+    status: QuizStatusCode
+    # set when the change concerns only this player's record
+    user_token: Optional[str] = None
 
 
 @dataclass_json
@@ -81,6 +128,25 @@ class QuizResults:
     quiz_name: str
     started_at: datetime
     players: List[QuizResultsPlayer]
+    quiz_version: Optional[str] = None
+
+
+@dataclass_json
+@dataclass
+class QuizLeaderboardPlayer:
+    rank: int
+    name: str
+    correct_answers: int
+    total_answering_time: float
+
+
+@dataclass_json
+@dataclass
+class QuizLeaderboard:
+    quiz_code: int
+    players: List[QuizLeaderboardPlayer]
+    # the requesting player, whether among the top players or not
+    user: Optional[QuizLeaderboardPlayer] = None
 
 
 @dataclass_json
@@ -1,73 +1,235 @@
-import copy
+import dataclasses
+import datetime
+import logging
 import math
-from typing import List, Tuple
+from typing import Dict, List, Optional
 
+from domain.quiz_catalog import QuizCatalog
 from domain.quiz_constants import QuizConstants
-from domain.quiz_data import QuizData
-from domain.quiz_state import QuizStatusCode, QuizState, QuizResults, QuizResultsPlayer, QuizPlayers
+from domain.quiz_scoring import QuizScoringEngine
+from domain.quiz_player_record import QuizPlayerRecord
+from domain.quiz_state import QuizStatusCode, QuizState, QuizResults, QuizResultsPlayer, QuizStateChange, \
+    QuizStateNotice, QuizPlayerScore
+from domain.repository.quiz_state_async_repository import AsyncQuizStateRepository
+from domain.repository.quiz_state_context import QuizStateContext, QuizPlayerIndex, QuizStateSnapshot
 from domain.repository.quiz_state_repository import QuizStateRepository
 from domain.time_utils import get_utc_now_time
+from settings import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(settings.log_level)
+
+# a transition is re-applied to the state written by a concurrent worker at most that many times
+TRANSITION_ATTEMPTS = 3
+# the results are computed once per quiz by the lock owner, the lock is released
+# when it expires, so another worker takes over if the owner failed to store the results
+RESULTS_LOCK_SECONDS = 30
 
 
 class QuizStateUpdateManager:
-    def __init__(self, state_repo: QuizStateRepository, quizes: List[QuizData]):
+    def __init__(self, state_repo: QuizStateRepository, async_state_repo: AsyncQuizStateRepository,
+                 catalog: QuizCatalog, scoring_engine: QuizScoringEngine):
         self._state_repo = state_repo
-        self._quizes = quizes
+        self._async_state_repo = async_state_repo
+        self._catalog = catalog
+        self._scoring_engine = scoring_engine
+
+    def public_state(self, q_state: QuizState) -> QuizState:
+        # only the question index is stored, the client-safe question is taken from the catalog
+        question_index, question_count = q_state.cur_question_index
+        if not 0 <= question_index < question_count:
+            return q_state
+        quiz_entry = self._catalog.get_entry(q_state.id, q_state.quiz_version)
+        return dataclasses.replace(q_state, cur_question=quiz_entry.public_questions[question_index])
+
+    def build_state_change(self, q_state: QuizState, quiz_players: QuizPlayerIndex,
+                           user: Optional[QuizPlayerRecord] = None) -> QuizStateChange:
+        return QuizStateChange(
+            state=self.public_state(q_state),
+            all_user_names=quiz_players.names,
+            user=user.to_player() if user else None
+        )
+
+    def read_and_update_quiz_state(self, quiz_code: int, context: Optional[QuizStateContext] = None,
+                                   user_token: Optional[str] = None
+                                   ) -> QuizStateSnapshot:
+        if settings.transition_scheduler:
+            # the scheduler stores the transitions, the readers only apply them to their own copy
+            snapshot = self._state_repo.read_quiz_snapshot(quiz_code, context, user_token)
+            if self._update_quiz_state(snapshot.q_state):
+                # not stored yet, so the stored version doesn't tell the change
+                snapshot.versions.mark_state_changed()
+            return snapshot
+        return self.apply_transitions(quiz_code, context, user_token)
+
+    async def read_and_update_quiz_state_async(self, quiz_code: int, context: Optional[QuizStateContext] = None,
+                                               user_token: Optional[str] = None
+                                               ) -> QuizStateSnapshot:
+        if settings.transition_scheduler:
+            snapshot = await self._async_state_repo.read_quiz_snapshot(quiz_code, context, user_token)
+            if self._update_quiz_state(snapshot.q_state):
+                snapshot.versions.mark_state_changed()
+            return snapshot
+        return await self.apply_transitions_async(quiz_code, context, user_token)
+
+    def apply_due_transitions(self, limit: int) -> List[int]:
+        quiz_codes = self._state_repo.claim_due_transitions(
+            get_utc_now_time(), limit, QuizConstants.TRANSITION_LEASE_SECONDS)
+        if not quiz_codes:
+            return quiz_codes
+        # the claimed quizes are read within a single round trip, the expired ones are left out
+        context = QuizStateContext()
+        self._state_repo.prefetch_quiz_snapshots({quiz_code: [] for quiz_code in quiz_codes}, context)
+        for quiz_code in quiz_codes:
+            try:
+                if context.get(quiz_code):
+                    self.apply_transitions(quiz_code, context)
+                else:
+                    self._state_repo.remove_transition(quiz_code)
+            except Exception as e:
+                # the transition stays leased, so it's retried once the lease is over
+                logger.warning("Quiz #%s transition failed, retrying in %s seconds: %s",
+                               quiz_code, QuizConstants.TRANSITION_LEASE_SECONDS, e)
+        return quiz_codes
+
+    async def apply_due_transitions_async(self, limit: int) -> List[int]:
+        quiz_codes = await self._async_state_repo.claim_due_transitions(
+            get_utc_now_time(), limit, QuizConstants.TRANSITION_LEASE_SECONDS)
+        if not quiz_codes:
+            return quiz_codes
+        context = QuizStateContext()
+        await self._async_state_repo.prefetch_quiz_snapshots({quiz_code: [] for quiz_code in quiz_codes}, context)
+        for quiz_code in quiz_codes:
+            try:
+                if context.get(quiz_code):
+                    await self.apply_transitions_async(quiz_code, context)
+                else:
+                    await self._async_state_repo.remove_transition(quiz_code)
+            except Exception as e:
+                logger.warning("Quiz #%s transition failed, retrying in %s seconds: %s",
+                               quiz_code, QuizConstants.TRANSITION_LEASE_SECONDS, e)
+        return quiz_codes
 
-    def read_and_update_quiz_state(self, quiz_code: int) -> Tuple[QuizState, QuizPlayers]:
-        q_state, quiz_players = self._state_repo.read_quiz_state(quiz_code)
-        self._update_quiz_state(q_state)
-        return q_state, quiz_players
+    def schedule_next_transition(self, q_state: QuizState) -> None:
+        due = self._next_transition_time(q_state)
+        if due:
+            self._state_repo.schedule_transition(q_state.quiz_code, due)
 
-    def _finish_quiz(self, q_state: QuizState) -> None:
-        if q_state == QuizStatusCode.FINISHED:
-            return
-        q_state.status = QuizStatusCode.FINISHED
+    async def schedule_next_transition_async(self, q_state: QuizState) -> None:
+        due = self._next_transition_time(q_state)
+        if due:
+            await self._async_state_repo.schedule_transition(q_state.quiz_code, due)
 
+    def release_transition(self, q_state: QuizState) -> None:
+        # the claimed transition is replaced by the next one or removed if there is none
+        due = self._next_transition_time(q_state)
+        if due:
+            self._state_repo.schedule_transition(q_state.quiz_code, due)
+        else:
+            self._state_repo.remove_transition(q_state.quiz_code)
+
+    async def release_transition_async(self, q_state: QuizState) -> None:
+        due = self._next_transition_time(q_state)
+        if due:
+            await self._async_state_repo.schedule_transition(q_state.quiz_code, due)
+        else:
+            await self._async_state_repo.remove_transition(q_state.quiz_code)
+
+    def apply_transitions(self, quiz_code: int, context: Optional[QuizStateContext] = None,
+                          user_token: Optional[str] = None
+                          ) -> QuizStateSnapshot:
+        snapshot = self._state_repo.read_quiz_snapshot(quiz_code, context, user_token)
+        for _ in range(TRANSITION_ATTEMPTS):
+            if not self._update_quiz_state(snapshot.q_state):
+                break
+            state_json = self._state_repo.compare_and_set_state(
+                snapshot.q_state, snapshot.state_json, QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS)
+            if state_json:
+                snapshot.mark_state_stored(state_json)
+                self._state_repo.publish_state_change(quiz_code, QuizStateNotice(snapshot.q_state.status))
+                break
+            # another worker has applied the transition first, its state is read again
+            snapshot = self._state_repo.read_quiz_snapshot(quiz_code, user_token=user_token)
+            if context:
+                context.put(quiz_code, snapshot)
+        q_state = snapshot.q_state
+        if self._needs_results(snapshot) and self._state_repo.lock_quiz_results(quiz_code, RESULTS_LOCK_SECONDS):
+            quiz_results = self._build_quiz_results(
+                q_state, self._state_repo.read_quiz_players(quiz_code), self._state_repo.read_player_scores(quiz_code))
+            self._state_repo.set_quiz_result(quiz_code, quiz_results, QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS)
+            snapshot.has_results = True
+        if settings.transition_scheduler:
+            self.release_transition(q_state)
+        return snapshot
+
+    async def apply_transitions_async(self, quiz_code: int, context: Optional[QuizStateContext] = None,
+                                      user_token: Optional[str] = None
+                                      ) -> QuizStateSnapshot:
+        snapshot = await self._async_state_repo.read_quiz_snapshot(quiz_code, context, user_token)
+        for _ in range(TRANSITION_ATTEMPTS):
+            if not self._update_quiz_state(snapshot.q_state):
+                break
+            state_json = await self._async_state_repo.compare_and_set_state(
+                snapshot.q_state, snapshot.state_json, QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS)
+            if state_json:
+                snapshot.mark_state_stored(state_json)
+                await self._async_state_repo.publish_state_change(quiz_code, QuizStateNotice(snapshot.q_state.status))
+                break
+            # another worker has applied the transition first, its state is read again
+            snapshot = await self._async_state_repo.read_quiz_snapshot(quiz_code, user_token=user_token)
+            if context:
+                context.put(quiz_code, snapshot)
+        q_state = snapshot.q_state
+        if self._needs_results(snapshot) \
+                and await self._async_state_repo.lock_quiz_results(quiz_code, RESULTS_LOCK_SECONDS):
+            quiz_results = self._build_quiz_results(
+                q_state, await self._async_state_repo.read_quiz_players(quiz_code),
+                await self._async_state_repo.read_player_scores(quiz_code))
+            await self._async_state_repo.set_quiz_result(
+                quiz_code, quiz_results, QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS)
+            snapshot.has_results = True
+        if settings.transition_scheduler:
+            await self.release_transition_async(q_state)
+        return snapshot
+
+    @staticmethod
+    def _needs_results(snapshot: QuizStateSnapshot) -> bool:
+        # a finished quiz's results are computed once, by the owner of the results lock
+        return snapshot.q_state.status == QuizStatusCode.FINISHED and not snapshot.has_results
+
+    def _build_quiz_results(self, q_state: QuizState, players: List[QuizPlayerRecord],
+                            player_scores: Dict[str, QuizPlayerScore]) -> QuizResults:
         # rank the quiz's users based on their answers
-        q_state.updates_in_seconds = QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS
-        self._state_repo.set_state(q_state, QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS)
-        players = self._state_repo.read_quiz_players(q_state.quiz_code)
-        quiz_data = [q for q in self._quizes if q.id == q_state.id][0]
-
-        # total number of correct answers / total time spent answering
-        players_scores: List[Tuple[int, float]] = [(0, 0)] * len(players.players)
-        for i, question in enumerate(quiz_data.questions):
-            sorted_answers = sorted(question.correct_answers)
-
-            for player_index, player in enumerate(players.players):
-                if i >= len(player.answers):
-                    continue
-                score = players_scores[player_index]
-                player_answers = sorted(player.answers[i].answer)
-                if sorted_answers == player_answers:
-                    score = score[0] + 1, score[1]
-                score = score[0], score[1] + player.answers[i].answer_given_seconds
-                players_scores[player_index] = score
-
-        player_score_index = [(i, score) for i, score in enumerate(players_scores)]
-        player_score_index.sort(key=lambda item: (item[1][0], -item[1][1]), reverse=True)
+        quiz_entry = self._catalog.get_entry(q_state.id, q_state.quiz_version)
+        quiz_data = quiz_entry.quiz
+
+        # the totals are stored with the answers, they are only computed for the players stored without them
+        scores = [
+            player_scores.get(player.user_token) or self._scoring_engine.score_answers(quiz_entry, player.answers)
+            for player in players
+        ]
 
         # summarize results
         results = QuizResults(
             quiz_id=quiz_data.id,
             quiz_name=quiz_data.name,
             started_at=q_state.starts_at,
-            players=[]
+            players=[],
+            quiz_version=q_state.quiz_version
         )
-        for index, score in player_score_index:
+        for index in self._scoring_engine.rank(scores):
             player_score = QuizResultsPlayer(
-                name=players.players[index].name,
-                correct_answers=score[0],
-                total_answering_time=score[1],
-                answers=players.players[index].answers
+                name=players[index].name,
+                correct_answers=scores[index].correct_answers,
+                total_answering_time=scores[index].total_answering_time,
+                answers=players[index].answers.to_answers()
             )
             results.players.append(player_score)
-        # save the score
-        self._state_repo.set_quiz_result(
-            q_state.quiz_code, results, QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS)
+        return results
 
-    def _update_quiz_state(self, quiz_state: QuizState) -> None:
+    def _update_quiz_state(self, quiz_state: QuizState) -> bool:
+        # applies the time based transitions to the state,
+        # returns True if the updated state has to be stored
         tm = get_utc_now_time()
 
         if quiz_state.status == QuizStatusCode.PENDING:
@@ -75,34 +237,50 @@ class QuizStateUpdateManager:
                 quiz_state.updates_in_seconds = math.ceil((quiz_state.expires - tm).total_seconds())
 
         if quiz_state.expires <= tm:
+            changed = quiz_state.status != QuizStatusCode.EXPIRED
             quiz_state.status = QuizStatusCode.EXPIRED
-            self._state_repo.set_state(quiz_state, QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS)
-            return
+            return changed
 
+        changed = False
         if quiz_state.status == QuizStatusCode.SCHEDULED:
             if quiz_state.starts_at > tm:
                 quiz_state.updates_in_seconds = math.ceil((quiz_state.starts_at - tm).total_seconds())
             elif quiz_state.starts_at <= tm:
                 quiz_state.status = QuizStatusCode.STARTED
-                self._state_repo.set_state(quiz_state, QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS)
+                changed = True
+
+        return self._check_and_update_running_quiz(quiz_state) or changed
 
-        self._check_and_update_running_quiz(quiz_state)
+    @staticmethod
+    def _next_transition_time(q_state: QuizState) -> Optional[datetime.datetime]:
+        # when _update_quiz_state changes the state next time
+        if q_state.status == QuizStatusCode.EXPIRED:
+            return None
+        if q_state.status == QuizStatusCode.SCHEDULED:
+            return min(q_state.expires, q_state.starts_at)
+        if q_state.status == QuizStatusCode.STARTED:
+            next_question_seconds = (q_state.cur_question_index[0] + 1) * q_state.question_seconds
+            return min(q_state.expires, q_state.starts_at + datetime.timedelta(seconds=next_question_seconds))
+        return q_state.expires
 
-    def _check_and_update_running_quiz(self, q_state: QuizState) -> None:
+    def _check_and_update_running_quiz(self, q_state: QuizState) -> bool:
         # if the quiz is started - check and update the current question
         # if we ran out of questions - stop the quiz
-        if q_state.status == QuizStatusCode.STARTED:
-            quiz_data = [q for q in self._quizes if q.id == q_state.id][0]
-            seconds_since_started = (get_utc_now_time() - q_state.starts_at).total_seconds()
-            question_index = math.floor(seconds_since_started / q_state.question_seconds)
-            # determine interval until next question
-            q_state.updates_in_seconds = q_state.question_seconds - \
-                                         math.floor(seconds_since_started % q_state.question_seconds)
-            if question_index >= len(quiz_data.questions):
-                self._finish_quiz(q_state)
-            else:
-                if q_state.cur_question_index[0] != question_index:
-                    q_state.cur_question_index = question_index, len(quiz_data.questions)
-                    q_state.cur_question = copy.deepcopy(quiz_data.questions[question_index])
-                    q_state.cur_question.correct_answers = []
-                    self._state_repo.set_state(q_state, QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS)
+        if q_state.status != QuizStatusCode.STARTED:
+            return False
+        quiz_entry = self._catalog.get_entry(q_state.id, q_state.quiz_version)
+        seconds_since_started = (get_utc_now_time() - q_state.starts_at).total_seconds()
+        question_index = math.floor(seconds_since_started / q_state.question_seconds)
+        # determine interval until next question
+        q_state.updates_in_seconds = q_state.question_seconds - \
+                                     math.floor(seconds_since_started % q_state.question_seconds)
+        if question_index >= quiz_entry.question_count:
+            q_state.status = QuizStatusCode.FINISHED
+            q_state.updates_in_seconds = QuizConstants.STARTED_QUIZ_EXPIRATION_SECONDS
+            return True
+        if q_state.cur_question_index[0] != question_index:
+            q_state.cur_question_index = question_index, quiz_entry.question_count
+            # the question itself isn't stored, see public_state()
+            q_state.cur_question = None
+            return True
+        return False
@@ -0,0 +1,44 @@
+import asyncio
+import logging
+from typing import Optional
+
+from domain.quiz_constants import QuizConstants
+from domain.quiz_manager import QuizManager, quiz_manager
+from settings import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(settings.log_level)
+
+
+class QuizTransitionScheduler:
+    # applies the due quiz transitions in the background, any number of processes can run it
+    # as every due quiz is claimed by one of them only
+    def __init__(self, manager: QuizManager):
+        self._manager = manager
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+    def start(self) -> None:
+        if self._task is None:
+            self._running = True
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._running = False
+            await self._task
+            self._task = None
+
+    async def _run(self) -> None:
+        while self._running:
+            try:
+                quiz_codes = await self._manager.apply_due_transitions_async()
+            except Exception as e:
+                logger.warning("Quiz transitions failed: %s", e)
+                quiz_codes = []
+            # a full batch means more transitions are likely due already
+            if len(quiz_codes) < QuizConstants.TRANSITIONS_BATCH_SIZE:
+                await asyncio.sleep(settings.transition_poll_seconds)
+
+
+quiz_transition_scheduler = QuizTransitionScheduler(quiz_manager)
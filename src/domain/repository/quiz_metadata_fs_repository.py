@@ -1,34 +1,97 @@
+import json
 import os
 import re
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 from domain.quiz_data import QuizData
+from domain.quiz_topic import QuizTopic
 from domain.repository.quiz_metadata_repository import QuizMetadataRepository
+from domain.repository.quiz_topics_index import TOPICS_INDEX_FILE, QuizTopicsIndexEntry, content_digest, \
+    decode_topics_index, encode_topics_index
 from settings import settings
 
 
 class QuizMetadataFsRepository(QuizMetadataRepository):
-    def read_quizes(self) -> List[QuizData]:
-        quizes: List[QuizData] = []
+    def read_quizes(self, quiz_versions: Optional[Dict[str, str]] = None) -> List[QuizData]:
+        # read "quiz_data.json"
+        return [self._read_quiz_from_path(dir_path, dir_name)
+                for dir_name, dir_path in self._quiz_dirs(quiz_versions)]
+
+    def read_topics(self, quiz_versions: Optional[Dict[str, str]] = None) -> List[QuizTopic]:
+        index_path = os.path.join(settings.quiz_path, TOPICS_INDEX_FILE)
+        index: Dict[str, QuizTopicsIndexEntry] = {}
+        index_mtime = 0
+        if os.path.isfile(index_path):
+            index_mtime = os.stat(index_path).st_mtime_ns
+            with open(index_path, "rb") as file:
+                index = decode_topics_index(file.read())
+        topics: List[QuizTopic] = []
+        for dir_name, dir_path in self._quiz_dirs(quiz_versions):
+            entry = index.get(dir_name)
+            # only a quiz changed after the index was written is read
+            if entry is not None and os.stat(os.path.join(dir_path, "quiz_data.json")).st_mtime_ns <= index_mtime:
+                topics.append(QuizTopic(id=dir_name, name=entry.name))
+                continue
+            json_data = self._read_quiz_json(dir_path)
+            topics.append(QuizTopic(id=dir_name, name=json.loads(json_data)["name"]))
+        return topics
+
+    # run by `make topics` before the quizes are uploaded, returns the number of the indexed quizes
+    def write_topics_index(self) -> int:
+        entries: Dict[str, QuizTopicsIndexEntry] = {}
+        for dir_name, dir_path in self._list_quiz_dirs():
+            with open(os.path.join(dir_path, "quiz_data.json"), "rb") as file:
+                contents = file.read()
+            entries[dir_name] = QuizTopicsIndexEntry(name=json.loads(contents)["name"],
+                                                     digest=content_digest(contents))
+        index_path = os.path.join(settings.quiz_path, TOPICS_INDEX_FILE)
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "wb") as file:
+            file.write(encode_topics_index(entries))
+        os.replace(tmp_path, index_path)
+        return len(entries)
+
+    def read_quiz_and_version(self, quiz_id: str) -> Tuple[QuizData, str]:
+        with open(os.path.join(settings.quiz_path, quiz_id, "quiz_data.json"), "r") as file:
+            version = self._file_version(os.fstat(file.fileno()))
+            json_data = file.read()
+        return self._build_quiz(json_data, quiz_id), version
+
+    def read_quiz_versions(self) -> Dict[str, str]:
+        versions: Dict[str, str] = {}
+        for dir_name, dir_path in self._list_quiz_dirs():
+            versions[dir_name] = self._file_version(os.stat(os.path.join(dir_path, "quiz_data.json")))
+        return versions
+
+    @staticmethod
+    def _file_version(stat: os.stat_result) -> str:
+        return f"{stat.st_mtime_ns}-{stat.st_size}"
+
+    def _quiz_dirs(self, quiz_versions: Optional[Dict[str, str]]) -> List[Tuple[str, str]]:
+        # the directories of the listed quizes, so the caller's listing isn't repeated
+        if quiz_versions is None:
+            return self._list_quiz_dirs()
+        return [(quiz_id, os.path.join(settings.quiz_path, quiz_id)) for quiz_id in quiz_versions]
+
+    def _list_quiz_dirs(self) -> List[Tuple[str, str]]:
         quiz_path = settings.quiz_path
         # list directories q01 ...
-        for dir_name, dir_path in [
+        return [
             (o, os.path.join(quiz_path, o)) for o in os.listdir(quiz_path)
-                if os.path.isdir(os.path.join(quiz_path, o))]:
-            if not re.match(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', dir_name):
-                continue
-            # read "quiz_data.json"
-            quizes.append(self._read_quiz_from_path(dir_path, dir_name))
-        return quizes
-
-    def _read_quiz_by_id(self, quiz_id: str) -> QuizData:
-        quiz_path = os.path.join(settings.quiz_path, quiz_id)
-        return self._read_quiz_from_path(quiz_path, quiz_id)
+            if os.path.isdir(os.path.join(quiz_path, o))
+            and re.match(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', o)
+        ]
 
     def _read_quiz_from_path(self, quiz_path: str, quiz_id: str) -> QuizData:
-        file_path = os.path.join(quiz_path, "quiz_data.json")
-        with open(file_path, "r") as file:
-            json_data = file.read()
+        return self._build_quiz(self._read_quiz_json(quiz_path), quiz_id)
+
+    @staticmethod
+    def _build_quiz(json_data: str, quiz_id: str) -> QuizData:
         quiz: QuizData = QuizData.from_json(json_data, infer_missing=True)
         quiz.id = quiz_id
         return quiz
+
+    def _read_quiz_json(self, quiz_path: str) -> str:
+        file_path = os.path.join(quiz_path, "quiz_data.json")
+        with open(file_path, "r") as file:
+            return file.read()
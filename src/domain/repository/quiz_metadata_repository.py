@@ -1,8 +1,22 @@
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 from domain.quiz_data import QuizData
+from domain.quiz_topic import QuizTopic
 
 
 class QuizMetadataRepository:
-    def read_quizes(self) -> List[QuizData]:
+    # the quizes of the given versions (see read_quiz_versions), so the caller's listing isn't repeated
+    def read_quizes(self, quiz_versions: Optional[Dict[str, str]] = None) -> List[QuizData]:
+        raise NotImplementedError()
+
+    # lightweight index of the available quizes, the questions aren't built
+    def read_topics(self, quiz_versions: Optional[Dict[str, str]] = None) -> List[QuizTopic]:
+        raise NotImplementedError()
+
+    # returns the version of the data that was read, the stored quiz may have changed since the versions were listed
+    def read_quiz_and_version(self, quiz_id: str) -> Tuple[QuizData, str]:
+        raise NotImplementedError()
+
+    # quiz id -> version of its data (modification time, ETag), cheap to read compared to the quizes
+    def read_quiz_versions(self) -> Dict[str, str]:
         raise NotImplementedError()
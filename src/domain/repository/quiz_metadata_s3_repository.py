@@ -1,31 +1,83 @@
+import json
+import logging
 import re
-from typing import List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
 import boto3
+from botocore.exceptions import ClientError
 
 from domain.quiz_data import QuizData
+from domain.quiz_topic import QuizTopic
 from domain.repository.quiz_metadata_repository import QuizMetadataRepository
+from domain.repository.quiz_topics_index import TOPICS_INDEX_FILE, decode_topics_index
 from settings import settings
 
+logger = logging.getLogger(__name__)
+logger.setLevel(settings.log_level)
+
 
 class QuizMetadataS3Repository(QuizMetadataRepository):
     def __init__(self):
         self.bucket_name = settings.storage_uri
         self.s3 = boto3.client('s3')
 
-    def read_quizes(self) -> List[QuizData]:
-        quizes: List[QuizData] = []
+    def read_quizes(self, quiz_versions: Optional[Dict[str, str]] = None) -> List[QuizData]:
+        quiz_ids = list(quiz_versions if quiz_versions is not None else self.read_quiz_versions())
+        # boto3 clients are thread safe, the objects are fetched concurrently
+        with ThreadPoolExecutor(max_workers=max(settings.s3_read_concurrency, 1)) as executor:
+            return list(executor.map(self._read_quiz_by_id, quiz_ids))
+
+    def read_topics(self, quiz_versions: Optional[Dict[str, str]] = None) -> List[QuizTopic]:
+        if quiz_versions is None:
+            quiz_versions = self.read_quiz_versions()
+        index = decode_topics_index(self._read_topics_index())
+        # the index is taken for the quizes whose ETag still matches its digest, the rest are read
+        topics: Dict[str, QuizTopic] = {
+            quiz_id: QuizTopic(id=quiz_id, name=index[quiz_id].name) for quiz_id, version in quiz_versions.items()
+            if quiz_id in index and index[quiz_id].digest == version
+        }
+        missing = [quiz_id for quiz_id in quiz_versions if quiz_id not in topics]
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(settings.s3_read_concurrency, 1)) as executor:
+                topics.update(zip(missing, executor.map(self._read_topic_by_id, missing)))
+        return [topics[quiz_id] for quiz_id in quiz_versions]
+
+    def read_quiz_and_version(self, quiz_id: str) -> Tuple[QuizData, str]:
+        quiz_data = self.s3.get_object(Bucket=self.bucket_name, Key=f"{quiz_id}/quiz_data.json")
+        return self._build_quiz_from_json_string(quiz_id, quiz_data['Body'].read()), quiz_data['ETag'].strip('"')
+
+    def read_quiz_versions(self) -> Dict[str, str]:
+        versions: Dict[str, str] = {}
+        # list_objects_v2 returns at most 1000 keys per call
+        paginator = self.s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket_name):
+            for obj in page.get('Contents', []):
+                quiz_id, _, file_name = obj['Key'].partition("/")
+                if file_name != "quiz_data.json" or not re.match(
+                        r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', quiz_id):
+                    continue
+                versions[quiz_id] = obj['ETag'].strip('"')
+        return versions
+
+    def _read_topics_index(self) -> Optional[bytes]:
+        try:
+            return self.s3.get_object(Bucket=self.bucket_name, Key=TOPICS_INDEX_FILE)['Body'].read()
+        except ClientError as e:
+            logger.info("Quiz topics index isn't available, the topics are read from the quizes: %s", e)
+            return None
+
+    def _read_topic_by_id(self, quiz_id: str) -> QuizTopic:
+        quiz_data_contents = self._read_quiz_json(quiz_id)
+        return QuizTopic(id=quiz_id, name=json.loads(quiz_data_contents)["name"])
 
-        response = self.s3.list_objects_v2(Bucket=self.bucket_name, Delimiter='/')
-        for subdir in response.get('CommonPrefixes', []):
-            quiz_id = subdir.get('Prefix').rstrip("/")
-            if not re.match(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', quiz_id):
-                continue
+    def _read_quiz_by_id(self, quiz_id: str) -> QuizData:
+        quiz_data_contents = self._read_quiz_json(quiz_id)
+        return self._build_quiz_from_json_string(quiz_id, quiz_data_contents)
 
-            quiz_data = self.s3.get_object(Bucket=self.bucket_name, Key=f"{quiz_id}/quiz_data.json")
-            quiz_data_contents = quiz_data['Body'].read()
-            quizes.append(self._build_quiz_from_json_string(quiz_id, quiz_data_contents))
-        return quizes
+    def _read_quiz_json(self, quiz_id: str) -> bytes:
+        quiz_data = self.s3.get_object(Bucket=self.bucket_name, Key=f"{quiz_id}/quiz_data.json")
+        return quiz_data['Body'].read()
 
     def _build_quiz_from_json_string(self, quiz_id: str, quiz_data_contents: str) -> QuizData:
         quiz: QuizData = QuizData.from_json(quiz_data_contents, infer_missing=True)
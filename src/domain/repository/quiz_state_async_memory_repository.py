@@ -0,0 +1,86 @@
+from datetime import datetime
+from typing import Optional, Dict, List, Tuple
+
+from domain.quiz_player_record import QuizPlayerRecord
+from domain.quiz_state import QuizState, QuizResults, QuizStateNotice, QuizPlayerScore
+from domain.repository.quiz_state_async_repository import AsyncQuizStateRepository
+from domain.repository.quiz_state_context import QuizStateContext, QuizStateSnapshot
+from domain.repository.quiz_state_keys import QuizStateKeys
+from domain.repository.quiz_state_memory_repository import QuizStateMemoryRepository
+from domain.repository.quiz_state_memory_store import QuizStateMemoryStore, QuizStateMemoryPubSub, \
+    quiz_state_memory_store
+
+
+class AsyncQuizStateMemoryRepository(AsyncQuizStateRepository):
+    # the in-memory calls never wait for I/O and hold a quiz lock for a few dictionary operations only,
+    # so they are made on the event loop directly
+    def __init__(self, store: Optional[QuizStateMemoryStore] = None):
+        self._store = store or quiz_state_memory_store
+        self._repo = QuizStateMemoryRepository(self._store)
+
+    async def set_state(self, q_state: QuizState, expiration_seconds: int) -> None:
+        self._repo.set_state(q_state, expiration_seconds)
+
+    async def create_state(self, q_state: QuizState, expiration_seconds: int) -> bool:
+        return self._repo.create_state(q_state, expiration_seconds)
+
+    async def claim_player_name(self, quiz_code: int, name: str, expiration_seconds: int) -> Optional[int]:
+        return self._repo.claim_player_name(quiz_code, name, expiration_seconds)
+
+    async def add_quiz_player(self, quiz_code: int, player: QuizPlayerRecord, leaderboard_score: int,
+                              expiration_seconds: int) -> None:
+        self._repo.add_quiz_player(quiz_code, player, leaderboard_score, expiration_seconds)
+
+    async def set_quiz_player(self, quiz_code: int, player: QuizPlayerRecord, score: QuizPlayerScore,
+                              leaderboard_score: int, expiration_seconds: int) -> None:
+        self._repo.set_quiz_player(quiz_code, player, score, leaderboard_score, expiration_seconds)
+
+    async def compare_and_set_state(self, q_state: QuizState, expected_json: bytes,
+                                    expiration_seconds: int) -> Optional[bytes]:
+        return self._repo.compare_and_set_state(q_state, expected_json, expiration_seconds)
+
+    async def lock_quiz_results(self, quiz_code: int, lock_seconds: int) -> bool:
+        return self._repo.lock_quiz_results(quiz_code, lock_seconds)
+
+    async def set_quiz_result(self, quiz_code: int, results: QuizResults, expiration_seconds: int) -> None:
+        self._repo.set_quiz_result(quiz_code, results, expiration_seconds)
+
+    async def schedule_transition(self, quiz_code: int, due: datetime) -> None:
+        self._repo.schedule_transition(quiz_code, due)
+
+    async def claim_due_transitions(self, now: datetime, limit: int, lease_seconds: float) -> List[int]:
+        return self._repo.claim_due_transitions(now, limit, lease_seconds)
+
+    async def remove_transition(self, quiz_code: int) -> None:
+        self._repo.remove_transition(quiz_code)
+
+    async def publish_state_change(self, quiz_code: int, notice: QuizStateNotice) -> None:
+        self._repo.publish_state_change(quiz_code, notice)
+
+    async def subscribe_state_changes(self, quiz_code: int) -> QuizStateMemoryPubSub:
+        pubsub = QuizStateMemoryPubSub(self._store)
+        await pubsub.subscribe(QuizStateKeys.events(quiz_code))
+        return pubsub
+
+    async def read_quiz_snapshot(self, quiz_code: int, context: Optional[QuizStateContext] = None,
+                                 user_token: Optional[str] = None) -> QuizStateSnapshot:
+        return self._repo.read_quiz_snapshot(quiz_code, context, user_token)
+
+    async def prefetch_quiz_snapshots(self, user_tokens: Dict[int, List[str]], context: QuizStateContext) -> None:
+        self._repo.prefetch_quiz_snapshots(user_tokens, context)
+
+    async def read_quiz_player(self, quiz_code: int, user_token: str) -> Optional[QuizPlayerRecord]:
+        return self._repo.read_quiz_player(quiz_code, user_token)
+
+    async def read_quiz_players(self, quiz_code: int) -> List[QuizPlayerRecord]:
+        return self._repo.read_quiz_players(quiz_code)
+
+    async def read_player_scores(self, quiz_code: int) -> Dict[str, QuizPlayerScore]:
+        return self._repo.read_player_scores(quiz_code)
+
+    async def read_leaderboard(self, quiz_code: int, top: int, user_token: Optional[str] = None
+                               ) -> Tuple[List[Tuple[str, float]], Optional[Tuple[str, int, float]]]:
+        return self._repo.read_leaderboard(quiz_code, top, user_token)
+
+    async def read_quiz_results(self, quiz_code: int) -> Optional[QuizResults]:
+        return self._repo.read_quiz_results(quiz_code)
@@ -0,0 +1,78 @@
+from datetime import datetime
+from typing import Optional, Dict, List, Tuple
+
+from redis.asyncio.client import PubSub
+
+from domain.quiz_player_record import QuizPlayerRecord
+from domain.quiz_state import QuizState, QuizResults, QuizStateNotice, QuizPlayerScore
+from domain.repository.quiz_state_context import QuizStateContext, QuizStateSnapshot
+
+
+class AsyncQuizStateRepository:
+    # the async twin of QuizStateRepository, see it for the semantics of the calls
+    async def set_state(self, q_state: QuizState, expiration_seconds: int) -> None:
+        raise NotImplementedError()
+
+    async def create_state(self, q_state: QuizState, expiration_seconds: int) -> bool:
+        raise NotImplementedError()
+
+    async def claim_player_name(self, quiz_code: int, name: str, expiration_seconds: int) -> Optional[int]:
+        raise NotImplementedError()
+
+    async def add_quiz_player(self, quiz_code: int, player: QuizPlayerRecord, leaderboard_score: int,
+                              expiration_seconds: int) -> None:
+        raise NotImplementedError()
+
+    async def set_quiz_player(self, quiz_code: int, player: QuizPlayerRecord, score: QuizPlayerScore,
+                              leaderboard_score: int, expiration_seconds: int) -> None:
+        raise NotImplementedError()
+
+    async def compare_and_set_state(self, q_state: QuizState, expected_json: bytes,
+                                    expiration_seconds: int) -> Optional[bytes]:
+        raise NotImplementedError()
+
+    async def lock_quiz_results(self, quiz_code: int, lock_seconds: int) -> bool:
+        raise NotImplementedError()
+
+    async def set_quiz_result(self, quiz_code: int, results: QuizResults, expiration_seconds: int) -> None:
+        raise NotImplementedError()
+
+    async def schedule_transition(self, quiz_code: int, due: datetime) -> None:
+        raise NotImplementedError()
+
+    async def claim_due_transitions(self, now: datetime, limit: int, lease_seconds: float) -> List[int]:
+        raise NotImplementedError()
+
+    async def remove_transition(self, quiz_code: int) -> None:
+        raise NotImplementedError()
+
+    async def publish_state_change(self, quiz_code: int, notice: QuizStateNotice) -> None:
+        raise NotImplementedError()
+
+    # the changes are read with get_message and the subscription is released with unsubscribe and close,
+    # the in-memory backend returns an object with the same calls
+    async def subscribe_state_changes(self, quiz_code: int) -> PubSub:
+        raise NotImplementedError()
+
+    async def read_quiz_snapshot(self, quiz_code: int, context: Optional[QuizStateContext] = None,
+                                 user_token: Optional[str] = None) -> QuizStateSnapshot:
+        raise NotImplementedError()
+
+    async def prefetch_quiz_snapshots(self, user_tokens: Dict[int, List[str]], context: QuizStateContext) -> None:
+        raise NotImplementedError()
+
+    async def read_quiz_player(self, quiz_code: int, user_token: str) -> Optional[QuizPlayerRecord]:
+        raise NotImplementedError()
+
+    async def read_quiz_players(self, quiz_code: int) -> List[QuizPlayerRecord]:
+        raise NotImplementedError()
+
+    async def read_player_scores(self, quiz_code: int) -> Dict[str, QuizPlayerScore]:
+        raise NotImplementedError()
+
+    async def read_leaderboard(self, quiz_code: int, top: int, user_token: Optional[str] = None
+                               ) -> Tuple[List[Tuple[str, float]], Optional[Tuple[str, int, float]]]:
+        raise NotImplementedError()
+
+    async def read_quiz_results(self, quiz_code: int) -> Optional[QuizResults]:
+        raise NotImplementedError()
@@ -0,0 +1,16 @@
+from typing import Tuple
+
+from domain.repository.quiz_state_async_memory_repository import AsyncQuizStateMemoryRepository
+from domain.repository.quiz_state_async_redis_repository import AsyncQuizStateRedisRepository
+from domain.repository.quiz_state_async_repository import AsyncQuizStateRepository
+from domain.repository.quiz_state_memory_repository import QuizStateMemoryRepository
+from domain.repository.quiz_state_redis_repository import QuizStateRedisRepository
+from domain.repository.quiz_state_repository import QuizStateRepository
+from settings import settings
+
+
+def create_state_repositories() -> Tuple[QuizStateRepository, AsyncQuizStateRepository]:
+    # the sync and the async repository of the configured backend, both see the same quizes
+    if settings.state_backend == "memory":
+        return QuizStateMemoryRepository(), AsyncQuizStateMemoryRepository()
+    return QuizStateRedisRepository(), AsyncQuizStateRedisRepository()
@@ -0,0 +1,70 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from domain.quiz_player_record import QuizPlayerRecord
+from domain.quiz_state import QuizState
+
+
+@dataclass
+class QuizPlayerIndex:
+    # the names of all the players in the joining order,
+    # the players themselves are only read by the tokens of the requesting ones
+    names: List[str]
+    players: Dict[str, QuizPlayerRecord]
+
+
+@dataclass
+class QuizStateVersions:
+    # the quiz's change counter and its values when the parts were changed last time,
+    # a part changed after the snapshot was read is marked with a value above the counter
+    version: int = 0
+    state: int = 0
+    names: int = 0
+    # user token -> version, only the requesting players
+    players: Dict[str, int] = field(default_factory=dict)
+
+    def mark_state_changed(self) -> None:
+        self.state = self.version + 1
+
+    def mark_names_changed(self) -> None:
+        self.names = self.version + 1
+
+    def mark_player_changed(self, user_token: str) -> None:
+        self.players[user_token] = self.version + 1
+
+    def player(self, user_token: str) -> int:
+        # a player read without the version is considered changed
+        return self.players.get(user_token, self.version + 1)
+
+
+@dataclass
+class QuizStateSnapshot:
+    q_state: QuizState
+    quiz_players: QuizPlayerIndex
+    versions: QuizStateVersions = field(default_factory=QuizStateVersions)
+    # only whether the results are stored, they are read with read_quiz_results when needed
+    has_results: bool = False
+    # the state as it was read, the transitions are only stored if it wasn't changed meanwhile
+    state_json: Optional[bytes] = None
+
+    def mark_state_stored(self, state_json: bytes) -> None:
+        # the next compare-and-set expects the stored state
+        self.state_json = state_json
+        self.versions.mark_state_changed()
+
+
+class QuizStateContext:
+    # keeps the quiz snapshots already read within one operation, so the same keys
+    # are not fetched twice; managers update the cached objects in place on writes
+    def __init__(self):
+        self._snapshots: Dict[int, QuizStateSnapshot] = {}
+
+    def get(self, quiz_code: int) -> Optional[QuizStateSnapshot]:
+        return self._snapshots.get(quiz_code)
+
+    def put(self, quiz_code: int, snapshot: QuizStateSnapshot) -> None:
+        self._snapshots[quiz_code] = snapshot
+
+    def discard(self, quiz_code: int) -> None:
+        # a failed operation may leave the cached objects half-updated
+        self._snapshots.pop(quiz_code, None)
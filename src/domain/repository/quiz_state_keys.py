@@ -0,0 +1,69 @@
+from typing import List
+
+
+class QuizStateKeys:
+    # the keys of a quiz share the {quiz_<code>} hash tag, so a Redis Cluster keeps them
+    # on one slot and the scripts and pipelines touching several of them still work
+    @staticmethod
+    def state(quiz_code: int) -> str:
+        return f"{{quiz_{quiz_code}}}:state"
+
+    @staticmethod
+    def state_pattern() -> str:
+        # matches the state keys only
+        return "{quiz_[0-9]*}:state"
+
+    @staticmethod
+    def quiz_code(state_key: bytes) -> int:
+        return int(state_key.decode()[len("{quiz_"):-len("}:state")])
+
+    @staticmethod
+    def players(quiz_code: int) -> str:
+        return f"{{quiz_{quiz_code}}}:players"
+
+    @staticmethod
+    def player_names(quiz_code: int) -> str:
+        # all the names in the joining order, only changed when a player joins
+        return f"{{quiz_{quiz_code}}}:player_names"
+
+    @staticmethod
+    def player_name_set(quiz_code: int) -> str:
+        return f"{{quiz_{quiz_code}}}:player_name_set"
+
+    @staticmethod
+    def versions(quiz_code: int) -> str:
+        # the change counter of the quiz and the values it had when the state, the names and the players changed
+        return f"{{quiz_{quiz_code}}}:versions"
+
+    @staticmethod
+    def scores(quiz_code: int) -> str:
+        return f"{{quiz_{quiz_code}}}:scores"
+
+    @staticmethod
+    def leaderboard(quiz_code: int) -> str:
+        return f"{{quiz_{quiz_code}}}:leaderboard"
+
+    @staticmethod
+    def results(quiz_code: int) -> str:
+        return f"{{quiz_{quiz_code}}}:results"
+
+    @staticmethod
+    def results_lock(quiz_code: int) -> str:
+        return f"{{quiz_{quiz_code}}}:results_lock"
+
+    @staticmethod
+    def parts(quiz_code: int) -> List[str]:
+        # the keys a quiz keeps besides its state
+        return [QuizStateKeys.players(quiz_code), QuizStateKeys.player_names(quiz_code),
+                QuizStateKeys.player_name_set(quiz_code), QuizStateKeys.versions(quiz_code),
+                QuizStateKeys.scores(quiz_code), QuizStateKeys.leaderboard(quiz_code),
+                QuizStateKeys.results(quiz_code), QuizStateKeys.results_lock(quiz_code)]
+
+    @staticmethod
+    def transitions() -> str:
+        # quiz codes scored by the time of their next transition
+        return "quiz_transitions"
+
+    @staticmethod
+    def events(quiz_code: int) -> str:
+        return f"{{quiz_{quiz_code}}}:events"
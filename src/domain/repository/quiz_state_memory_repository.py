@@ -0,0 +1,249 @@
+from datetime import datetime
+from typing import Optional, Dict, List, Tuple
+
+from domain.quiz_codec import codec
+from domain.quiz_metrics import timed_round_trip, redis_round_trip_seconds
+from domain.quiz_player_record import QuizPlayerRecord
+from domain.quiz_state import QuizState, QuizResults, QuizStateNotice, QuizPlayerScore
+from domain.repository.quiz_state_context import QuizStateContext, QuizStateSnapshot, QuizPlayerIndex, \
+    QuizStateVersions
+from domain.repository.quiz_state_keys import QuizStateKeys
+from domain.repository.quiz_state_memory_store import QuizStateMemoryStore, quiz_state_memory_store
+from domain.repository.quiz_state_repository import QuizStateRepository
+
+
+class QuizStateMemoryRepository(QuizStateRepository):
+    # keeps the same keys as the Redis backend and stores the same encoded values, so only the network
+    # is left out when the two are compared; the operations are timed as the Redis round trips are
+    def __init__(self, store: Optional[QuizStateMemoryStore] = None):
+        self._store = store or quiz_state_memory_store
+        self._store.start_sweeper()
+
+    @timed_round_trip("set_state")
+    def set_state(self, q_state: QuizState, expiration_seconds: int) -> None:
+        with self._store.lock(q_state.quiz_code):
+            self._store.set(q_state.quiz_code, QuizStateKeys.state(q_state.quiz_code), codec.encode(q_state),
+                            expiration_seconds or None)
+
+    @timed_round_trip("create_state")
+    def create_state(self, q_state: QuizState, expiration_seconds: int) -> bool:
+        key = QuizStateKeys.state(q_state.quiz_code)
+        with self._store.lock(q_state.quiz_code):
+            if self._store.get(q_state.quiz_code, key) is not None:
+                return False
+            # the keys left by the previous quiz with the same code outlive its state
+            self._store.clear(q_state.quiz_code)
+            self._store.set(q_state.quiz_code, key, codec.encode(q_state), expiration_seconds or None)
+            return True
+
+    @timed_round_trip("claim_player_name")
+    def claim_player_name(self, quiz_code: int, name: str, expiration_seconds: int) -> Optional[int]:
+        with self._store.lock(quiz_code):
+            name_set = self._store.setdefault(quiz_code, QuizStateKeys.player_name_set(quiz_code), set)
+            if name in name_set:
+                return None
+            name_set.add(name)
+            names = self._store.setdefault(quiz_code, QuizStateKeys.player_names(quiz_code), list)
+            names.append(name)
+            self._store.expire(quiz_code, QuizStateKeys.player_name_set(quiz_code), expiration_seconds)
+            self._store.expire(quiz_code, QuizStateKeys.player_names(quiz_code), expiration_seconds)
+            self._bump_version(quiz_code, "names", expiration_seconds)
+            return len(names) - 1
+
+    @timed_round_trip("add_quiz_player")
+    def add_quiz_player(self, quiz_code: int, player: QuizPlayerRecord, leaderboard_score: int,
+                        expiration_seconds: int) -> None:
+        with self._store.lock(quiz_code):
+            self._store.setdefault(quiz_code, QuizStateKeys.players(quiz_code), dict)[player.user_token] = \
+                codec.encode(player)
+            self._store.setdefault(quiz_code, QuizStateKeys.leaderboard(quiz_code), dict)[player.name] = \
+                float(leaderboard_score)
+            self._store.expire(quiz_code, QuizStateKeys.players(quiz_code), expiration_seconds)
+            self._store.expire(quiz_code, QuizStateKeys.leaderboard(quiz_code), expiration_seconds)
+
+    @timed_round_trip("set_quiz_player")
+    def set_quiz_player(self, quiz_code: int, player: QuizPlayerRecord, score: QuizPlayerScore,
+                        leaderboard_score: int, expiration_seconds: int) -> None:
+        with self._store.lock(quiz_code):
+            self._store.setdefault(quiz_code, QuizStateKeys.players(quiz_code), dict)[player.user_token] = \
+                codec.encode(player)
+            self._store.setdefault(quiz_code, QuizStateKeys.scores(quiz_code), dict)[player.user_token] = \
+                codec.encode(score)
+            self._store.setdefault(quiz_code, QuizStateKeys.leaderboard(quiz_code), dict)[player.name] = \
+                float(leaderboard_score)
+            for key in (QuizStateKeys.players(quiz_code), QuizStateKeys.scores(quiz_code),
+                        QuizStateKeys.leaderboard(quiz_code), QuizStateKeys.player_names(quiz_code),
+                        QuizStateKeys.player_name_set(quiz_code)):
+                self._store.expire(quiz_code, key, expiration_seconds)
+            self._bump_version(quiz_code, player.user_token, expiration_seconds)
+
+    @timed_round_trip("compare_and_set_state")
+    def compare_and_set_state(self, q_state: QuizState, expected_json: bytes,
+                              expiration_seconds: int) -> Optional[bytes]:
+        state_json = codec.encode(q_state)
+        key = QuizStateKeys.state(q_state.quiz_code)
+        with self._store.lock(q_state.quiz_code):
+            if self._store.get(q_state.quiz_code, key) != expected_json:
+                return None
+            self._store.set(q_state.quiz_code, key, state_json, expiration_seconds)
+            self._bump_version(q_state.quiz_code, "state", expiration_seconds)
+            return state_json
+
+    @timed_round_trip("lock_quiz_results")
+    def lock_quiz_results(self, quiz_code: int, lock_seconds: int) -> bool:
+        key = QuizStateKeys.results_lock(quiz_code)
+        with self._store.lock(quiz_code):
+            if self._store.get(quiz_code, key) is not None:
+                return False
+            self._store.set(quiz_code, key, b"1", lock_seconds)
+            return True
+
+    @timed_round_trip("set_quiz_result")
+    def set_quiz_result(self, quiz_code: int, results: QuizResults,
+                        expiration_seconds: int) -> None:
+        key = QuizStateKeys.results(quiz_code)
+        with self._store.lock(quiz_code):
+            if self._store.get(quiz_code, key) is None:
+                self._store.set(quiz_code, key, codec.encode(results), expiration_seconds)
+
+    @timed_round_trip("schedule_transition")
+    def schedule_transition(self, quiz_code: int, due: datetime) -> None:
+        with self._store.transitions_lock:
+            self._store.transitions[quiz_code] = due.timestamp()
+
+    @timed_round_trip("claim_due_transitions")
+    def claim_due_transitions(self, now: datetime, limit: int, lease_seconds: float) -> List[int]:
+        now_timestamp = now.timestamp()
+        with self._store.transitions_lock:
+            due = sorted((timestamp, str(quiz_code)) for quiz_code, timestamp in self._store.transitions.items()
+                         if timestamp <= now_timestamp)
+            quiz_codes = [int(quiz_code) for _, quiz_code in due[:limit]]
+            for quiz_code in quiz_codes:
+                self._store.transitions[quiz_code] = now_timestamp + lease_seconds
+        return quiz_codes
+
+    @timed_round_trip("remove_transition")
+    def remove_transition(self, quiz_code: int) -> None:
+        with self._store.transitions_lock:
+            self._store.transitions.pop(quiz_code, None)
+
+    @timed_round_trip("publish_state_change")
+    def publish_state_change(self, quiz_code: int, notice: QuizStateNotice) -> None:
+        self._store.publish(QuizStateKeys.events(quiz_code), codec.encode(notice))
+
+    def read_quiz_snapshot(self, quiz_code: int, context: Optional[QuizStateContext] = None,
+                           user_token: Optional[str] = None) -> QuizStateSnapshot:
+        snapshot = context.get(quiz_code) if context else None
+        if snapshot:
+            if user_token and user_token not in snapshot.quiz_players.players:
+                player = self.read_quiz_player(quiz_code, user_token)
+                if player:
+                    snapshot.quiz_players.players[user_token] = player
+            return snapshot
+        with redis_round_trip_seconds.time("read_quiz_snapshot"):
+            snapshot = self._read_snapshot(quiz_code, [user_token] if user_token else [])
+        if not snapshot:
+            raise Exception(f"Quiz #{quiz_code} not found")
+        if context:
+            context.put(quiz_code, snapshot)
+        return snapshot
+
+    def prefetch_quiz_snapshots(self, user_tokens: Dict[int, List[str]], context: QuizStateContext) -> None:
+        user_tokens = {c: tokens for c, tokens in user_tokens.items() if not context.get(c)}
+        if not user_tokens:
+            return
+        with redis_round_trip_seconds.time("prefetch_quiz_snapshots"):
+            snapshots = {c: self._read_snapshot(c, tokens) for c, tokens in user_tokens.items()}
+        for quiz_code, snapshot in snapshots.items():
+            if snapshot:
+                context.put(quiz_code, snapshot)
+
+    @timed_round_trip("read_quiz_player")
+    def read_quiz_player(self, quiz_code: int, user_token: str) -> Optional[QuizPlayerRecord]:
+        with self._store.lock(quiz_code):
+            player_json = (self._store.get(quiz_code, QuizStateKeys.players(quiz_code)) or {}).get(user_token)
+        return codec.decode(QuizPlayerRecord, player_json) if player_json else None
+
+    @timed_round_trip("read_quiz_players")
+    def read_quiz_players(self, quiz_code: int) -> List[QuizPlayerRecord]:
+        with self._store.lock(quiz_code):
+            players_json = list((self._store.get(quiz_code, QuizStateKeys.players(quiz_code)) or {}).values())
+        return sorted((codec.decode(QuizPlayerRecord, p) for p in players_json), key=lambda p: p.join_index)
+
+    @timed_round_trip("read_player_scores")
+    def read_player_scores(self, quiz_code: int) -> Dict[str, QuizPlayerScore]:
+        with self._store.lock(quiz_code):
+            scores_json = dict(self._store.get(quiz_code, QuizStateKeys.scores(quiz_code)) or {})
+        return {token: codec.decode(QuizPlayerScore, score_json) for token, score_json in scores_json.items()}
+
+    @timed_round_trip("read_leaderboard")
+    def read_leaderboard(self, quiz_code: int, top: int, user_token: Optional[str] = None
+                         ) -> Tuple[List[Tuple[str, float]], Optional[Tuple[str, int, float]]]:
+        with self._store.lock(quiz_code):
+            scores = dict(self._store.get(quiz_code, QuizStateKeys.leaderboard(quiz_code)) or {})
+            player_json = (self._store.get(quiz_code, QuizStateKeys.players(quiz_code)) or {}).get(user_token or "")
+        # ordered as a sorted set, by the score and then by the name's bytes
+        ranking = sorted(scores.items(), key=lambda item: (item[1], item[0].encode()))
+        top_players = ranking[:max(top, 0)]
+        if not user_token:
+            return top_players, None
+        if not player_json:
+            raise Exception("User token not found among the quiz users")
+        name = codec.decode(QuizPlayerRecord, player_json).name
+        if name not in scores:
+            return top_players, None
+        return top_players, (name, [n for n, _ in ranking].index(name), scores[name])
+
+    @timed_round_trip("read_quiz_results")
+    def read_quiz_results(self, quiz_code: int) -> Optional[QuizResults]:
+        with self._store.lock(quiz_code):
+            json_data = self._store.get(quiz_code, QuizStateKeys.results(quiz_code))
+        if not json_data:
+            return None
+        quiz_results: QuizResults = codec.decode(QuizResults, json_data)
+        return quiz_results
+
+    def count_quizes_and_players(self) -> Tuple[int, int]:
+        quizes, players = 0, 0
+        for quiz_code in self._store.quiz_codes():
+            with self._store.lock(quiz_code):
+                if self._store.get(quiz_code, QuizStateKeys.state(quiz_code)) is None:
+                    continue
+                quizes += 1
+                players += len(self._store.get(quiz_code, QuizStateKeys.player_names(quiz_code)) or ())
+        return quizes, players
+
+    def _read_snapshot(self, quiz_code: int, user_tokens: List[str]) -> Optional[QuizStateSnapshot]:
+        # the quiz is read under its lock, so unlike the Redis pipeline the parts are always consistent
+        with self._store.lock(quiz_code):
+            state_json = self._store.get(quiz_code, QuizStateKeys.state(quiz_code))
+            if not state_json:
+                return None
+            versions = dict(self._store.get(quiz_code, QuizStateKeys.versions(quiz_code)) or {})
+            names = list(self._store.get(quiz_code, QuizStateKeys.player_names(quiz_code)) or ())
+            players = self._store.get(quiz_code, QuizStateKeys.players(quiz_code)) or {}
+            players_json = {token: players[token] for token in user_tokens if token in players}
+            has_results = self._store.get(quiz_code, QuizStateKeys.results(quiz_code)) is not None
+        return QuizStateSnapshot(
+            q_state=codec.decode(QuizState, state_json),
+            quiz_players=QuizPlayerIndex(
+                names=names,
+                players={token: codec.decode(QuizPlayerRecord, player_json)
+                         for token, player_json in players_json.items()}
+            ),
+            versions=QuizStateVersions(
+                version=versions.get("version", 0),
+                state=versions.get("state", 0),
+                names=versions.get("names", 0),
+                players={token: versions.get(token, 0) for token in user_tokens}
+            ),
+            has_results=has_results,
+            state_json=state_json
+        )
+
+    def _bump_version(self, quiz_code: int, part: str, expiration_seconds: int) -> None:
+        # increments the quiz's change counter and stores its value as the version of the changed part
+        versions = self._store.setdefault(quiz_code, QuizStateKeys.versions(quiz_code), dict)
+        versions["version"] = versions.get("version", 0) + 1
+        versions[part] = versions["version"]
+        self._store.expire(quiz_code, QuizStateKeys.versions(quiz_code), expiration_seconds)
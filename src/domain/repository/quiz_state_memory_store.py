@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(settings.log_level)
+
+# a quiz always takes the same lock, the stripes keep the number of locks fixed however many quizes there are
+LOCK_STRIPES = 64
+
+
+class _MemoryEntry:
+    __slots__ = ("value", "expires_at")
+
+    def __init__(self, value: Any, expires_at: Optional[float]):
+        self.value = value
+        self.expires_at = expires_at
+
+
+class QuizStateMemoryPubSub:
+    # the part of the redis-py asyncio PubSub the quiz events are read with,
+    # the messages are queued on the event loop the subscription was made in
+    def __init__(self, store: "QuizStateMemoryStore"):
+        self._store = store
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._channels: Set[str] = set()
+
+    async def subscribe(self, *channels: str) -> None:
+        for channel in channels:
+            self._store.add_subscriber(channel, self)
+            self._channels.add(channel)
+
+    def deliver(self, channel: str, data: bytes) -> None:
+        # called by the publishing thread
+        message = {"type": "message", "pattern": None, "channel": channel.encode(), "data": data}
+        try:
+            self._loop.call_soon_threadsafe(self._queue.put_nowait, message)
+        except RuntimeError:
+            # the subscriber's loop is closed, it won't read the messages anymore
+            pass
+
+    async def get_message(self, ignore_subscribe_messages: bool = False,
+                          timeout: Optional[float] = 0.0) -> Optional[Dict[str, Any]]:
+        # the subscriptions aren't confirmed with messages, so there are none to ignore
+        try:
+            if timeout is None:
+                return await self._queue.get()
+            if timeout <= 0:
+                return self._queue.get_nowait()
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except (asyncio.QueueEmpty, asyncio.TimeoutError):
+            return None
+
+    async def unsubscribe(self, *channels: str) -> None:
+        for channel in channels or list(self._channels):
+            self._store.remove_subscriber(channel, self)
+            self._channels.discard(channel)
+
+    async def close(self) -> None:
+        await self.unsubscribe()
+
+
+class QuizStateMemoryStore:
+    # the keys of the Redis backend kept within the process and grouped by the quiz, the callers
+    # hold the quiz's lock while they read and write its keys, so every operation is atomic like a script;
+    # the expired keys are skipped on reads and removed by the background sweeper
+    def __init__(self, sweep_seconds: float):
+        self._quizes: Dict[int, Dict[str, _MemoryEntry]] = {}
+        self._locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        # quiz code -> due timestamp of its next transition
+        self.transitions: Dict[int, float] = {}
+        self.transitions_lock = threading.Lock()
+        self._subscribers: Dict[str, Set[QuizStateMemoryPubSub]] = {}
+        self._subscribers_lock = threading.Lock()
+        self._sweep_seconds = sweep_seconds
+        self._sweeper: Optional[threading.Thread] = None
+        self._sweeper_lock = threading.Lock()
+
+    def lock(self, quiz_code: int) -> threading.Lock:
+        return self._locks[quiz_code % LOCK_STRIPES]
+
+    def get(self, quiz_code: int, key: str) -> Any:
+        keys = self._quizes.get(quiz_code)
+        entry = keys.get(key) if keys else None
+        if entry is None:
+            return None
+        if entry.expires_at is not None and entry.expires_at <= time.monotonic():
+            del keys[key]
+            return None
+        return entry.value
+
+    def set(self, quiz_code: int, key: str, value: Any, expiration_seconds: Optional[float]) -> None:
+        # no expiration keeps the key until it's overwritten, as SET without EX does
+        expires_at = time.monotonic() + expiration_seconds if expiration_seconds else None
+        self._quizes.setdefault(quiz_code, {})[key] = _MemoryEntry(value, expires_at)
+
+    def setdefault(self, quiz_code: int, key: str, create: Callable[[], Any]) -> Any:
+        # the collections are changed in place, a new one doesn't expire until expire is called
+        value = self.get(quiz_code, key)
+        if value is None:
+            value = create()
+            self.set(quiz_code, key, value, None)
+        return value
+
+    def expire(self, quiz_code: int, key: str, expiration_seconds: float) -> None:
+        if self.get(quiz_code, key) is not None:
+            self._quizes[quiz_code][key].expires_at = time.monotonic() + expiration_seconds
+
+    def clear(self, quiz_code: int) -> None:
+        self._quizes.pop(quiz_code, None)
+
+    def quiz_codes(self) -> List[int]:
+        return list(self._quizes)
+
+    def sweep(self) -> int:
+        # removes the expired keys and the quizes left without keys, returns the number of the removed keys
+        removed = 0
+        for quiz_code in list(self._quizes):
+            with self.lock(quiz_code):
+                keys = self._quizes.get(quiz_code)
+                if keys is None:
+                    continue
+                now = time.monotonic()
+                expired = [key for key, entry in keys.items()
+                           if entry.expires_at is not None and entry.expires_at <= now]
+                for key in expired:
+                    del keys[key]
+                removed += len(expired)
+                if not keys:
+                    del self._quizes[quiz_code]
+        return removed
+
+    def start_sweeper(self) -> None:
+        with self._sweeper_lock:
+            if self._sweeper is None and self._sweep_seconds > 0:
+                self._sweeper = threading.Thread(target=self._sweep_periodically, name="quiz-state-sweeper",
+                                                 daemon=True)
+                self._sweeper.start()
+
+    def _sweep_periodically(self) -> None:
+        while True:
+            time.sleep(self._sweep_seconds)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.warning("Quiz state sweep failed: %s", e)
+
+    def add_subscriber(self, channel: str, pubsub: QuizStateMemoryPubSub) -> None:
+        with self._subscribers_lock:
+            self._subscribers.setdefault(channel, set()).add(pubsub)
+
+    def remove_subscriber(self, channel: str, pubsub: QuizStateMemoryPubSub) -> None:
+        with self._subscribers_lock:
+            subscribers = self._subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(pubsub)
+                if not subscribers:
+                    del self._subscribers[channel]
+
+    def count_subscribers(self, channel: str) -> int:
+        return len(self._subscribers.get(channel, ()))
+
+    def publish(self, channel: str, data: bytes) -> int:
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for pubsub in subscribers:
+            pubsub.deliver(channel, data)
+        return len(subscribers)
+
+
+quiz_state_memory_store = QuizStateMemoryStore(settings.memory_sweep_seconds)
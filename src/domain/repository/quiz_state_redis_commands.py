@@ -0,0 +1,180 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from domain.quiz_codec import codec
+from domain.quiz_player_record import QuizPlayerRecord
+from domain.quiz_state import QuizState, QuizResults, QuizStateNotice, QuizPlayerScore
+from domain.repository.quiz_state_context import QuizStateSnapshot, QuizPlayerIndex, QuizStateVersions
+from domain.repository.quiz_state_keys import QuizStateKeys
+from domain.repository.quiz_state_scripts import CREATE_STATE_SCRIPT, COMPARE_AND_SET_SCRIPT, \
+    CLAIM_PLAYER_NAME_SCRIPT, ADD_PLAYER_SCRIPT, SET_PLAYER_SCRIPT, CLAIM_TRANSITIONS_SCRIPT
+
+
+class QuizStateRedisCommands:
+    # the arguments of the Redis commands and the decoding of their replies, shared by
+    # the sync and the async repository, so the two only differ by the I/O calls
+    @staticmethod
+    def set_state(q_state: QuizState, expiration_seconds: int) -> Dict[str, Any]:
+        return {"name": QuizStateKeys.state(q_state.quiz_code), "value": codec.encode(q_state),
+                "ex": expiration_seconds or None}
+
+    @staticmethod
+    def create_state(q_state: QuizState, expiration_seconds: int) -> Tuple[Any, ...]:
+        # the previous quiz's keys are removed along with its state
+        keys = [QuizStateKeys.state(q_state.quiz_code), *QuizStateKeys.parts(q_state.quiz_code)]
+        return CREATE_STATE_SCRIPT, len(keys), *keys, codec.encode(q_state), expiration_seconds or 0
+
+    @staticmethod
+    def claim_player_name(quiz_code: int, name: str, expiration_seconds: int) -> Tuple[Any, ...]:
+        return (CLAIM_PLAYER_NAME_SCRIPT, 3, QuizStateKeys.player_name_set(quiz_code),
+                QuizStateKeys.player_names(quiz_code), QuizStateKeys.versions(quiz_code), name, expiration_seconds)
+
+    @staticmethod
+    def join_index(reply: int) -> Optional[int]:
+        # the script returns -1 for a taken name
+        return reply if reply >= 0 else None
+
+    @staticmethod
+    def add_quiz_player(quiz_code: int, player: QuizPlayerRecord, leaderboard_score: int,
+                        expiration_seconds: int) -> Tuple[Any, ...]:
+        return (ADD_PLAYER_SCRIPT, 2, QuizStateKeys.players(quiz_code), QuizStateKeys.leaderboard(quiz_code),
+                player.user_token, codec.encode(player), player.name, leaderboard_score, expiration_seconds)
+
+    @staticmethod
+    def set_quiz_player(quiz_code: int, player: QuizPlayerRecord, score: QuizPlayerScore, leaderboard_score: int,
+                        expiration_seconds: int) -> Tuple[Any, ...]:
+        return (SET_PLAYER_SCRIPT, 6, QuizStateKeys.players(quiz_code), QuizStateKeys.scores(quiz_code),
+                QuizStateKeys.leaderboard(quiz_code), QuizStateKeys.player_names(quiz_code),
+                QuizStateKeys.player_name_set(quiz_code), QuizStateKeys.versions(quiz_code),
+                player.user_token, codec.encode(player), codec.encode(score), player.name, leaderboard_score,
+                expiration_seconds)
+
+    @staticmethod
+    def compare_and_set_state(q_state: QuizState, state_json: bytes, expected_json: bytes,
+                              expiration_seconds: int) -> Tuple[Any, ...]:
+        return (COMPARE_AND_SET_SCRIPT, 2, QuizStateKeys.state(q_state.quiz_code),
+                QuizStateKeys.versions(q_state.quiz_code), expected_json, state_json, expiration_seconds)
+
+    @staticmethod
+    def lock_quiz_results(quiz_code: int, lock_seconds: int) -> Dict[str, Any]:
+        return {"name": QuizStateKeys.results_lock(quiz_code), "value": 1, "nx": True, "ex": lock_seconds}
+
+    @staticmethod
+    def set_quiz_result(quiz_code: int, results: QuizResults, expiration_seconds: int) -> Dict[str, Any]:
+        return {"name": QuizStateKeys.results(quiz_code), "value": codec.encode(results),
+                "ex": expiration_seconds, "nx": True}
+
+    @staticmethod
+    def schedule_transition(quiz_code: int, due: datetime) -> Tuple[Any, ...]:
+        return QuizStateKeys.transitions(), {quiz_code: due.timestamp()}
+
+    @staticmethod
+    def claim_due_transitions(now: datetime, limit: int, lease_seconds: float) -> Tuple[Any, ...]:
+        return (CLAIM_TRANSITIONS_SCRIPT, 1, QuizStateKeys.transitions(), now.timestamp(), limit,
+                now.timestamp() + lease_seconds)
+
+    @staticmethod
+    def quiz_codes(reply: List[bytes]) -> List[int]:
+        return [int(quiz_code) for quiz_code in reply]
+
+    @staticmethod
+    def publish_state_change(quiz_code: int, notice: QuizStateNotice) -> Tuple[Any, ...]:
+        return QuizStateKeys.events(quiz_code), codec.encode(notice)
+
+    @staticmethod
+    def player(player_json: Optional[bytes]) -> Optional[QuizPlayerRecord]:
+        return codec.decode(QuizPlayerRecord, player_json) if player_json else None
+
+    @staticmethod
+    def players(players_json: List[bytes]) -> List[QuizPlayerRecord]:
+        # in the joining order
+        return sorted((codec.decode(QuizPlayerRecord, p) for p in players_json), key=lambda p: p.join_index)
+
+    @staticmethod
+    def player_scores(scores_json: Dict[bytes, bytes]) -> Dict[str, QuizPlayerScore]:
+        return {token.decode(): codec.decode(QuizPlayerScore, score_json) for token, score_json in scores_json.items()}
+
+    @staticmethod
+    def results(results_json: Optional[bytes]) -> Optional[QuizResults]:
+        return codec.decode(QuizResults, results_json) if results_json else None
+
+    @staticmethod
+    def queue_snapshot_reads(pipe, quiz_code: int, user_tokens: List[str]) -> None:
+        # the versions are read first, so they are never newer than the parts read after them
+        pipe.hmget(QuizStateKeys.versions(quiz_code), ["version", "state", "names", *user_tokens])
+        pipe.get(QuizStateKeys.state(quiz_code))
+        pipe.lrange(QuizStateKeys.player_names(quiz_code), 0, -1)
+        pipe.exists(QuizStateKeys.results(quiz_code))
+        if user_tokens:
+            pipe.hmget(QuizStateKeys.players(quiz_code), user_tokens)
+
+    @staticmethod
+    def build_snapshot(values: List[Any], user_tokens: List[str]) -> Optional[QuizStateSnapshot]:
+        # builds the snapshot from the replies queued by queue_snapshot_reads, None if the quiz doesn't exist
+        versions, state_json, names, results_count = values[:4]
+        if not state_json:
+            return None
+        players_json = values[4] if user_tokens else []
+        version, state_version, names_version, *player_versions = [int(v) if v else 0 for v in versions]
+        return QuizStateSnapshot(
+            q_state=codec.decode(QuizState, state_json),
+            quiz_players=QuizPlayerIndex(
+                names=[name.decode() for name in names],
+                players={token: codec.decode(QuizPlayerRecord, player_json)
+                         for token, player_json in zip(user_tokens, players_json) if player_json}
+            ),
+            versions=QuizStateVersions(
+                version=version,
+                state=state_version,
+                names=names_version,
+                players=dict(zip(user_tokens, player_versions))
+            ),
+            has_results=bool(results_count),
+            state_json=state_json
+        )
+
+    @staticmethod
+    def queue_batch_snapshot_reads(pipe, user_tokens: Dict[int, List[str]]) -> None:
+        for quiz_code, tokens in user_tokens.items():
+            QuizStateRedisCommands.queue_snapshot_reads(pipe, quiz_code, tokens)
+
+    @staticmethod
+    def build_batch_snapshots(values: List[Any], user_tokens: Dict[int, List[str]]) -> Dict[int, QuizStateSnapshot]:
+        # the snapshots of the quizes that exist, from the replies queued by queue_batch_snapshot_reads
+        snapshots = {}
+        for quiz_code, tokens in user_tokens.items():
+            snapshot = QuizStateRedisCommands.build_snapshot(values, tokens)
+            values = values[5 if tokens else 4:]
+            if snapshot:
+                snapshots[quiz_code] = snapshot
+        return snapshots
+
+    @staticmethod
+    def queue_leaderboard_reads(pipe, quiz_code: int, top: int, user_token: Optional[str]) -> None:
+        pipe.hget(QuizStateKeys.players(quiz_code), user_token or "")
+        # the top is a count, a stop index below 0 would count from the end
+        if top > 0:
+            pipe.zrange(QuizStateKeys.leaderboard(quiz_code), 0, top - 1, withscores=True)
+
+    @staticmethod
+    def build_leaderboard(values: List[Any], user_token: Optional[str]
+                          ) -> Tuple[List[Tuple[str, float]], Optional[str]]:
+        # the top players from the replies queued by queue_leaderboard_reads
+        # and the requesting player's name to read the rank of
+        player_json, *ranges = values
+        top_players = [(name.decode(), score) for name, score in (ranges[0] if ranges else [])]
+        if not user_token:
+            return top_players, None
+        if not player_json:
+            raise Exception("User token not found among the quiz users")
+        return top_players, codec.decode(QuizPlayerRecord, player_json).name
+
+    @staticmethod
+    def queue_rank_reads(pipe, quiz_code: int, name: str) -> None:
+        pipe.zrank(QuizStateKeys.leaderboard(quiz_code), name)
+        pipe.zscore(QuizStateKeys.leaderboard(quiz_code), name)
+
+    @staticmethod
+    def build_rank(values: List[Any], name: str) -> Optional[Tuple[str, int, float]]:
+        rank, score = values
+        return (name, rank, score) if rank is not None else None
@@ -0,0 +1,169 @@
+from datetime import datetime
+from typing import Optional, Dict, List, Tuple
+
+from domain.quiz_codec import codec
+from domain.quiz_metrics import timed_round_trip, redis_round_trip_seconds
+from domain.quiz_player_record import QuizPlayerRecord
+from domain.quiz_state import QuizState, QuizResults, QuizStateNotice, QuizPlayerScore
+from domain.repository.quiz_state_context import QuizStateContext, QuizStateSnapshot
+from domain.repository.quiz_state_keys import QuizStateKeys
+from domain.repository.quiz_state_redis_commands import QuizStateRedisCommands
+from domain.repository.quiz_state_repository import QuizStateRepository
+from domain.repository.redis_clients import create_redis_client, has_replicas
+from settings import settings
+
+
+class QuizStateRedisRepository(QuizStateRepository):
+
+    def __init__(self):
+        self.redis_cli = create_redis_client()
+        # the primary serves the read-only calls as well unless replicas are configured
+        self.redis_reader = create_redis_client(replica=True) if has_replicas() else self.redis_cli
+
+    @timed_round_trip("set_state")
+    def set_state(self, q_state: QuizState, expiration_seconds: int) -> None:
+        self.redis_cli.set(**QuizStateRedisCommands.set_state(q_state, expiration_seconds))
+
+    @timed_round_trip("create_state")
+    def create_state(self, q_state: QuizState, expiration_seconds: int) -> bool:
+        # stores a new quiz only if its code is free
+        return bool(self.redis_cli.eval(*QuizStateRedisCommands.create_state(q_state, expiration_seconds)))
+
+    @timed_round_trip("claim_player_name")
+    def claim_player_name(self, quiz_code: int, name: str, expiration_seconds: int) -> Optional[int]:
+        # returns the player's joining index or None if the name is already taken
+        return QuizStateRedisCommands.join_index(self.redis_cli.eval(
+            *QuizStateRedisCommands.claim_player_name(quiz_code, name, expiration_seconds)))
+
+    @timed_round_trip("add_quiz_player")
+    def add_quiz_player(self, quiz_code: int, player: QuizPlayerRecord, leaderboard_score: int,
+                        expiration_seconds: int) -> None:
+        # players are stored in a hash keyed by the user token, their names are claimed beforehand
+        self.redis_cli.eval(
+            *QuizStateRedisCommands.add_quiz_player(quiz_code, player, leaderboard_score, expiration_seconds))
+
+    @timed_round_trip("set_quiz_player")
+    def set_quiz_player(self, quiz_code: int, player: QuizPlayerRecord, score: QuizPlayerScore,
+                        leaderboard_score: int, expiration_seconds: int) -> None:
+        # only the given player's fields are overwritten, so concurrent
+        # updates of different players never conflict
+        self.redis_cli.eval(
+            *QuizStateRedisCommands.set_quiz_player(quiz_code, player, score, leaderboard_score, expiration_seconds))
+
+    @timed_round_trip("compare_and_set_state")
+    def compare_and_set_state(self, q_state: QuizState, expected_json: bytes,
+                              expiration_seconds: int) -> Optional[bytes]:
+        # stores the state only if nobody changed it since it was read,
+        # returns the stored JSON or None if the state was changed meanwhile
+        state_json = codec.encode(q_state)
+        stored = self.redis_cli.eval(
+            *QuizStateRedisCommands.compare_and_set_state(q_state, state_json, expected_json, expiration_seconds))
+        return state_json if stored else None
+
+    @timed_round_trip("lock_quiz_results")
+    def lock_quiz_results(self, quiz_code: int, lock_seconds: int) -> bool:
+        # only the lock owner computes the results, the lock expires if it fails to store them
+        return bool(self.redis_cli.set(**QuizStateRedisCommands.lock_quiz_results(quiz_code, lock_seconds)))
+
+    @timed_round_trip("set_quiz_result")
+    def set_quiz_result(self, quiz_code: int, results: QuizResults,
+                        expiration_seconds: int) -> None:
+        # the results are never overwritten once stored
+        self.redis_cli.set(**QuizStateRedisCommands.set_quiz_result(quiz_code, results, expiration_seconds))
+
+    @timed_round_trip("schedule_transition")
+    def schedule_transition(self, quiz_code: int, due: datetime) -> None:
+        self.redis_cli.zadd(*QuizStateRedisCommands.schedule_transition(quiz_code, due))
+
+    @timed_round_trip("claim_due_transitions")
+    def claim_due_transitions(self, now: datetime, limit: int, lease_seconds: float) -> List[int]:
+        # a quiz is claimed by the worker that leased it, it stays queued until it's rescheduled or removed
+        return QuizStateRedisCommands.quiz_codes(self.redis_cli.eval(
+            *QuizStateRedisCommands.claim_due_transitions(now, limit, lease_seconds)))
+
+    @timed_round_trip("remove_transition")
+    def remove_transition(self, quiz_code: int) -> None:
+        self.redis_cli.zrem(QuizStateKeys.transitions(), quiz_code)
+
+    @timed_round_trip("publish_state_change")
+    def publish_state_change(self, quiz_code: int, notice: QuizStateNotice) -> None:
+        self.redis_cli.publish(*QuizStateRedisCommands.publish_state_change(quiz_code, notice))
+
+    def read_quiz_snapshot(self, quiz_code: int, context: Optional[QuizStateContext] = None,
+                           user_token: Optional[str] = None) -> QuizStateSnapshot:
+        snapshot = context.get(quiz_code) if context else None
+        if snapshot:
+            if user_token and user_token not in snapshot.quiz_players.players:
+                player = self.read_quiz_player(quiz_code, user_token)
+                if player:
+                    snapshot.quiz_players.players[user_token] = player
+            return snapshot
+        # the versions, the state, the names, the results and the requesting player
+        # are fetched within a single round trip
+        user_tokens = [user_token] if user_token else []
+        with self.redis_cli.pipeline(transaction=False) as pipe:
+            QuizStateRedisCommands.queue_snapshot_reads(pipe, quiz_code, user_tokens)
+            with redis_round_trip_seconds.time("read_quiz_snapshot"):
+                values = pipe.execute()
+        snapshot = QuizStateRedisCommands.build_snapshot(values, user_tokens)
+        if not snapshot:
+            raise Exception(f"Quiz #{quiz_code} not found")
+        if context:
+            context.put(quiz_code, snapshot)
+        return snapshot
+
+    def prefetch_quiz_snapshots(self, user_tokens: Dict[int, List[str]], context: QuizStateContext) -> None:
+        # reads the quizes of a batch with their requesting players within a single round trip,
+        # the missing ones are left for the operations to fail on
+        user_tokens = {c: tokens for c, tokens in user_tokens.items() if not context.get(c)}
+        if not user_tokens:
+            return
+        with self.redis_cli.pipeline(transaction=False) as pipe:
+            QuizStateRedisCommands.queue_batch_snapshot_reads(pipe, user_tokens)
+            with redis_round_trip_seconds.time("prefetch_quiz_snapshots"):
+                values = pipe.execute()
+        for quiz_code, snapshot in QuizStateRedisCommands.build_batch_snapshots(values, user_tokens).items():
+            context.put(quiz_code, snapshot)
+
+    @timed_round_trip("read_quiz_player")
+    def read_quiz_player(self, quiz_code: int, user_token: str) -> Optional[QuizPlayerRecord]:
+        return QuizStateRedisCommands.player(self.redis_cli.hget(QuizStateKeys.players(quiz_code), user_token))
+
+    @timed_round_trip("read_quiz_players")
+    def read_quiz_players(self, quiz_code: int) -> List[QuizPlayerRecord]:
+        # all the players in the joining order, only needed to summarize the results
+        return QuizStateRedisCommands.players(self.redis_cli.hvals(QuizStateKeys.players(quiz_code)))
+
+    @timed_round_trip("read_player_scores")
+    def read_player_scores(self, quiz_code: int) -> Dict[str, QuizPlayerScore]:
+        return QuizStateRedisCommands.player_scores(self.redis_cli.hgetall(QuizStateKeys.scores(quiz_code)))
+
+    def read_leaderboard(self, quiz_code: int, top: int, user_token: Optional[str] = None
+                         ) -> Tuple[List[Tuple[str, float]], Optional[Tuple[str, int, float]]]:
+        # returns the top players with their scores and the requesting player's name, rank and score
+        with self.redis_reader.pipeline(transaction=False) as pipe:
+            QuizStateRedisCommands.queue_leaderboard_reads(pipe, quiz_code, top, user_token)
+            with redis_round_trip_seconds.time("read_leaderboard"):
+                values = pipe.execute()
+        top_players, name = QuizStateRedisCommands.build_leaderboard(values, user_token)
+        if name is None:
+            return top_players, None
+        with self.redis_reader.pipeline(transaction=False) as pipe:
+            QuizStateRedisCommands.queue_rank_reads(pipe, quiz_code, name)
+            with redis_round_trip_seconds.time("read_leaderboard"):
+                values = pipe.execute()
+        return top_players, QuizStateRedisCommands.build_rank(values, name)
+
+    @timed_round_trip("read_quiz_results")
+    def read_quiz_results(self, quiz_code: int) -> Optional[QuizResults]:
+        return QuizStateRedisCommands.results(self.redis_reader.get(QuizStateKeys.results(quiz_code)))
+
+    def count_quizes_and_players(self) -> Tuple[int, int]:
+        # scans the whole keyspace, it's only meant for the occasional metrics scrape
+        quiz_codes = [QuizStateKeys.quiz_code(key)
+                      for key in self.redis_reader.scan_iter(match=QuizStateKeys.state_pattern(), count=1000)]
+        with self.redis_reader.pipeline(transaction=False) as pipe:
+            for quiz_code in quiz_codes:
+                pipe.llen(QuizStateKeys.player_names(quiz_code))
+            player_counts = pipe.execute() if quiz_codes else []
+        return len(quiz_codes), sum(player_counts)
@@ -1,61 +1,86 @@
-from typing import Tuple, Optional
+from datetime import datetime
+from typing import Optional, Dict, List, Tuple
 
-import redis
-
-from domain.quiz_state import QuizState, QuizPlayers, QuizResults
-from settings import settings
+from domain.quiz_player_record import QuizPlayerRecord
+from domain.quiz_state import QuizState, QuizResults, QuizStateNotice, QuizPlayerScore
+from domain.repository.quiz_state_context import QuizStateContext, QuizStateSnapshot
 
 
 class QuizStateRepository:
+    # the expiration is in seconds, every write of a quiz's part extends that part only
+    def set_state(self, q_state: QuizState, expiration_seconds: int) -> None:
+        raise NotImplementedError()
 
-    def __init__(self):
-        self.redis_cli = redis.Redis(host=settings.redis_host, port=settings.redis_port)
+    # stores a new quiz only if its code is free, whatever the previous quiz with the same code left is removed
+    def create_state(self, q_state: QuizState, expiration_seconds: int) -> bool:
+        raise NotImplementedError()
 
-    def set_state(self, q_state: QuizState, expiration_seconds: int) -> None:
-        self.redis_cli.set(
-            f"quiz_{q_state.quiz_code}",
-            q_state.to_json(),
-            ex=expiration_seconds or None
-        )
-
-    def set_quiz_players(self, quiz_code: int, quiz_players: QuizPlayers,
-                         expiration_seconds: int) -> None:
-        self.redis_cli.set(
-            f"quiz_players_{quiz_code}",
-            quiz_players.to_json(),
-            ex=expiration_seconds
-        )
-
-    def set_quiz_result(self, quiz_code: int, results: QuizResults,
+    # returns the player's joining index or None if the name is already taken
+    def claim_player_name(self, quiz_code: int, name: str, expiration_seconds: int) -> Optional[int]:
+        raise NotImplementedError()
+
+    def add_quiz_player(self, quiz_code: int, player: QuizPlayerRecord, leaderboard_score: int,
                         expiration_seconds: int) -> None:
-        self.redis_cli.set(
-            f"quiz_results_{quiz_code}",
-            results.to_json(),
-            ex=expiration_seconds
-        )
-
-    def read_quiz_state(self, quiz_code: int) -> Tuple[QuizState, QuizPlayers]:
-        json_data = self.redis_cli.get(
-            f"quiz_{quiz_code}"
-        )
-        if not json_data:
-            raise Exception(f"Quiz #{quiz_code} not found")
-        q_state: QuizState = QuizState.from_json(json_data)
-        quiz_players = self.read_quiz_players(quiz_code)
-        return q_state, quiz_players
-
-    def read_quiz_players(self, quiz_code: int) -> QuizPlayers:
-        json_data = self.redis_cli.get(
-            f"quiz_players_{quiz_code}"
-        )
-        quiz_players: QuizPlayers = QuizPlayers.from_json(json_data)
-        return quiz_players
+        raise NotImplementedError()
+
+    # overwrites the given player only, so concurrent updates of different players never conflict
+    def set_quiz_player(self, quiz_code: int, player: QuizPlayerRecord, score: QuizPlayerScore,
+                        leaderboard_score: int, expiration_seconds: int) -> None:
+        raise NotImplementedError()
+
+    # returns the stored JSON or None if the state was changed since it was read
+    def compare_and_set_state(self, q_state: QuizState, expected_json: bytes,
+                              expiration_seconds: int) -> Optional[bytes]:
+        raise NotImplementedError()
+
+    def lock_quiz_results(self, quiz_code: int, lock_seconds: int) -> bool:
+        raise NotImplementedError()
+
+    # the results are never overwritten once stored
+    def set_quiz_result(self, quiz_code: int, results: QuizResults, expiration_seconds: int) -> None:
+        raise NotImplementedError()
+
+    def schedule_transition(self, quiz_code: int, due: datetime) -> None:
+        raise NotImplementedError()
+
+    # a due quiz is leased to a single caller, it's claimed again once the lease is over
+    # unless the caller reschedules or removes its transition meanwhile
+    def claim_due_transitions(self, now: datetime, limit: int, lease_seconds: float) -> List[int]:
+        raise NotImplementedError()
+
+    def remove_transition(self, quiz_code: int) -> None:
+        raise NotImplementedError()
+
+    def publish_state_change(self, quiz_code: int, notice: QuizStateNotice) -> None:
+        raise NotImplementedError()
+
+    # raises if the quiz doesn't exist
+    def read_quiz_snapshot(self, quiz_code: int, context: Optional[QuizStateContext] = None,
+                           user_token: Optional[str] = None) -> QuizStateSnapshot:
+        raise NotImplementedError()
+
+    # the missing quizes are left for the operations to fail on
+    def prefetch_quiz_snapshots(self, user_tokens: Dict[int, List[str]], context: QuizStateContext) -> None:
+        raise NotImplementedError()
+
+    def read_quiz_player(self, quiz_code: int, user_token: str) -> Optional[QuizPlayerRecord]:
+        raise NotImplementedError()
+
+    # all the players in the joining order
+    def read_quiz_players(self, quiz_code: int) -> List[QuizPlayerRecord]:
+        raise NotImplementedError()
+
+    def read_player_scores(self, quiz_code: int) -> Dict[str, QuizPlayerScore]:
+        raise NotImplementedError()
+
+    # returns the top players with their scores and the requesting player's name, rank and score
+    def read_leaderboard(self, quiz_code: int, top: int, user_token: Optional[str] = None
+                         ) -> Tuple[List[Tuple[str, float]], Optional[Tuple[str, int, float]]]:
+        raise NotImplementedError()
 
     def read_quiz_results(self, quiz_code: int) -> Optional[QuizResults]:
-        json_data = self.redis_cli.get(
-            f"quiz_results_{quiz_code}"
-        )
-        if not json_data:
-            return None
-        quiz_results: QuizResults = QuizResults.from_json(json_data)
-        return quiz_results
+        raise NotImplementedError()
+
+    # number of the stored quizes and their players
+    def count_quizes_and_players(self) -> Tuple[int, int]:
+        raise NotImplementedError()
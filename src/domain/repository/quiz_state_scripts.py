@@ -0,0 +1,89 @@
+# the scripts are short, so they are sent with EVAL rather than registered per client (or per cluster node),
+# the keys of a script always belong to one quiz, so they share the hash slot
+
+# increments the quiz's change counter and stores its value as the version of the changed part
+BUMP_VERSION = """
+local function bump_version(key, part, expiration)
+    local version = redis.call('HINCRBY', key, 'version', 1)
+    redis.call('HSET', key, part, version)
+    redis.call('EXPIRE', key, expiration)
+    return version
+end
+"""
+
+# stores a new quiz only if its code is free, the keys left by the previous quiz with the same code
+# outlive its state, so they are removed; KEYS[1] - state, KEYS[2..] - the other keys of the quiz,
+# ARGV[1] - state, ARGV[2] - expiration seconds, 0 for none
+CREATE_STATE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return 0
+end
+if #KEYS > 1 then
+    redis.call('DEL', unpack(KEYS, 2))
+end
+if tonumber(ARGV[2]) > 0 then
+    redis.call('SET', KEYS[1], ARGV[1], 'EX', ARGV[2])
+else
+    redis.call('SET', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+# replaces the state only if it's still the one the caller has read,
+# KEYS[1] - state, KEYS[2] - versions, ARGV[1] - expected value, ARGV[2] - new value, ARGV[3] - expiration seconds
+COMPARE_AND_SET_SCRIPT = BUMP_VERSION + """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+    bump_version(KEYS[2], 'state', ARGV[3])
+    return 1
+end
+return 0
+"""
+
+# adds a name unless it's taken, returns the joining index or -1,
+# KEYS[1] - names set, KEYS[2] - names list, KEYS[3] - versions, ARGV[1] - name, ARGV[2] - expiration seconds
+CLAIM_PLAYER_NAME_SCRIPT = BUMP_VERSION + """
+if redis.call('SADD', KEYS[1], ARGV[1]) == 0 then
+    return -1
+end
+local count = redis.call('RPUSH', KEYS[2], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+bump_version(KEYS[3], 'names', ARGV[2])
+return count - 1
+"""
+
+# stores a new player, KEYS[1] - players, KEYS[2] - leaderboard,
+# ARGV[1] - user token, ARGV[2] - player, ARGV[3] - name, ARGV[4] - leaderboard score, ARGV[5] - expiration seconds
+ADD_PLAYER_SCRIPT = """
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('ZADD', KEYS[2], ARGV[4], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+redis.call('EXPIRE', KEYS[2], ARGV[5])
+return 1
+"""
+
+# overwrites a player with its score, KEYS[1] - players, KEYS[2] - scores, KEYS[3] - leaderboard,
+# KEYS[4] - names list, KEYS[5] - names set, KEYS[6] - versions, ARGV[1] - user token, ARGV[2] - player,
+# ARGV[3] - score, ARGV[4] - name, ARGV[5] - leaderboard score, ARGV[6] - expiration seconds
+SET_PLAYER_SCRIPT = BUMP_VERSION + """
+redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[3])
+redis.call('ZADD', KEYS[3], ARGV[5], ARGV[4])
+for i = 1, 5 do
+    redis.call('EXPIRE', KEYS[i], ARGV[6])
+end
+bump_version(KEYS[6], ARGV[1], ARGV[6])
+return 1
+"""
+
+# leases the due transitions: their score is moved to the end of the lease, so a claimed quiz is left out
+# of the other claims and is claimed again if the claimer fails to reschedule or remove it,
+# KEYS[1] - transitions, ARGV[1] - now, ARGV[2] - limit, ARGV[3] - lease end
+CLAIM_TRANSITIONS_SCRIPT = """
+local quiz_codes = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, quiz_code in ipairs(quiz_codes) do
+    redis.call('ZADD', KEYS[1], ARGV[3], quiz_code)
+end
+return quiz_codes
+"""
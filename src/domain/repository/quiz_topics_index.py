@@ -0,0 +1,50 @@
+import hashlib
+import json
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(settings.log_level)
+
+# stored next to the quiz directories and uploaded with them, so the topics are read without the quizes
+TOPICS_INDEX_FILE = "quiz_topics.json"
+
+
+@dataclass(frozen=True)
+class QuizTopicsIndexEntry:
+    name: str
+    # md5 of quiz_data.json, the same as the S3 ETag of an object uploaded in a single part
+    digest: str
+
+
+def content_digest(contents: bytes) -> str:
+    return hashlib.md5(contents).hexdigest()
+
+
+def encode_topics_index(entries: Dict[str, QuizTopicsIndexEntry]) -> bytes:
+    return json.dumps(
+        {quiz_id: {"name": entry.name, "digest": entry.digest} for quiz_id, entry in sorted(entries.items())},
+        indent=2
+    ).encode()
+
+
+def decode_topics_index(contents: Optional[bytes]) -> Dict[str, QuizTopicsIndexEntry]:
+    # a missing or unreadable index is empty, the topics are then read from the quizes
+    if not contents:
+        return {}
+    try:
+        return {quiz_id: QuizTopicsIndexEntry(name=entry["name"], digest=entry["digest"])
+                for quiz_id, entry in json.loads(contents).items()}
+    except Exception as e:
+        logger.warning("Quiz topics index can't be read: %s", e)
+        return {}
+
+
+if __name__ == "__main__":
+    from domain.repository.quiz_metadata_fs_repository import QuizMetadataFsRepository
+
+    count = QuizMetadataFsRepository().write_topics_index()
+    print(f"Stored {count} topics in {settings.quiz_path}/{TOPICS_INDEX_FILE}")
@@ -0,0 +1,50 @@
+from typing import Any, Dict, Union
+
+import redis
+import redis.asyncio as aioredis
+from redis.asyncio.cluster import RedisCluster as AsyncRedisCluster
+from redis.cluster import RedisCluster
+
+from settings import settings
+
+
+def _connection_kwargs() -> Dict[str, Any]:
+    return {
+        "max_connections": settings.redis_max_connections,
+        "socket_timeout": settings.redis_socket_timeout,
+        "socket_connect_timeout": settings.redis_socket_connect_timeout
+    }
+
+
+def has_replicas() -> bool:
+    return bool(settings.redis_replica_host) or (settings.redis_cluster and settings.redis_read_from_replicas)
+
+
+def create_redis_client(replica: bool = False) -> Union[redis.Redis, RedisCluster]:
+    # the replica client serves the read-only calls only, so they never see a write of the same request
+    if settings.redis_cluster:
+        # the other nodes are discovered from the given one
+        return RedisCluster(host=settings.redis_host, port=settings.redis_port,
+                            read_from_replicas=replica and settings.redis_read_from_replicas, **_connection_kwargs())
+    host, port = settings.redis_host, settings.redis_port
+    if replica and settings.redis_replica_host:
+        host, port = settings.redis_replica_host, settings.redis_replica_port
+    return redis.Redis(connection_pool=redis.ConnectionPool(host=host, port=port, **_connection_kwargs()))
+
+
+def create_async_redis_client(replica: bool = False) -> Union[aioredis.Redis, AsyncRedisCluster]:
+    if settings.redis_cluster:
+        return AsyncRedisCluster(host=settings.redis_host, port=settings.redis_port,
+                                 read_from_replicas=replica and settings.redis_read_from_replicas,
+                                 **_connection_kwargs())
+    host, port = settings.redis_host, settings.redis_port
+    if replica and settings.redis_replica_host:
+        host, port = settings.redis_replica_host, settings.redis_replica_port
+    return aioredis.Redis(connection_pool=aioredis.ConnectionPool(host=host, port=port, **_connection_kwargs()))
+
+
+def create_async_pubsub_client() -> aioredis.Redis:
+    # the async cluster client has no pub/sub, but a cluster delivers the messages
+    # published on any node to the subscribers of every node, so the given node is subscribed to
+    return aioredis.Redis(connection_pool=aioredis.ConnectionPool(
+        host=settings.redis_host, port=settings.redis_port, **_connection_kwargs()))
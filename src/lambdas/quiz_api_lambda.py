@@ -1,51 +1,79 @@
 import json
+import logging
+import time
 from typing import Dict, Any
 
+from domain.quiz_batch import quiz_batch_processor
+from domain.quiz_codec import codec
 from domain.quiz_manager import quiz_manager
+from domain.quiz_metrics import registry, lambda_request_seconds, errors_total
 from domain.quiz_requests import QuizStartRequest, QuizJoinRequest, QuizStatusRequest, ScheduleQuizRequest, \
-    StoreAnswerRequest
+    StoreAnswerRequest, QuizLeaderboardRequest, QuizBatchRequest
 from domain.quiz_state import QuizResultsAndData
+from settings import settings
+
+logger = logging.getLogger(__name__)
+logger.setLevel(settings.log_level)
 
 
 def get_topics(_request_data: Any) -> str:
-    return json.dumps([q.to_dict() for q in quiz_manager.get_quiz_topics()])
+    return codec.encode(quiz_manager.get_quiz_topics()).decode()
 
 
 def start_quiz(request_data: Dict[str, Any]) -> str:
-    return quiz_manager.start_quiz(
+    return codec.encode(quiz_manager.start_quiz(
         QuizStartRequest.from_dict(request_data)
-    ).to_json()
+    )).decode()
 
 
 def join_quiz(request_data: Dict[str, Any]) -> str:
-    return quiz_manager.join_quiz(
-        QuizJoinRequest.from_dict(request_data)).to_json()
+    return codec.encode(quiz_manager.join_quiz(
+        QuizJoinRequest.from_dict(request_data))).decode()
 
 
 def check_status(request_data: Dict[str, Any]) -> str:
-    return quiz_manager.get_quiz_status(
-        QuizStatusRequest.from_dict(request_data)).to_json()
+    return codec.encode(quiz_manager.get_quiz_status(
+        QuizStatusRequest.from_dict(request_data))).decode()
 
 
 def schedule_quiz(request_data: Dict[str, Any]) -> str:
-    return quiz_manager.schedule_quiz(
+    return codec.encode(quiz_manager.schedule_quiz(
         ScheduleQuizRequest.from_dict(request_data)
-    ).to_json()
+    )).decode()
 
 
 def answer_quiz(request_data: Dict[str, Any]) -> str:
-    return quiz_manager.store_answer(
-        StoreAnswerRequest.from_dict(request_data)).to_json()
+    return codec.encode(quiz_manager.store_answer(
+        StoreAnswerRequest.from_dict(request_data))).decode()
 
 
 def get_quiz_results(quiz_code: int) -> str:
     results = quiz_manager.get_quiz_results(quiz_code)
     if results:
         results = QuizResultsAndData(quiz_results=results[0], quiz_data=results[1])
-        return results.to_json()
+        return codec.encode(results).decode()
     return ""
 
 
+def get_quiz_leaderboard(request_data: Dict[str, Any]) -> str:
+    return codec.encode(quiz_manager.get_quiz_leaderboard(
+        QuizLeaderboardRequest.from_dict(request_data))).decode()
+
+
+def apply_transitions(_request_data: Any) -> str:
+    # invoked on a schedule when the transitions are applied by the scheduler
+    return json.dumps(quiz_manager.apply_due_transitions())
+
+
+def run_batch(request_data: Dict[str, Any]) -> str:
+    # {"operations": [{"requested_operation": "quiz-answer", "payload": {...}}, ...]}
+    return quiz_batch_processor.run(QuizBatchRequest.from_dict(request_data), codec.encode).decode()
+
+
+def get_metrics(_request_data: Any) -> str:
+    return registry.render()
+
+
 function_by_request = {
     "quiz-topics": get_topics,
     "quiz-start": start_quiz,
@@ -53,7 +81,11 @@ function_by_request = {
     "quiz-check-status": check_status,
     "quiz-schedule": schedule_quiz,
     "quiz-answer": answer_quiz,
-    "quiz-results": get_quiz_results
+    "quiz-results": get_quiz_results,
+    "quiz-leaderboard": get_quiz_leaderboard,
+    "quiz-apply-transitions": apply_transitions,
+    "quiz-batch": run_batch,
+    "quiz-metrics": get_metrics
 }
 
 
@@ -70,7 +102,26 @@ def lambda_handler(event: Dict[str, Any], ctx = None) -> Dict[str, Any]:
         raise Exception(f"The 'requested_operation' field value ({event_data['requested_operation']})"
                         "is incorrect, expected one of the following values: " +
                         ", ".join(function_by_request.keys()))
-    response_data = processor(event_data.get("payload"))
+    operation = event_data["requested_operation"]
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        response_data = processor(event_data.get("payload"))
+    except Exception as e:
+        status = "error"
+        errors_total.inc("lambda", type(e).__name__)
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        lambda_request_seconds.observe(duration, operation, status)
+        # one JSON line per request, so the CloudWatch Logs Insights queries can aggregate them
+        logger.info(json.dumps({
+            "event": "quiz_request",
+            "operation": operation,
+            "status": status,
+            "duration_ms": round(duration * 1000, 3),
+            "request_id": getattr(ctx, "aws_request_id", None)
+        }))
     return {
         "statusCode": 200,
         'body': json.dumps(response_data)
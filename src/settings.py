@@ -6,10 +6,54 @@ STORAGE_PATH = os.path.join(STORAGE_PATH, "..", "storage")
 
 
 class Settings(BaseSettings):
+    # "redis" or "memory" - the quizes are kept within the process, it suits a single node and the test runs
+    state_backend: str = Field("redis")
+    # how often the in-memory backend removes the expired keys, they are never read once expired anyway
+    memory_sweep_seconds: float = Field(5)
     redis_host: str = Field("localhost")
     redis_port: int = Field(6379)
+    # redis_host/redis_port is any node of a Redis Cluster, the other ones are discovered
+    redis_cluster: bool = Field(False)
+    # the read-only calls (results, leaderboard, metrics scans) go to the replica endpoint of
+    # a standalone Redis, or to the shards' replicas of a cluster with redis_read_from_replicas
+    redis_replica_host: str = Field("")
+    redis_replica_port: int = Field(6379)
+    redis_read_from_replicas: bool = Field(False)
+    # connections per pool, there is a pool per process and client (per event loop for the async ones)
+    redis_max_connections: int = Field(100)
+    redis_socket_timeout: float = Field(5)
+    redis_socket_connect_timeout: float = Field(2)
     storage_uri: str = Field(STORAGE_PATH)
     storage_type: str = Field("fs")
+    log_level: str = Field("INFO")
+    # max number of quiz files fetched from S3 concurrently
+    s3_read_concurrency: int = Field(16)
+    # read only the topics at start-up and the quizes on demand
+    quiz_catalog_lazy: bool = Field(False)
+    # max number of quizes kept in memory by the lazy catalog
+    quiz_cache_size: int = Field(128)
+    # prebuilt catalog, see domain/quiz_catalog_snapshot.py, an empty path disables it
+    quiz_snapshot_path: str = Field(os.path.join(STORAGE_PATH, "quiz_catalog.pickle"))
+    # how often the quizes are checked for changes, 0 disables the refresh
+    quiz_catalog_refresh_seconds: int = Field(0)
+    # rooms with at least that many players are ranked with numpy when it's installed
+    scoring_batch_threshold: int = Field(1000)
+    # transitions are stored by a background scheduler, the reads don't write
+    transition_scheduler: bool = Field(False)
+    transition_poll_seconds: float = Field(0.2)
+    # the quiz codes are drawn from [0, quiz_code_space), keep it small enough to type the codes
+    quiz_code_space: int = Field(1000000)
+    # a new quiz fails when that many drawn codes in a row are taken
+    quiz_code_attempts: int = Field(10)
+    # the encoded results of that many finished quizes are kept in memory for that long
+    results_cache_size: int = Field(1024)
+    results_cache_seconds: int = Field(300)
+    # Cache-Control max-age of the topics, they only change with the catalog
+    topics_max_age_seconds: int = Field(60)
+    # the active quizes and players are counted at most that often for the metrics
+    metrics_scan_seconds: int = Field(15)
+    # "fast" (generated encoders + orjson) or "dataclasses_json"
+    codec: str = Field("fast")
 
     @property
     def quiz_path(self) -> str:
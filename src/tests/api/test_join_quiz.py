@@ -1,8 +1,11 @@
+import asyncio
+
 import pytest
 
 from tests.api.api_test_client import TEST_BASE_URL, responses_client, HEADERS_JSON_CONTENT_TYPE, start_quiz
 
 URI_QUIZ_JOIN = f"{TEST_BASE_URL}/api/quiz-join"
+URI_QUIZ_CHECK_STATUS = f"{TEST_BASE_URL}/api/quiz-check-status"
 
 
 @pytest.mark.asyncio
@@ -19,3 +22,40 @@ async def test_quiz_join():
     assert "all_user_names" in res_json
     assert len(res_json["all_user_names"]) == 2
     assert "Bart" in res_json["all_user_names"]
+
+
+@pytest.mark.asyncio
+async def test_quiz_concurrent_joins_are_not_lost():
+    quiz_code, token = await start_quiz()
+
+    names = [f"Player {i}" for i in range(20)]
+    await asyncio.gather(*[
+        responses_client.post(
+            url=URI_QUIZ_JOIN, headers=HEADERS_JSON_CONTENT_TYPE,
+            json={"quiz_code": quiz_code, "user_name": name}
+        ) for name in names
+    ])
+
+    data = {"quiz_code": quiz_code, "user_token": token}
+    res = await responses_client.post(
+        url=URI_QUIZ_CHECK_STATUS, headers=HEADERS_JSON_CONTENT_TYPE, json=data
+    )
+    res_json = res.json()
+    assert res_json["all_user_names"][0] == "Alph"
+    assert sorted(res_json["all_user_names"][1:]) == sorted(names)
+
+
+@pytest.mark.asyncio
+async def test_quiz_concurrent_joins_with_same_name():
+    quiz_code, _ = await start_quiz()
+
+    results = await asyncio.gather(*[
+        responses_client.post(
+            url=URI_QUIZ_JOIN, headers=HEADERS_JSON_CONTENT_TYPE,
+            json={"quiz_code": quiz_code, "user_name": "Bart"}
+        ) for _ in range(5)
+    ])
+    assert sorted(r.status_code for r in results) == [200, 500, 500, 500, 500]
+    joined = [r.json() for r in results if r.status_code == 200][0]
+    assert joined["all_user_names"] == ["Alph", "Bart"]
+    assert joined["user"]["name"] == "Bart"
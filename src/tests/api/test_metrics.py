@@ -0,0 +1,24 @@
+import pytest
+
+from tests.api.api_test_client import TEST_BASE_URL, responses_client, start_quiz
+
+URI_METRICS = f"{TEST_BASE_URL}/metrics"
+
+
+@pytest.mark.asyncio
+async def test_metrics():
+    await start_quiz()
+    await responses_client.get(url=f"{TEST_BASE_URL}/api/quiz-results/-5")
+
+    res = await responses_client.get(url=URI_METRICS)
+
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/plain")
+    text = res.text
+    assert 'quiz_http_request_seconds_count{method="POST",endpoint="/api/quiz-start",status="200"}' in text
+    assert 'quiz_http_request_seconds_count{method="GET",endpoint="/api/quiz-results/{quiz_code}",status="200"}' in text
+    assert 'quiz_redis_round_trip_seconds_count{operation="create_state"}' in text
+    assert 'quiz_codec_seconds_count{operation="encode_response"}' in text
+    assert 'quiz_code_draws_total{result="allocated"}' in text
+    active_quizes = [line for line in text.splitlines() if line.startswith("quiz_active_quizes ")]
+    assert active_quizes and int(active_quizes[0].split()[1]) >= 1
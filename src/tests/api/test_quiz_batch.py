@@ -0,0 +1,59 @@
+import pytest
+from freezegun import freeze_time
+
+from domain.quiz_constants import QuizConstants
+from domain.quiz_metrics import redis_round_trip_seconds
+from tests.api.api_test_client import TEST_BASE_URL, responses_client, HEADERS_JSON_CONTENT_TYPE, start_quiz
+
+URI_QUIZ_BATCH = f"{TEST_BASE_URL}/api/quiz-batch"
+QUIZ_ID = "d729af45-5ed3-42d0-ac57-d4485b64b067"
+
+
+@pytest.mark.asyncio
+@freeze_time("2012-01-14 10:00:00.000")
+async def test_batch_answer_and_status():
+    quiz_code, token = await start_quiz(topic_id=QUIZ_ID, question_seconds=10)
+    operations = [
+        {"requested_operation": "quiz-join", "payload": {"quiz_code": quiz_code, "user_name": "Bart"}},
+        {"requested_operation": "quiz-schedule",
+         "payload": {"quiz_code": quiz_code, "user_token": token, "delay_seconds": 0}},
+    ]
+    res = await responses_client.post(url=URI_QUIZ_BATCH, headers=HEADERS_JSON_CONTENT_TYPE,
+                                      json={"operations": operations})
+    assert [r["status_code"] for r in res.json()] == [200, 200]
+
+    reads = redis_round_trip_seconds.count("read_quiz_snapshot")
+    prefetches = redis_round_trip_seconds.count("prefetch_quiz_snapshots")
+    operations = [
+        {"requested_operation": "quiz-answer",
+         "payload": {"quiz_code": quiz_code, "user_token": token, "question_index": 0, "answer": [3]}},
+        {"requested_operation": "quiz-unknown", "payload": {}},
+        {"requested_operation": "quiz-check-status", "payload": {"quiz_code": quiz_code, "user_token": token}},
+        {"requested_operation": "quiz-results", "payload": {"quiz_code": quiz_code}},
+    ]
+    with freeze_time("2012-01-14 10:00:01.000"):
+        res = await responses_client.post(url=URI_QUIZ_BATCH, headers=HEADERS_JSON_CONTENT_TYPE,
+                                          json={"operations": operations})
+
+    assert res.status_code == 200
+    answer, unknown, status, results = res.json()
+    assert answer["requested_operation"] == "quiz-answer" and answer["status_code"] == 200
+    assert answer["body"]["user"]["answers"][0]["answer"] == [3]
+    assert unknown["status_code"] == 500 and "quiz-unknown" in unknown["body"]["detail"]
+    # the status check sees the answer stored by the previous operation
+    assert status["status_code"] == 200
+    assert status["body"]["state"]["status"] == "STARTED"
+    assert status["body"]["user"]["answers"][0]["answer"] == [3]
+    assert status["body"]["all_user_names"] == ["Alph", "Bart"]
+    assert results == {"requested_operation": "quiz-results", "status_code": 200, "body": None}
+    # the quiz was read once for the whole batch
+    assert redis_round_trip_seconds.count("prefetch_quiz_snapshots") == prefetches + 1
+    assert redis_round_trip_seconds.count("read_quiz_snapshot") == reads
+
+
+@pytest.mark.asyncio
+async def test_batch_too_large():
+    operations = [{"requested_operation": "quiz-topics"}] * (QuizConstants.BATCH_MAX_OPERATIONS + 1)
+    res = await responses_client.post(url=URI_QUIZ_BATCH, headers=HEADERS_JSON_CONTENT_TYPE,
+                                      json={"operations": operations})
+    assert res.status_code == 500
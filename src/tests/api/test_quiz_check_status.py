@@ -55,3 +55,39 @@ async def test_quiz_current_question_is_set():
     assert res_json
     assert res_json["state"]["cur_question_index"] == [1, 2]
     assert res_json["state"]["cur_question"]["question_type"] == "MULTI_CHOICE"
+
+
+@pytest.mark.asyncio
+async def test_quiz_check_status_returns_changes_only():
+    quiz_code, token = await start_quiz()
+
+    async def check_status(version=None):
+        data = {"quiz_code": quiz_code, "user_token": token, "version": version}
+        res = await responses_client.post(
+            url=URI_QUIZ_CHECK_STATUS, headers=HEADERS_JSON_CONTENT_TYPE, json=data
+        )
+        return res.json()
+
+    full = await check_status()
+    assert full["all_user_names"] == ["Alph"]
+    version = full["version"]
+
+    # nothing changed since the last status
+    assert await check_status(version) == {
+        "version": version, "modified": False, "state": None, "user": None, "all_user_names": None
+    }
+
+    await responses_client.post(
+        url=f"{TEST_BASE_URL}/api/quiz-join", headers=HEADERS_JSON_CONTENT_TYPE,
+        json={"quiz_code": quiz_code, "user_name": "Bart"}
+    )
+    delta = await check_status(version)
+    assert delta["modified"] and delta["version"] > version
+    assert delta["all_user_names"] == ["Alph", "Bart"]
+    assert delta["state"] is None and delta["user"] is None
+
+    data = {"quiz_code": quiz_code, "user_token": token, "delay_seconds": 5}
+    await responses_client.post(url=URI_QUIZ_SCHEDULE, headers=HEADERS_JSON_CONTENT_TYPE, json=data)
+    delta = await check_status(delta["version"])
+    assert delta["state"]["status"] == "SCHEDULED"
+    assert delta["all_user_names"] is None and delta["user"] is None
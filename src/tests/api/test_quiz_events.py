@@ -0,0 +1,93 @@
+import asyncio
+import json
+from unittest import mock
+
+import pytest
+import redis.asyncio
+from freezegun import freeze_time
+
+from domain.quiz_event_broker import quiz_event_broker
+from domain.quiz_manager import quiz_manager
+from domain.quiz_state import QuizStateNotice, QuizStatusCode
+from domain.repository.quiz_state_backends import create_state_repositories
+from domain.repository.quiz_state_keys import QuizStateKeys
+from domain.repository.quiz_state_memory_store import quiz_state_memory_store
+from settings import settings
+from tests.api.api_test_client import TEST_BASE_URL, responses_client, HEADERS_JSON_CONTENT_TYPE, start_quiz
+
+URI_QUIZ_EVENTS = f"{TEST_BASE_URL}/api/quiz-events"
+URI_QUIZ_JOIN = f"{TEST_BASE_URL}/api/quiz-join"
+
+
+@pytest.mark.asyncio
+async def test_join_is_pushed_to_subscribers():
+    quiz_code, _ = await start_quiz()
+
+    async with quiz_event_broker.subscribe(quiz_code) as first, quiz_event_broker.subscribe(quiz_code) as second:
+        await _wait_for_listener(quiz_code)
+        data = {"quiz_code": quiz_code, "user_name": "Bart"}
+        await responses_client.post(
+            url=URI_QUIZ_JOIN, headers=HEADERS_JSON_CONTENT_TYPE, json=data
+        )
+        for changes in (first, second):
+            change = await asyncio.wait_for(changes.get(), 2)
+            assert change.all_user_names == ["Alph", "Bart"]
+            assert change.user is None
+
+
+@pytest.mark.asyncio
+async def test_player_change_is_pushed_to_that_player_only():
+    quiz_code, token = await start_quiz()
+    state_repo, _ = create_state_repositories()
+
+    async with quiz_event_broker.subscribe(quiz_code, token) as own, quiz_event_broker.subscribe(quiz_code) as other:
+        await _wait_for_listener(quiz_code)
+        state_repo.publish_state_change(quiz_code, QuizStateNotice(QuizStatusCode.PENDING, token))
+        change = await asyncio.wait_for(own.get(), 2)
+        assert change.user.user_token == token
+        assert change.all_user_names == ["Alph"]
+        assert other.empty()
+
+
+@pytest.mark.asyncio
+async def test_failed_subscription_ends_the_stream():
+    quiz_code, _ = await start_quiz()
+
+    with mock.patch.object(quiz_manager, "subscribe_state_changes_async", side_effect=Exception("Connection reset")):
+        async with quiz_event_broker.subscribe(quiz_code) as changes:
+            assert await asyncio.wait_for(changes.get(), 2) is None
+
+    # the failed listener doesn't stay registered, the next subscriber starts a new one
+    async with quiz_event_broker.subscribe(quiz_code) as changes:
+        await _wait_for_listener(quiz_code)
+        data = {"quiz_code": quiz_code, "user_name": "Bart"}
+        await responses_client.post(url=URI_QUIZ_JOIN, headers=HEADERS_JSON_CONTENT_TYPE, json=data)
+        assert (await asyncio.wait_for(changes.get(), 2)).all_user_names == ["Alph", "Bart"]
+
+
+@pytest.mark.asyncio
+async def test_events_stream_ends_with_expired_quiz():
+    with freeze_time("2012-01-14 10:00:00.000"):
+        quiz_code, token = await start_quiz()
+
+    res = await responses_client.get(url=f"{URI_QUIZ_EVENTS}/{quiz_code}", params={"user_token": token})
+    assert res.headers["content-type"].startswith("text/event-stream")
+    events = [e for e in res.text.split("\n\n") if e]
+    assert len(events) == 1
+    event_name, event_data = events[0].split("\n")
+    assert event_name == "event: quiz-state"
+    assert json.loads(event_data[len("data: "):])["state"]["status"] == "EXPIRED"
+
+
+async def _wait_for_listener(quiz_code: int) -> None:
+    redis_cli = redis.asyncio.Redis(host=settings.redis_host, port=settings.redis_port)
+    channel = QuizStateKeys.events(quiz_code)
+    for _ in range(50):
+        if settings.state_backend == "memory":
+            subscribers = quiz_state_memory_store.count_subscribers(channel)
+        else:
+            (_, subscribers), = await redis_cli.pubsub_numsub(channel)
+        if subscribers:
+            break
+        await asyncio.sleep(0.05)
+    await redis_cli.close()
@@ -0,0 +1,52 @@
+import pytest
+from freezegun import freeze_time
+
+from domain.quiz_manager import quiz_manager
+from domain.quiz_requests import QuizLeaderboardRequest
+from tests.api.api_test_client import TEST_BASE_URL, responses_client, HEADERS_JSON_CONTENT_TYPE, start_quiz
+
+QUIZ_ID = "d729af45-5ed3-42d0-ac57-d4485b64b067"
+URI_QUIZ_JOIN = f"{TEST_BASE_URL}/api/quiz-join"
+URI_QUIZ_SCHEDULE = f"{TEST_BASE_URL}/api/quiz-schedule"
+URI_QUIZ_GIVE_ANSWER = f"{TEST_BASE_URL}/api/quiz-answer"
+URI_QUIZ_LEADERBOARD = f"{TEST_BASE_URL}/api/quiz-leaderboard"
+
+
+@pytest.mark.asyncio
+@freeze_time("2012-01-14 10:00:00.000")
+async def test_quiz_leaderboard():
+    quiz_code, token = await start_quiz(topic_id=QUIZ_ID)
+    tokens = {"Alph": token}
+    for name in ("Bart", "Cid"):
+        res = await responses_client.post(
+            url=URI_QUIZ_JOIN, headers=HEADERS_JSON_CONTENT_TYPE, json={"quiz_code": quiz_code, "user_name": name}
+        )
+        tokens[name] = res.json()["user"]["user_token"]
+    data = {"quiz_code": quiz_code, "user_token": token, "delay_seconds": 1}
+    await responses_client.post(url=URI_QUIZ_SCHEDULE, headers=HEADERS_JSON_CONTENT_TYPE, json=data)
+
+    # Alph answers correctly, Bart doesn't - the unanswered questions count as the whole question time
+    with freeze_time("2012-01-14 10:00:03.000"):
+        for name, answer in (("Bart", [0]), ("Alph", [3])):
+            data = {"quiz_code": quiz_code, "user_token": tokens[name], "question_index": 0, "answer": answer}
+            res = await responses_client.post(url=URI_QUIZ_GIVE_ANSWER, headers=HEADERS_JSON_CONTENT_TYPE, json=data)
+            assert res.status_code == 200
+
+    res = await responses_client.get(f"{URI_QUIZ_LEADERBOARD}/{quiz_code}", params={"top": 2})
+    res_json = res.json()
+    assert [(p["rank"], p["name"]) for p in res_json["players"]] == [(1, "Alph"), (2, "Cid")]
+    assert res_json["players"][0]["correct_answers"] == 1
+    assert res_json["players"][0]["total_answering_time"] == 2 + 9 * 10
+    assert res_json["user"] is None
+
+    res = await responses_client.get(f"{URI_QUIZ_LEADERBOARD}/{quiz_code}", params={"user_token": tokens["Bart"]})
+    res_json = res.json()
+    assert [p["name"] for p in res_json["players"]] == ["Alph", "Cid", "Bart"]
+    assert res_json["user"] == {"rank": 3, "name": "Bart", "correct_answers": 0, "total_answering_time": 92}
+
+    for top in (0, -1):
+        res = await responses_client.get(f"{URI_QUIZ_LEADERBOARD}/{quiz_code}", params={"top": top})
+        assert res.status_code == 422
+    # the other callers get the top player at least, never the whole leaderboard
+    leaderboard = await quiz_manager.get_quiz_leaderboard_async(QuizLeaderboardRequest(quiz_code=quiz_code, top=0))
+    assert [p.name for p in leaderboard.players] == ["Alph"]
@@ -10,6 +10,8 @@ URI_QUIZ_GIVE_ANSWER = f"{TEST_BASE_URL}/api/quiz-answer"
 URI_QUIZ_SCHEDULE = f"{TEST_BASE_URL}/api/quiz-schedule"
 URI_QUIZ_JOIN = f"{TEST_BASE_URL}/api/quiz-join"
 URI_QUIZ_RESULTS = f"{TEST_BASE_URL}/api/quiz-results"
+URI_QUIZ_CHECK_STATUS = f"{TEST_BASE_URL}/api/quiz-check-status"
+SHORT_QUIZ_ID = "b729af45-5ed3-42d0-ac57-d4485b64b067"
 
 
 @pytest.mark.asyncio
@@ -69,3 +71,27 @@ async def _get_quiz_results(quiz_code: int) -> Dict[str, Any]:
         url=url
     )
     return results.json()
+
+
+@pytest.mark.asyncio
+@freeze_time("2012-01-14 10:00:00.000")
+async def test_quiz_results_not_modified():
+    quiz_code, commander_token = await start_quiz(topic_id=SHORT_QUIZ_ID, question_seconds=1)
+    res = await responses_client.get(url=f"{URI_QUIZ_RESULTS}/{quiz_code}")
+    assert res.json() is None
+    assert res.headers["cache-control"] == "no-store"
+
+    await _schedule_quiz(quiz_code, commander_token)
+    with freeze_time("2012-01-14 10:00:05"):
+        # the status check finishes the quiz
+        data = {"quiz_code": quiz_code, "user_token": commander_token}
+        res = await responses_client.post(url=URI_QUIZ_CHECK_STATUS, headers=HEADERS_JSON_CONTENT_TYPE, json=data)
+        assert res.json()["state"]["status"] == "FINISHED"
+
+    res = await responses_client.get(url=f"{URI_QUIZ_RESULTS}/{quiz_code}")
+    assert res.json()["quiz_results"]["players"][0]["name"] == "Alph"
+    etag = res.headers["etag"]
+
+    res = await responses_client.get(url=f"{URI_QUIZ_RESULTS}/{quiz_code}", headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.headers["etag"] == etag
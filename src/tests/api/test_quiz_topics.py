@@ -14,3 +14,20 @@ async def test_get_topics():
     )
     res_json = res.json()
     assert len(res_json) == 2
+
+
+@pytest.mark.asyncio
+async def test_get_topics_not_modified():
+    res = await responses_client.get(url=URI_QUIZ_TOPICS)
+    etag = res.headers["etag"]
+    assert etag.startswith('"')
+    assert res.headers["cache-control"].startswith("public, max-age=")
+
+    res = await responses_client.get(url=URI_QUIZ_TOPICS, headers={"If-None-Match": etag})
+    assert res.status_code == 304
+    assert res.headers["etag"] == etag
+    assert not res.content
+
+    res = await responses_client.get(url=URI_QUIZ_TOPICS, headers={"If-None-Match": '"outdated"'})
+    assert res.status_code == 200
+    assert len(res.json()) == 2
@@ -0,0 +1,68 @@
+from unittest import mock
+
+import pytest
+from freezegun import freeze_time
+
+from domain.quiz_manager import quiz_manager
+from domain.quiz_state import QuizStatusCode
+from domain.quiz_state_update_manager import QuizStateUpdateManager
+from domain.repository.quiz_state_backends import create_state_repositories
+from settings import settings
+from tests.api.api_test_client import TEST_BASE_URL, responses_client, HEADERS_JSON_CONTENT_TYPE, start_quiz
+
+QUIZ_ID = "b729af45-5ed3-42d0-ac57-d4485b64b067"
+URI_QUIZ_SCHEDULE = f"{TEST_BASE_URL}/api/quiz-schedule"
+URI_QUIZ_CHECK_STATUS = f"{TEST_BASE_URL}/api/quiz-check-status"
+
+
+@pytest.mark.asyncio
+async def test_transitions_are_stored_by_the_scheduler(monkeypatch):
+    monkeypatch.setattr(settings, "transition_scheduler", True)
+    state_repo, _ = create_state_repositories()
+    with freeze_time("2012-01-14 10:00:00.000"):
+        quiz_code, token = await start_quiz(topic_id=QUIZ_ID)
+        data = {"quiz_code": quiz_code, "user_token": token, "delay_seconds": 5}
+        await responses_client.post(url=URI_QUIZ_SCHEDULE, headers=HEADERS_JSON_CONTENT_TYPE, json=data)
+        assert quiz_code not in await quiz_manager.apply_due_transitions_async()
+
+    with freeze_time("2012-01-14 10:00:06.000"):
+        # the reads see the due transition, but don't store it
+        data = {"quiz_code": quiz_code, "user_token": token}
+        res = await responses_client.post(url=URI_QUIZ_CHECK_STATUS, headers=HEADERS_JSON_CONTENT_TYPE, json=data)
+        assert res.json()["state"]["status"] == "STARTED"
+        assert state_repo.read_quiz_snapshot(quiz_code).q_state.status == QuizStatusCode.SCHEDULED
+
+        assert quiz_code in await quiz_manager.apply_due_transitions_async()
+        q_state = state_repo.read_quiz_snapshot(quiz_code).q_state
+        assert (q_state.status, q_state.cur_question_index) == (QuizStatusCode.STARTED, (0, 2))
+
+    with freeze_time("2012-01-14 10:00:16.000"):
+        assert quiz_code in quiz_manager.apply_due_transitions()
+        assert state_repo.read_quiz_snapshot(quiz_code).q_state.cur_question_index == (1, 2)
+
+    with freeze_time("2012-01-14 10:00:26.000"):
+        assert quiz_code in await quiz_manager.apply_due_transitions_async()
+        assert state_repo.read_quiz_snapshot(quiz_code).q_state.status == QuizStatusCode.FINISHED
+        assert quiz_manager.get_quiz_results(quiz_code)
+
+
+@pytest.mark.asyncio
+async def test_failed_transition_stays_queued(monkeypatch):
+    monkeypatch.setattr(settings, "transition_scheduler", True)
+    state_repo, _ = create_state_repositories()
+    with freeze_time("2012-01-14 10:00:00.000"):
+        quiz_code, token = await start_quiz(topic_id=QUIZ_ID)
+        data = {"quiz_code": quiz_code, "user_token": token, "delay_seconds": 5}
+        await responses_client.post(url=URI_QUIZ_SCHEDULE, headers=HEADERS_JSON_CONTENT_TYPE, json=data)
+
+    with freeze_time("2012-01-14 10:00:06.000"):
+        with mock.patch.object(QuizStateUpdateManager, "apply_transitions_async",
+                               side_effect=Exception("Redis timeout")):
+            assert quiz_code in await quiz_manager.apply_due_transitions_async()
+        # leased to the failed worker
+        assert quiz_code not in await quiz_manager.apply_due_transitions_async()
+        assert state_repo.read_quiz_snapshot(quiz_code).q_state.status == QuizStatusCode.SCHEDULED
+
+    with freeze_time("2012-01-14 10:00:16.000"):
+        assert quiz_code in await quiz_manager.apply_due_transitions_async()
+        assert state_repo.read_quiz_snapshot(quiz_code).q_state.status == QuizStatusCode.STARTED
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+from freezegun import freeze_time
+
+from domain.quiz_codec import codec
+from domain.quiz_state import QuizStateNotice, QuizStatusCode
+from domain.repository.quiz_state_backends import create_state_repositories
+from tests.api.api_test_client import TEST_BASE_URL, responses_client, HEADERS_JSON_CONTENT_TYPE, start_quiz
+
+URI_QUIZ_SCHEDULE = f"{TEST_BASE_URL}/api/quiz-schedule"
+URI_QUIZ_CHECK_STATUS = f"{TEST_BASE_URL}/api/quiz-check-status"
+URI_QUIZ_RESULTS = f"{TEST_BASE_URL}/api/quiz-results"
+
+
+@pytest.mark.asyncio
+async def test_state_is_not_overwritten_by_a_stale_transition():
+    quiz_code, _ = await start_quiz()
+    state_repo, _ = create_state_repositories()
+    first, second = state_repo.read_quiz_snapshot(quiz_code), state_repo.read_quiz_snapshot(quiz_code)
+
+    first.q_state.status = QuizStatusCode.EXPIRED
+    assert state_repo.compare_and_set_state(first.q_state, first.state_json, 60)
+    second.q_state.status = QuizStatusCode.EXPIRED
+    assert state_repo.compare_and_set_state(second.q_state, second.state_json, 60) is None
+
+
+@pytest.mark.asyncio
+async def test_concurrent_polls_finish_the_quiz_once():
+    with freeze_time("2012-01-14 10:00:00.000"):
+        quiz_code, token = await start_quiz(question_seconds=1)
+        data = {"quiz_code": quiz_code, "user_token": token, "delay_seconds": 1}
+        await responses_client.post(url=URI_QUIZ_SCHEDULE, headers=HEADERS_JSON_CONTENT_TYPE, json=data)
+
+    _, async_state_repo = create_state_repositories()
+    pubsub = await async_state_repo.subscribe_state_changes(quiz_code)
+    try:
+        # all the questions are over, every poll notices the quiz has to be finished
+        with freeze_time("2012-01-14 10:00:30.000"):
+            data = {"quiz_code": quiz_code, "user_token": token}
+            responses = await asyncio.gather(*[
+                responses_client.post(url=URI_QUIZ_CHECK_STATUS, headers=HEADERS_JSON_CONTENT_TYPE, json=data)
+                for _ in range(10)
+            ])
+        assert all(res.json()["state"]["status"] == "FINISHED" for res in responses)
+
+        changes = []
+        for _ in range(5):
+            # the subscription confirmation is returned as None as well
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=0.1)
+            if message:
+                changes.append(codec.decode(QuizStateNotice, message["data"]))
+        assert changes == [QuizStateNotice(QuizStatusCode.FINISHED)]
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.close()
+
+    res = await responses_client.get(url=f"{URI_QUIZ_RESULTS}/{quiz_code}")
+    assert [p["name"] for p in res.json()["quiz_results"]["players"]] == ["Alph"]
@@ -16,3 +16,13 @@ async def test_quiz_start():
     assert "state" in res_json
     assert "all_user_names" in res_json
     assert len(res_json["all_user_names"]) == 1
+
+
+@pytest.mark.asyncio
+async def test_quiz_start_unknown_topic():
+    data = {"topic_id": "00000000-0000-0000-0000-000000000000", "user_name": "Alph"}
+    res = await responses_client.post(
+        url=URI_QUIZ_START, headers=HEADERS_JSON_CONTENT_TYPE, json=data
+    )
+    assert res.status_code == 500
+    assert "wasn't found" in res.json()["detail"]
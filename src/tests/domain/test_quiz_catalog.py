@@ -0,0 +1,121 @@
+import pytest
+
+from typing import Dict, Tuple
+
+from domain.quiz_catalog import QuizCatalog, LazyQuizCatalog
+from domain.quiz_data import QuizData
+from domain.repository.quiz_metadata_fs_repository import QuizMetadataFsRepository
+
+FIRST_QUIZ_ID = "b729af45-5ed3-42d0-ac57-d4485b64b067"
+SECOND_QUIZ_ID = "d729af45-5ed3-42d0-ac57-d4485b64b067"
+
+
+class EditedQuizRepository(QuizMetadataFsRepository):
+    # renames the first quiz once it's edited
+    def __init__(self):
+        self.edited = False
+
+    def read_quiz_versions(self) -> Dict[str, str]:
+        versions = super().read_quiz_versions()
+        if self.edited:
+            versions[FIRST_QUIZ_ID] = "edited"
+        return versions
+
+    def read_quiz_and_version(self, quiz_id: str) -> Tuple[QuizData, str]:
+        quiz, version = super().read_quiz_and_version(quiz_id)
+        if self.edited and quiz_id == FIRST_QUIZ_ID:
+            quiz.name = "Edited"
+            version = "edited"
+        return quiz, version
+
+
+def test_lazy_catalog_matches_eager_catalog():
+    repo = QuizMetadataFsRepository()
+    eager = QuizCatalog(repo.read_quizes(), repo.read_quiz_versions())
+    lazy = LazyQuizCatalog(repo, 10)
+
+    assert {t.id: t.name for t in lazy.get_topics()} == {t.id: t.name for t in eager.get_topics()}
+    assert len(lazy) == len(eager)
+    for quiz_id in (FIRST_QUIZ_ID, SECOND_QUIZ_ID):
+        assert quiz_id in lazy
+        assert lazy.get_entry(quiz_id) == eager.get_entry(quiz_id)
+
+
+def test_lazy_catalog_evicts_least_recently_used():
+    lazy = LazyQuizCatalog(QuizMetadataFsRepository(), 1)
+    assert (lazy.hits, lazy.misses) == (0, 0)
+
+    first = lazy.get_quiz(FIRST_QUIZ_ID)
+    assert lazy.get_quiz(FIRST_QUIZ_ID) is first
+    assert (lazy.hits, lazy.misses) == (1, 1)
+
+    lazy.get_quiz(SECOND_QUIZ_ID)
+    assert lazy.get_quiz(FIRST_QUIZ_ID) is not first
+    assert (lazy.hits, lazy.misses) == (1, 3)
+
+
+def test_lazy_catalog_unknown_quiz():
+    lazy = LazyQuizCatalog(QuizMetadataFsRepository(), 1)
+    assert "../quiz" not in lazy
+    with pytest.raises(Exception):
+        lazy.get_entry("../quiz")
+    assert lazy.misses == 0
+
+
+@pytest.mark.parametrize("create_catalog", [
+    lambda repo: QuizCatalog(repo.read_quizes(), repo.read_quiz_versions()),
+    lambda repo: LazyQuizCatalog(repo, 10),
+])
+def test_catalog_refresh_keeps_started_version(create_catalog):
+    repo = EditedQuizRepository()
+    catalog = create_catalog(repo)
+    started = catalog.get_entry(FIRST_QUIZ_ID)
+    assert catalog.refresh(repo) == []
+
+    repo.edited = True
+    assert catalog.refresh(repo) == [FIRST_QUIZ_ID]
+    assert catalog.refresh(repo) == []
+
+    assert catalog.get_quiz(FIRST_QUIZ_ID).name == "Edited"
+    assert {t.id: t.name for t in catalog.get_topics()}[FIRST_QUIZ_ID] == "Edited"
+    assert catalog.get_entry(FIRST_QUIZ_ID, started.version) is started
+    assert catalog.get_entry(FIRST_QUIZ_ID, "unknown").quiz.name == "Edited"
+
+
+def test_lazy_catalog_fails_for_replaced_evicted_version():
+    repo = EditedQuizRepository()
+    lazy = LazyQuizCatalog(repo, 1)
+    started = lazy.get_entry(FIRST_QUIZ_ID)
+    lazy.get_entry(SECOND_QUIZ_ID)
+
+    repo.edited = True
+    assert lazy.refresh(repo) == [FIRST_QUIZ_ID]
+    with pytest.raises(Exception, match="no longer available"):
+        lazy.get_entry(FIRST_QUIZ_ID, started.version)
+    assert lazy.get_quiz(FIRST_QUIZ_ID).name == "Edited"
+
+
+def test_lazy_catalog_tags_read_quiz_with_its_version():
+    repo = EditedQuizRepository()
+    lazy = LazyQuizCatalog(repo, 1)
+    started = lazy.get_entry(FIRST_QUIZ_ID)
+    lazy.get_entry(SECOND_QUIZ_ID)
+
+    # changed before the refresh noticed it
+    repo.edited = True
+    entry = lazy.get_entry(FIRST_QUIZ_ID)
+    assert (entry.quiz.name, entry.version) == ("Edited", "edited")
+    with pytest.raises(Exception, match="no longer available"):
+        lazy.get_entry(FIRST_QUIZ_ID, started.version)
+
+
+def test_catalog_public_questions_hide_correct_answers():
+    repo = QuizMetadataFsRepository()
+    entry = QuizCatalog(repo.read_quizes()).get_entry(SECOND_QUIZ_ID)
+
+    assert len(entry.public_questions) == entry.question_count
+    for question, public_question in zip(entry.quiz.questions, entry.public_questions):
+        assert question.correct_answers
+        assert public_question.correct_answers == []
+        assert (public_question.text, public_question.answers, public_question.question_type) == \
+               (question.text, question.answers, question.question_type)
@@ -0,0 +1,37 @@
+from typing import Dict
+
+from domain.quiz_catalog_snapshot import build_snapshot, load_snapshot
+from domain.repository.quiz_metadata_fs_repository import QuizMetadataFsRepository
+
+
+class ChangedQuizRepository(QuizMetadataFsRepository):
+    def read_quiz_versions(self) -> Dict[str, str]:
+        versions = super().read_quiz_versions()
+        quiz_id = sorted(versions)[0]
+        versions[quiz_id] = f"{versions[quiz_id]}-changed"
+        return versions
+
+
+def test_snapshot_round_trip(tmp_path):
+    repo = QuizMetadataFsRepository()
+    snapshot_path = str(tmp_path / "quiz_catalog.pickle")
+
+    assert load_snapshot(snapshot_path, repo.read_quiz_versions()) is None
+    assert build_snapshot(repo, snapshot_path) == len(repo.read_quizes())
+
+    quizes = load_snapshot(snapshot_path, repo.read_quiz_versions())
+    assert sorted(quizes, key=lambda q: q.id) == sorted(repo.read_quizes(), key=lambda q: q.id)
+
+
+def test_stale_snapshot_is_ignored(tmp_path):
+    snapshot_path = str(tmp_path / "quiz_catalog.pickle")
+    build_snapshot(QuizMetadataFsRepository(), snapshot_path)
+
+    assert load_snapshot(snapshot_path, ChangedQuizRepository().read_quiz_versions()) is None
+
+
+def test_corrupted_snapshot_is_ignored(tmp_path):
+    snapshot_path = tmp_path / "quiz_catalog.pickle"
+    snapshot_path.write_bytes(b"not a snapshot")
+
+    assert load_snapshot(str(snapshot_path), QuizMetadataFsRepository().read_quiz_versions()) is None
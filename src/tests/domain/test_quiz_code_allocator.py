@@ -0,0 +1,41 @@
+import pytest
+
+from domain.quiz_code_allocator import QuizCodeAllocator
+
+CODE_SPACE = 20
+
+
+def test_allocator_never_reuses_taken_codes():
+    allocator = QuizCodeAllocator(CODE_SPACE, 1000)
+    taken = set()
+
+    def try_store(quiz_code: int) -> bool:
+        if quiz_code in taken:
+            return False
+        taken.add(quiz_code)
+        return True
+
+    codes = [allocator.allocate(try_store) for _ in range(CODE_SPACE)]
+
+    assert sorted(codes) == list(range(CODE_SPACE))
+    stats = allocator.stats()
+    assert stats.allocations == CODE_SPACE
+    assert stats.collisions > 0
+    assert stats.collision_rate == stats.collisions / (stats.collisions + stats.allocations)
+
+    with pytest.raises(Exception, match="No free quiz code"):
+        allocator.allocate(try_store)
+    stats = allocator.stats()
+    assert stats.failures == 1
+    assert stats.fill_estimate > 0.5
+
+
+@pytest.mark.asyncio
+async def test_allocator_async():
+    allocator = QuizCodeAllocator(CODE_SPACE, 10)
+
+    async def try_store(quiz_code: int) -> bool:
+        return True
+
+    assert 0 <= await allocator.allocate_async(try_store) < CODE_SPACE
+    assert allocator.stats().fill_estimate == 0
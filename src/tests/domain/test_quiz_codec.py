@@ -0,0 +1,54 @@
+import datetime
+import json
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from domain.quiz_codec import FastJsonCodec, DataclassesJsonCodec
+from domain.quiz_data import QuizQuestion, QuizQuestionType
+from domain.quiz_state import QuizState, QuizStatusCode, QuizPlayers, QuizPlayer, QuizUserRole, QuizPlayerAnswer, \
+    QuizResults, QuizResultsPlayer, UserQuizState
+
+STARTS_AT = datetime.datetime(2012, 1, 14, 10, 0, 1, 550000, tzinfo=datetime.timezone.utc)
+
+QUESTION = QuizQuestion(
+    image="", text="What Roman numeral corresponds to 2?", answers=["2", "II", "ii"],
+    correct_answers=[], question_type=QuizQuestionType.MULTI_CHOICE
+)
+PLAYER = QuizPlayer(
+    user_token="07d76bbd-51f6-4b7f-9d7a-59a6287c0a36", name="Alph", user_role=QuizUserRole.COMMANDER,
+    answers=[QuizPlayerAnswer(answer=[1], answer_given_seconds=1), QuizPlayerAnswer(answer=[])]
+)
+STATE = QuizState(
+    id="b729af45-5ed3-42d0-ac57-d4485b64b067", name="Тест", quiz_code=68571, status=QuizStatusCode.STARTED,
+    expires=STARTS_AT + datetime.timedelta(minutes=10), starts_at=STARTS_AT, question_seconds=10,
+    cur_question=QUESTION, cur_question_index=(1, 2), updates_in_seconds=3
+)
+MODELS = [
+    STATE,
+    QuizState(id="b729", name="Pending", quiz_code=1, status=QuizStatusCode.PENDING, expires=STARTS_AT),
+    QuizPlayers(players=[PLAYER, QuizPlayer(user_token="t", name="Bart", user_role=QuizUserRole.PLAYER, answers=[])]),
+    QuizResults(quiz_id="b729", quiz_name="Test", started_at=STARTS_AT, players=[
+        QuizResultsPlayer(name="Alph", correct_answers=1, total_answering_time=11, answers=PLAYER.answers)
+    ]),
+    UserQuizState(state=STATE, user=PLAYER, all_user_names=["Alph", "Bart"]),
+]
+
+
+@pytest.mark.parametrize("model", MODELS)
+def test_fast_codec_reads_dataclasses_json(model):
+    assert FastJsonCodec().decode(type(model), model.to_json()) == type(model).from_json(model.to_json())
+
+
+@pytest.mark.parametrize("model", MODELS)
+def test_dataclasses_json_reads_fast_codec(model):
+    encoded = FastJsonCodec().encode(model)
+    assert json.loads(encoded) == json.loads(model.to_json())
+    assert type(model).from_json(encoded) == type(model).from_json(model.to_json())
+
+
+@pytest.mark.parametrize("model", MODELS)
+def test_fast_codec_response_matches_to_dict(model):
+    expected = json.loads(DataclassesJsonCodec().encode_response(model))
+    assert json.loads(FastJsonCodec().encode_response(model)) == expected
+    assert expected == jsonable_encoder(model.to_dict())
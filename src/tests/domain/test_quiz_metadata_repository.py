@@ -0,0 +1,158 @@
+import io
+import json
+import os
+import shutil
+from typing import Dict, List, Optional
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+from domain.quiz_catalog import LazyQuizCatalog
+from domain.repository.quiz_metadata_fs_repository import QuizMetadataFsRepository
+from domain.repository.quiz_metadata_s3_repository import QuizMetadataS3Repository
+from domain.repository.quiz_topics_index import TOPICS_INDEX_FILE, QuizTopicsIndexEntry, content_digest, \
+    encode_topics_index
+from settings import settings
+
+FIRST_QUIZ_ID = "b729af45-5ed3-42d0-ac57-d4485b64b067"
+SECOND_QUIZ_ID = "d729af45-5ed3-42d0-ac57-d4485b64b067"
+
+
+def _read_local_quiz(quiz_id: str) -> bytes:
+    with open(os.path.join(settings.quiz_path, quiz_id, "quiz_data.json"), "rb") as file:
+        return file.read()
+
+
+def _rename_quiz(contents: bytes, name: str) -> bytes:
+    quiz = json.loads(contents)
+    quiz["name"] = name
+    return json.dumps(quiz).encode()
+
+
+class StubS3Client:
+    # serves the objects from memory, list_objects_v2 returns page_size keys at most
+    def __init__(self, objects: Dict[str, bytes], page_size: int):
+        self.objects = objects
+        self.page_size = page_size
+        self.reads: List[str] = []
+        self.pages = 0
+
+    def get_paginator(self, operation_name: str) -> "StubS3Paginator":
+        assert operation_name == "list_objects_v2"
+        return StubS3Paginator(self)
+
+    def list_objects_v2(self, Bucket: str, ContinuationToken: Optional[str] = None) -> dict:
+        self.pages += 1
+        names = sorted(self.objects)
+        start = int(ContinuationToken or 0)
+        page = {"IsTruncated": start + self.page_size < len(names)}
+        if page["IsTruncated"]:
+            page["NextContinuationToken"] = str(start + self.page_size)
+        page["Contents"] = [{"Key": name, "ETag": f'"{content_digest(self.objects[name])}"'}
+                            for name in names[start:start + self.page_size]]
+        return page
+
+    def get_object(self, Bucket: str, Key: str) -> dict:
+        if Key not in self.objects:
+            raise ClientError({"Error": {"Code": "NoSuchKey", "Message": Key}}, "GetObject")
+        self.reads.append(Key)
+        return {"Body": io.BytesIO(self.objects[Key]), "ETag": f'"{content_digest(self.objects[Key])}"'}
+
+
+class StubS3Paginator:
+    def __init__(self, client: StubS3Client):
+        self._client = client
+
+    def paginate(self, **kwargs):
+        token = None
+        while True:
+            page = self._client.list_objects_v2(**kwargs, **({"ContinuationToken": token} if token else {}))
+            yield page
+            if not page["IsTruncated"]:
+                return
+            token = page["NextContinuationToken"]
+
+
+def _create_s3_repo(client: StubS3Client) -> QuizMetadataS3Repository:
+    with mock.patch("boto3.client", return_value=client):
+        return QuizMetadataS3Repository()
+
+
+def test_fs_topics_are_read_from_index(tmp_path, monkeypatch):
+    shutil.copytree(settings.quiz_path, tmp_path, dirs_exist_ok=True)
+    monkeypatch.setattr(type(settings), "quiz_path", property(lambda self: str(tmp_path)))
+    repo = QuizMetadataFsRepository()
+    topics = {t.id: t.name for t in repo.read_topics()}
+    assert repo.write_topics_index() == 2
+
+    with mock.patch.object(QuizMetadataFsRepository, "_read_quiz_json", side_effect=Exception("Read")):
+        assert {t.id: t.name for t in repo.read_topics()} == topics
+
+    # a quiz changed after the index was written is read
+    quiz_file = tmp_path / FIRST_QUIZ_ID / "quiz_data.json"
+    quiz_file.write_bytes(_rename_quiz(quiz_file.read_bytes(), "Edited"))
+    index_mtime = os.stat(tmp_path / TOPICS_INDEX_FILE).st_mtime_ns
+    os.utime(quiz_file, ns=(index_mtime + 1, index_mtime + 1))
+    assert {t.id: t.name for t in repo.read_topics()} == {**topics, FIRST_QUIZ_ID: "Edited"}
+
+
+def test_s3_topics_are_read_from_index():
+    objects = {f"{quiz_id}/quiz_data.json": _read_local_quiz(quiz_id) for quiz_id in (FIRST_QUIZ_ID, SECOND_QUIZ_ID)}
+    index = {quiz_id: QuizTopicsIndexEntry(name=f"Indexed {quiz_id}",
+                                           digest=content_digest(objects[f"{quiz_id}/quiz_data.json"]))
+             for quiz_id in (FIRST_QUIZ_ID, SECOND_QUIZ_ID)}
+    client = StubS3Client({**objects, TOPICS_INDEX_FILE: encode_topics_index(index)}, 1000)
+    repo = _create_s3_repo(client)
+    assert {t.id: t.name for t in repo.read_topics()} == {quiz_id: e.name for quiz_id, e in index.items()}
+    assert client.reads == [TOPICS_INDEX_FILE]
+
+    # only the quiz uploaded after the index was written is read
+    first_key = f"{FIRST_QUIZ_ID}/quiz_data.json"
+    client.objects[first_key] = _rename_quiz(objects[first_key], "Edited")
+    client.reads.clear()
+    assert {t.id: t.name for t in repo.read_topics()} == {FIRST_QUIZ_ID: "Edited",
+                                                          SECOND_QUIZ_ID: index[SECOND_QUIZ_ID].name}
+    assert client.reads == [TOPICS_INDEX_FILE, first_key]
+
+
+def test_lazy_catalog_lists_s3_once():
+    objects = {f"{quiz_id}/quiz_data.json": _read_local_quiz(quiz_id) for quiz_id in (FIRST_QUIZ_ID, SECOND_QUIZ_ID)}
+    index = {quiz_id: QuizTopicsIndexEntry(name=f"Indexed {quiz_id}", digest=content_digest(contents))
+             for quiz_id, contents in ((key.partition("/")[0], contents) for key, contents in objects.items())}
+    client = StubS3Client({**objects, TOPICS_INDEX_FILE: encode_topics_index(index)}, 1000)
+
+    lazy = LazyQuizCatalog(_create_s3_repo(client), 10)
+    assert len(lazy) == 2
+    assert (client.pages, client.reads) == (1, [TOPICS_INDEX_FILE])
+
+
+def test_s3_topics_without_index():
+    objects = {f"{quiz_id}/quiz_data.json": _read_local_quiz(quiz_id) for quiz_id in (FIRST_QUIZ_ID, SECOND_QUIZ_ID)}
+    client = StubS3Client(objects, 1000)
+    topics = {t.id: t.name for t in _create_s3_repo(client).read_topics()}
+    assert topics == {t.id: t.name for t in QuizMetadataFsRepository().read_topics()}
+    assert sorted(client.reads) == sorted(objects)
+
+
+def test_s3_quizes_are_read_once_from_every_page(monkeypatch):
+    monkeypatch.setattr(settings, "s3_read_concurrency", 4)
+    quiz_ids = [f"{index:08x}-5ed3-42d0-ac57-d4485b64b067" for index in range(5)]
+    objects = {f"{quiz_id}/quiz_data.json": _rename_quiz(_read_local_quiz(FIRST_QUIZ_ID), f"Quiz {quiz_id}")
+               for quiz_id in quiz_ids}
+    client = StubS3Client({**objects, "not-a-quiz/quiz_data.json": b"{}"}, 2)
+    repo = _create_s3_repo(client)
+
+    quizes = repo.read_quizes()
+    assert client.pages == 3
+    assert sorted(client.reads) == sorted(objects)
+    assert [(q.id, q.name) for q in quizes] == [(quiz_id, f"Quiz {quiz_id}") for quiz_id in quiz_ids]
+    assert all(len(q.questions) == len(quizes[0].questions) > 0 for q in quizes)
+    quiz_versions = repo.read_quiz_versions()
+    assert sorted(quiz_versions) == quiz_ids
+    assert client.pages == 6
+
+    # the listing the caller has already done isn't repeated
+    client.reads.clear()
+    assert [q.id for q in repo.read_quizes(quiz_versions)] == quiz_ids
+    assert client.pages == 6
+    assert sorted(client.reads) == sorted(objects)
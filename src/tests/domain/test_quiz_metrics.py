@@ -0,0 +1,32 @@
+from domain.quiz_metrics import Counter, Gauge, Histogram, MetricsRegistry
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("test_seconds", "Test latency", ("operation",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, "read")
+
+    lines = histogram.render()
+
+    assert lines[:2] == ["# HELP test_seconds Test latency", "# TYPE test_seconds histogram"]
+    assert 'test_seconds_bucket{operation="read",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{operation="read",le="1"} 3' in lines
+    assert 'test_seconds_bucket{operation="read",le="+Inf"} 4' in lines
+    assert 'test_seconds_sum{operation="read"} 6.05' in lines
+    assert 'test_seconds_count{operation="read"} 4' in lines
+    assert histogram.count("read") == 4
+
+
+def test_registry_renders_all_metrics():
+    registry = MetricsRegistry()
+    counter = registry.register(Counter("test_errors_total", "Test errors", ("error",)))
+    registry.register(Gauge("test_players", "Test players", lambda: {(): 3}))
+    registry.register(Gauge("test_broken", "Test broken gauge", lambda: 1 / 0))
+    counter.inc('Key"Error')
+    counter.inc('Key"Error')
+
+    text = registry.render()
+
+    assert 'test_errors_total{error="Key\\"Error"} 2' in text
+    assert "# TYPE test_players gauge\ntest_players 3\n" in text
+    assert "# test_broken is unavailable: division by zero" in text
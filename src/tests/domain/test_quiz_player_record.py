@@ -0,0 +1,52 @@
+import json
+
+import pytest
+
+from domain.quiz_codec import FastJsonCodec, DataclassesJsonCodec
+from domain.quiz_player_record import QuizAnswerSheet, QuizPlayerRecord
+from domain.quiz_state import QuizPlayerAnswer, QuizUserRole
+
+
+def _create_record(question_count: int) -> QuizPlayerRecord:
+    answers = QuizAnswerSheet.unanswered(question_count, 100)
+    answers.set_answer(0, [2, 0], 25)
+    answers.set_answer(1, [1], 30)
+    return QuizPlayerRecord(user_token="07d76bbd-51f6-4b7f-9d7a-59a6287c0a36", name="Alph",
+                            user_role=QuizUserRole.COMMANDER, join_index=3, answers=answers)
+
+
+def test_answer_sheet_converts_to_api_answers():
+    player = _create_record(3).to_player()
+    assert player.answers == [
+        QuizPlayerAnswer(answer=[0, 2], answer_given_seconds=2.5),
+        QuizPlayerAnswer(answer=[1], answer_given_seconds=3),
+        QuizPlayerAnswer(answer=[], answer_given_seconds=10)
+    ]
+    assert (player.name, player.user_role, player.join_index) == ("Alph", QuizUserRole.COMMANDER, 3)
+    assert QuizAnswerSheet.from_answers(player.answers) == _create_record(3).answers
+
+
+def test_answer_sheet_rejects_unknown_options():
+    answers = QuizAnswerSheet.unanswered(1, 100)
+    with pytest.raises(Exception):
+        answers.set_answer(0, [32], 10)
+
+
+@pytest.mark.parametrize("codec", [FastJsonCodec(), DataclassesJsonCodec()])
+def test_record_round_trip(codec):
+    record = _create_record(10)
+    assert codec.decode(QuizPlayerRecord, codec.encode(record)) == record
+
+
+@pytest.mark.parametrize("codec", [FastJsonCodec(), DataclassesJsonCodec()])
+def test_record_reads_api_form(codec):
+    # the players stored before the answers were packed
+    record = _create_record(10)
+    assert codec.decode(QuizPlayerRecord, record.to_player().to_json()) == record
+
+
+def test_record_is_smaller_than_api_form():
+    record = _create_record(50)
+    codec = FastJsonCodec()
+    assert len(codec.encode(record)) * 2 < len(codec.encode(record.to_player()))
+    assert json.loads(codec.encode(record))["answer_masks"][:2] == [0b101, 0b10]
@@ -0,0 +1,90 @@
+import random
+from typing import List, Tuple
+
+import pytest
+
+from domain.quiz_catalog import QuizCatalogEntry
+from domain.quiz_data import QuizData, QuizQuestion, QuizQuestionType
+from domain.quiz_player_record import QuizAnswerSheet
+from domain.quiz_scoring import QuizScoringEngine
+from domain.quiz_state import QuizPlayer, QuizPlayerAnswer, QuizUserRole
+
+QUESTION_SECONDS = 10
+
+
+def _create_quiz_entry(rnd: random.Random, question_count: int) -> QuizCatalogEntry:
+    questions = [
+        QuizQuestion(image="", text=f"Question {i}", answers=["a", "b", "c", "d"],
+                     correct_answers=rnd.sample(range(4), rnd.randint(1, 2)),
+                     question_type=QuizQuestionType.MULTI_CHOICE)
+        for i in range(question_count)
+    ]
+    return QuizCatalogEntry.from_quiz(QuizData(id="quiz", name="Quiz", questions=questions))
+
+
+def _sorted_correct_answers(quiz_entry: QuizCatalogEntry) -> List[Tuple[int, ...]]:
+    return [tuple(sorted(q.correct_answers)) for q in quiz_entry.quiz.questions]
+
+
+def _create_players(rnd: random.Random, quiz_entry: QuizCatalogEntry, player_count: int) -> List[QuizPlayer]:
+    players = []
+    for i in range(player_count):
+        answers = []
+        # some players never answered, the others left some questions unanswered
+        if rnd.random() > 0.1:
+            answers = [QuizPlayerAnswer(answer=[], answer_given_seconds=QUESTION_SECONDS)] * quiz_entry.question_count
+            for q in rnd.sample(range(quiz_entry.question_count), rnd.randint(0, quiz_entry.question_count)):
+                correct = list(_sorted_correct_answers(quiz_entry)[q])
+                answer = correct[::-1] if rnd.random() > 0.5 else rnd.sample(range(4), 1)
+                answers[q] = QuizPlayerAnswer(answer=answer, answer_given_seconds=rnd.randint(0, QUESTION_SECONDS))
+        players.append(QuizPlayer(user_token=str(i), name=f"Player {i}", user_role=QuizUserRole.PLAYER,
+                                  answers=answers))
+    return players
+
+
+def _rank_players(quiz_entry: QuizCatalogEntry, players: List[QuizPlayer]) -> List[Tuple[int, Tuple[int, float]]]:
+    # the ranking as it was computed when the quiz finished before the scoring engine
+    players_scores: List[Tuple[int, float]] = [(0, 0)] * len(players)
+    for i, sorted_answers in enumerate(_sorted_correct_answers(quiz_entry)):
+        for player_index, player in enumerate(players):
+            if i >= len(player.answers):
+                continue
+            score = players_scores[player_index]
+            player_answers = tuple(sorted(player.answers[i].answer))
+            if sorted_answers == player_answers:
+                score = score[0] + 1, score[1]
+            score = score[0], score[1] + player.answers[i].answer_given_seconds
+            players_scores[player_index] = score
+    player_score_index = [(i, score) for i, score in enumerate(players_scores)]
+    player_score_index.sort(key=lambda item: (item[1][0], -item[1][1]), reverse=True)
+    return player_score_index
+
+
+@pytest.mark.parametrize("batch", [False, True])
+@pytest.mark.parametrize("seed, player_count", [(1, 0), (2, 1), (3, 50), (4, 3000)])
+def test_ranking_matches_full_recompute(batch, seed, player_count):
+    if batch:
+        pytest.importorskip("numpy")
+    rnd = random.Random(seed)
+    quiz_entry = _create_quiz_entry(rnd, 10)
+    players = _create_players(rnd, quiz_entry, player_count)
+    engine = QuizScoringEngine(batch_threshold=0 if batch else 1_000_000)
+
+    scores = [engine.score_answers(quiz_entry, QuizAnswerSheet.from_answers(player.answers)) for player in players]
+    ranking = [(i, (scores[i].correct_answers, scores[i].total_answering_time)) for i in engine.rank(scores)]
+
+    assert ranking == _rank_players(quiz_entry, players)
+
+
+def test_leaderboard_score_matches_ranking():
+    rnd = random.Random(5)
+    quiz_entry = _create_quiz_entry(rnd, 10)
+    players = _create_players(rnd, quiz_entry, 500)
+    engine = QuizScoringEngine(batch_threshold=1_000_000)
+    scores = [engine.score_answers(quiz_entry, QuizAnswerSheet.from_answers(player.answers)) for player in players]
+
+    leaderboard_scores = [engine.to_leaderboard_score(score, i) for i, score in enumerate(scores)]
+    assert sorted(range(len(scores)), key=lambda i: leaderboard_scores[i]) == engine.rank(scores)
+    for i, leaderboard_score in enumerate(leaderboard_scores):
+        # Redis keeps the scores as doubles
+        assert engine.from_leaderboard_score(float(leaderboard_score)) == (scores[i], i)
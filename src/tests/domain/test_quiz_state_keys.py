@@ -0,0 +1,13 @@
+from redis.cluster import key_slot
+
+from domain.repository.quiz_state_keys import QuizStateKeys
+
+
+def test_quiz_keys_share_cluster_slot():
+    keys = [QuizStateKeys.state(68571), *QuizStateKeys.parts(68571)]
+    assert len({key_slot(key.encode()) for key in keys}) == 1
+    assert key_slot(QuizStateKeys.state(68571).encode()) != key_slot(QuizStateKeys.state(68572).encode())
+
+
+def test_quiz_code_from_state_key():
+    assert QuizStateKeys.quiz_code(QuizStateKeys.state(68571).encode()) == 68571
@@ -0,0 +1,217 @@
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from domain.quiz_codec import codec
+from domain.quiz_player_record import QuizPlayerRecord, QuizAnswerSheet
+from domain.quiz_state import QuizState, QuizStatusCode, QuizUserRole, QuizPlayerScore, QuizResults, \
+    QuizStateNotice
+from domain.repository.quiz_state_async_memory_repository import AsyncQuizStateMemoryRepository
+from domain.repository.quiz_state_async_redis_repository import AsyncQuizStateRedisRepository
+from domain.repository.quiz_state_keys import QuizStateKeys
+from domain.repository.quiz_state_memory_repository import QuizStateMemoryRepository
+from domain.repository.quiz_state_memory_store import QuizStateMemoryStore, quiz_state_memory_store
+from domain.repository.quiz_state_redis_repository import QuizStateRedisRepository
+
+# every backend has to pass the same tests
+BACKENDS = {
+    "redis": lambda: (QuizStateRedisRepository(), AsyncQuizStateRedisRepository()),
+    "memory": lambda: (QuizStateMemoryRepository(), AsyncQuizStateMemoryRepository())
+}
+
+
+@pytest.fixture(params=list(BACKENDS))
+def repos(request):
+    return BACKENDS[request.param]()
+
+
+def _create_state(**kwargs) -> QuizState:
+    # the codes above the quiz code space never collide with the quizes of the API tests
+    return QuizState(id="quiz", name="Quiz", quiz_code=random.randrange(10 ** 7, 10 ** 8),
+                     status=QuizStatusCode.PENDING, expires=datetime(2030, 1, 1, tzinfo=timezone.utc), **kwargs)
+
+
+def _create_player(name: str, join_index: int) -> QuizPlayerRecord:
+    return QuizPlayerRecord(user_token=f"token-{name}", name=name, user_role=QuizUserRole.PLAYER,
+                            join_index=join_index, answers=QuizAnswerSheet.unanswered(2, 100))
+
+
+def _expire_now(state_repo, quiz_code: int, key: str) -> None:
+    # the key expires right away instead of the test waiting for it
+    if isinstance(state_repo, QuizStateMemoryRepository):
+        quiz_state_memory_store.expire(quiz_code, key, 0)
+    else:
+        state_repo.redis_cli.expire(key, 0)
+
+
+def test_state_is_created_once_and_compared_on_set(repos):
+    state_repo, _ = repos
+    q_state = _create_state()
+    assert state_repo.create_state(q_state, 60)
+    assert not state_repo.create_state(q_state, 60)
+
+    snapshot = state_repo.read_quiz_snapshot(q_state.quiz_code)
+    assert snapshot.q_state == q_state and snapshot.versions.version == 0
+    q_state.status = QuizStatusCode.STARTED
+    state_json = state_repo.compare_and_set_state(q_state, snapshot.state_json, 60)
+    assert state_json == codec.encode(q_state)
+    assert state_repo.compare_and_set_state(q_state, snapshot.state_json, 60) is None
+
+    snapshot = state_repo.read_quiz_snapshot(q_state.quiz_code)
+    assert snapshot.q_state.status == QuizStatusCode.STARTED
+    assert (snapshot.versions.version, snapshot.versions.state) == (1, 1)
+
+
+def test_missing_quiz_is_not_found(repos):
+    state_repo, _ = repos
+    with pytest.raises(Exception, match="not found"):
+        state_repo.read_quiz_snapshot(_create_state().quiz_code)
+
+
+def test_players_join_and_answer(repos):
+    state_repo, _ = repos
+    # the quizes of the earlier tests may expire meanwhile, a new quiz is joined until none does
+    for _ in range(3):
+        quizes, players = state_repo.count_quizes_and_players()
+        q_state = _create_state()
+        state_repo.create_state(q_state, 60)
+        for index, name in enumerate(["Alph", "Bart", "Carl"]):
+            assert state_repo.claim_player_name(q_state.quiz_code, name, 60) == index
+            state_repo.add_quiz_player(q_state.quiz_code, _create_player(name, index), 0, 60)
+        assert state_repo.claim_player_name(q_state.quiz_code, "Bart", 60) is None
+        counts = state_repo.count_quizes_and_players()
+        if counts == (quizes + 1, players + 3):
+            break
+    assert counts == (quizes + 1, players + 3)
+
+    bart = _create_player("Bart", 1)
+    bart.answers.set_answer(0, [1], 20)
+    state_repo.set_quiz_player(q_state.quiz_code, bart, QuizPlayerScore(1, 2), 5, 60)
+
+    snapshot = state_repo.read_quiz_snapshot(q_state.quiz_code, user_token=bart.user_token)
+    assert snapshot.quiz_players.names == ["Alph", "Bart", "Carl"]
+    assert snapshot.quiz_players.players == {bart.user_token: bart}
+    assert snapshot.versions.version == 4 and snapshot.versions.names == 3
+    assert snapshot.versions.player(bart.user_token) == 4
+    assert state_repo.read_quiz_player(q_state.quiz_code, "token-Carl") == _create_player("Carl", 2)
+    assert [p.name for p in state_repo.read_quiz_players(q_state.quiz_code)] == ["Alph", "Bart", "Carl"]
+    assert state_repo.read_player_scores(q_state.quiz_code) == {bart.user_token: QuizPlayerScore(1, 2)}
+
+    top_players, user = state_repo.read_leaderboard(q_state.quiz_code, 2, "token-Carl")
+    assert top_players == [("Alph", 0), ("Carl", 0)]
+    assert user == ("Carl", 1, 0)
+    for top in (0, -1):
+        assert state_repo.read_leaderboard(q_state.quiz_code, top, "token-Carl") == ([], ("Carl", 1, 0))
+    with pytest.raises(Exception, match="User token not found"):
+        state_repo.read_leaderboard(q_state.quiz_code, 2, "token-Dave")
+
+
+def test_results_are_stored_once(repos):
+    state_repo, _ = repos
+    q_state = _create_state()
+    state_repo.create_state(q_state, 60)
+    assert state_repo.read_quiz_results(q_state.quiz_code) is None
+    assert not state_repo.read_quiz_snapshot(q_state.quiz_code).has_results
+    assert state_repo.lock_quiz_results(q_state.quiz_code, 60)
+    assert not state_repo.lock_quiz_results(q_state.quiz_code, 60)
+
+    started_at = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    state_repo.set_quiz_result(q_state.quiz_code, QuizResults("quiz", "Quiz", started_at, []), 60)
+    state_repo.set_quiz_result(q_state.quiz_code, QuizResults("quiz", "Other", started_at, []), 60)
+    assert state_repo.read_quiz_results(q_state.quiz_code).quiz_name == "Quiz"
+    assert state_repo.read_quiz_snapshot(q_state.quiz_code).has_results
+
+
+def test_due_transitions_are_claimed_once(repos):
+    state_repo, _ = repos
+    now = datetime.now(timezone.utc) - timedelta(days=365)
+    first, second, later = _create_state().quiz_code, _create_state().quiz_code, _create_state().quiz_code
+    state_repo.schedule_transition(first, now - timedelta(seconds=2))
+    state_repo.schedule_transition(second, now - timedelta(seconds=1))
+    state_repo.schedule_transition(later, now + timedelta(seconds=1))
+
+    claimed = state_repo.claim_due_transitions(now, 1000, 10)
+    assert claimed.index(first) < claimed.index(second) and later not in claimed
+    assert first not in state_repo.claim_due_transitions(now, 1000, 10)
+    assert later in state_repo.claim_due_transitions(now + timedelta(seconds=1), 1000, 10)
+
+    # the claimed transitions are leased, the removed ones are never claimed again
+    state_repo.remove_transition(second)
+    claimed = state_repo.claim_due_transitions(now + timedelta(seconds=10), 1000, 10)
+    assert first in claimed and second not in claimed
+
+
+def test_state_expires(repos):
+    state_repo, _ = repos
+    q_state = _create_state()
+    state_repo.create_state(q_state, 1)
+    assert state_repo.read_quiz_snapshot(q_state.quiz_code).q_state == q_state
+    _expire_now(state_repo, q_state.quiz_code, QuizStateKeys.state(q_state.quiz_code))
+    with pytest.raises(Exception, match="not found"):
+        state_repo.read_quiz_snapshot(q_state.quiz_code)
+    assert state_repo.create_state(q_state, 60)
+
+
+def test_reused_code_starts_without_previous_players(repos):
+    state_repo, _ = repos
+    q_state = _create_state()
+    state_repo.create_state(q_state, 1)
+    assert state_repo.claim_player_name(q_state.quiz_code, "Alph", 60) == 0
+    state_repo.add_quiz_player(q_state.quiz_code, _create_player("Alph", 0), 0, 60)
+    _expire_now(state_repo, q_state.quiz_code, QuizStateKeys.state(q_state.quiz_code))
+
+    # only the state has expired, the code is free for a new quiz
+    assert state_repo.create_state(q_state, 60)
+    assert state_repo.claim_player_name(q_state.quiz_code, "Alph", 60) == 0
+    snapshot = state_repo.read_quiz_snapshot(q_state.quiz_code, user_token="token-Alph")
+    assert snapshot.quiz_players.names == ["Alph"] and not snapshot.quiz_players.players
+    assert snapshot.versions.version == 1
+    assert state_repo.read_leaderboard(q_state.quiz_code, 10) == ([], None)
+
+
+@pytest.mark.asyncio
+async def test_async_repository_sees_sync_writes(repos):
+    state_repo, async_state_repo = repos
+    q_state = _create_state()
+    assert await async_state_repo.create_state(q_state, 60)
+    assert await async_state_repo.claim_player_name(q_state.quiz_code, "Alph", 60) == 0
+    await async_state_repo.add_quiz_player(q_state.quiz_code, _create_player("Alph", 0), 0, 60)
+
+    pubsub = await async_state_repo.subscribe_state_changes(q_state.quiz_code)
+    try:
+        notice = QuizStateNotice(QuizStatusCode.PENDING, "token-Alph")
+        message = None
+        for _ in range(10):
+            # redis-py doesn't wait for the subscription to be confirmed, so the first changes may be missed
+            state_repo.publish_state_change(q_state.quiz_code, notice)
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=0.1)
+            if message:
+                break
+        assert codec.decode(QuizStateNotice, message["data"]) == notice
+    finally:
+        await pubsub.unsubscribe()
+        await pubsub.close()
+
+    snapshot = await async_state_repo.read_quiz_snapshot(q_state.quiz_code, user_token="token-Alph")
+    assert snapshot.quiz_players.names == ["Alph"]
+    assert snapshot.quiz_players.players["token-Alph"] == state_repo.read_quiz_player(q_state.quiz_code, "token-Alph")
+
+
+def test_memory_sweeper_removes_expired_keys():
+    store = QuizStateMemoryStore(0)
+    state_repo = QuizStateMemoryRepository(store)
+    q_state = _create_state()
+    state_repo.create_state(q_state, 60)
+    state_repo.lock_quiz_results(q_state.quiz_code, 60)
+    assert store.sweep() == 0
+
+    store.expire(q_state.quiz_code, QuizStateKeys.results_lock(q_state.quiz_code), 0.05)
+    time.sleep(0.1)
+    assert store.sweep() == 1
+    assert store.quiz_codes() == [q_state.quiz_code]
+    store.expire(q_state.quiz_code, QuizStateKeys.state(q_state.quiz_code), 0.05)
+    time.sleep(0.1)
+    assert store.sweep() == 1
+    assert store.quiz_codes() == []
@@ -0,0 +1,24 @@
+import json
+from typing import Dict, Any
+
+from lambdas.quiz_api_lambda import lambda_handler
+
+
+def _call(operation: str, payload: Any) -> Dict[str, Any]:
+    result = lambda_handler({
+        "body": json.dumps({"requested_operation": operation, "payload": payload})
+    })
+    assert result["statusCode"] == 200
+    return json.loads(json.loads(result["body"]))
+
+
+def test_start_join_and_check_status():
+    started = _call("quiz-start", {"topic_id": "d729af45-5ed3-42d0-ac57-d4485b64b067", "user_name": "Alph"})
+    quiz_code = started["state"]["quiz_code"]
+
+    joined = _call("quiz-join", {"quiz_code": quiz_code, "user_name": "Bart"})
+    assert joined["all_user_names"] == ["Alph", "Bart"]
+
+    status = _call("quiz-check-status", {"quiz_code": quiz_code, "user_token": joined["user"]["user_token"]})
+    assert status["state"]["status"] == "PENDING"
+    assert status["user"]["name"] == "Bart"